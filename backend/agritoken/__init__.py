@@ -0,0 +1 @@
+"""Shared data and blockchain helpers for the AgriToken backend servers."""
@@ -0,0 +1,268 @@
+"""Process-wide algod client with keep-alive connections and cached params.
+
+``algosdk``'s ``AlgodClient`` opens a new urllib connection (and TLS session)
+for every call, and the endpoints used to fetch ``suggested_params`` before
+every transaction. ``AlgodService`` keeps one pooled client per process and
+serves suggested params from a short-lived cache that a background thread
+refreshes every few rounds. A failed send drops the cached params so the
+next transaction fetches fresh ones.
+
+Submissions go through a ``SubmissionScheduler`` (see
+``agritoken.submission``), which rate-limits them, bounds how many may wait
+and retries transient algod errors.
+
+Every HTTP call to algod and each transaction phase (suggested params,
+submission, confirmation wait) is timed in ``agritoken.metrics``.
+
+The node defaults to Algonode TestNet and can be pointed at any algod
+(for example a local stand-in) with ``AGRITOKEN_ALGOD_ADDRESS`` and
+``AGRITOKEN_ALGOD_TOKEN``.
+"""
+import base64
+import copy
+import json
+import os
+import threading
+import time
+from urllib import parse
+
+import httpx
+from algosdk import constants, error, transaction
+from algosdk.v2client import algod
+
+from agritoken import metrics
+from agritoken.submission import SubmissionRejected, SubmissionScheduler
+
+DEFAULT_ALGOD_ADDRESS = "https://testnet-api.algonode.cloud"
+
+
+def _route(requrl):
+    """``requrl`` with txids, addresses and numbers replaced, for metric labels"""
+    parts = requrl.split('?', 1)[0].split('/')
+    return '/'.join('{id}' if part.isdigit() or len(part) >= 52 else part for part in parts)
+
+
+def _is_transient(e):
+    """Connection errors, throttling and server errors are worth another try"""
+    if not isinstance(e, error.AlgodHTTPError):
+        return False
+    return e.code is None or e.code == 429 or e.code >= 500
+
+
+class PooledAlgodClient(algod.AlgodClient):
+    """``AlgodClient`` that sends requests over a shared keep-alive pool"""
+
+    def __init__(self, algod_token, algod_address, headers=None, max_connections=10):
+        super().__init__(algod_token, algod_address, headers)
+        self._http = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    def algod_request(self, method, requrl, params=None, data=None, headers=None,
+                      response_format="json", timeout=30):
+        header = {"User-Agent": "py-algorand-sdk"}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in constants.no_auth:
+            header.update({constants.algod_auth_header: self.algod_token})
+
+        route = _route(requrl)
+        if requrl not in constants.unversioned_paths:
+            requrl = algod.api_version_path_prefix + requrl
+        if params:
+            requrl = requrl + "?" + parse.urlencode(params)
+
+        started = time.perf_counter()
+        try:
+            resp = self._http.request(
+                method, self.algod_address + requrl,
+                headers=header, content=data, timeout=timeout,
+            )
+        except httpx.HTTPError as e:
+            metrics.ALGOD_REQUEST_SECONDS.observe(time.perf_counter() - started, method, route, "error")
+            raise error.AlgodHTTPError(str(e)) from e
+        metrics.ALGOD_REQUEST_SECONDS.observe(time.perf_counter() - started, method, route, str(resp.status_code))
+
+        if resp.status_code >= 400:
+            message = resp.text
+            body = {}
+            try:
+                body = json.loads(resp.text)
+                message = body["message"]
+            except (ValueError, KeyError, TypeError):
+                pass
+            raise error.AlgodHTTPError(message, resp.status_code, body.get("data") if isinstance(body, dict) else None)
+
+        if response_format == "json":
+            if resp.status_code == 200 and not resp.content:
+                # Some algod responses return 200 OK with an empty body
+                return {}
+            try:
+                return resp.json()
+            except ValueError as e:
+                raise error.AlgodResponseError("Failed to parse JSON response from algod") from e
+        return resp.content
+
+    def close(self):
+        self._http.close()
+
+
+class AlgodService:
+    """Shared algod client plus a suggested-params cache.
+
+    ``params_ttl`` bounds how old cached params may be when handed out; the
+    background refresher runs every ``refresh_interval`` seconds (a few
+    rounds) while the service has been used in the last ``idle_timeout``
+    seconds, so requests normally never wait on ``/v2/transactions/params``.
+    """
+
+    def __init__(self, algod_address=DEFAULT_ALGOD_ADDRESS, algod_token="",
+                 params_ttl=20.0, refresh_interval=8.0, idle_timeout=120.0,
+                 max_connections=10, scheduler=None):
+        self.client = PooledAlgodClient(algod_token, algod_address, max_connections=max_connections)
+        self.scheduler = scheduler or SubmissionScheduler(is_transient=_is_transient)
+        self.params_ttl = params_ttl
+        self.refresh_interval = refresh_interval
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._params = None
+        self._fetched_at = 0.0
+        self._last_used = 0.0
+        self._stop = threading.Event()
+        self._refresher = None
+
+    def suggested_params(self):
+        """Return a copy of recent suggested params, fetching only when stale"""
+        with metrics.ALGOD_PHASE_SECONDS.time("suggested_params"):
+            return self._suggested_params()
+
+    def _suggested_params(self):
+        now = time.monotonic()
+        self._last_used = now
+        with self._lock:
+            params, fetched_at = self._params, self._fetched_at
+        if params is None or now - fetched_at > self.params_ttl:
+            params = self._fetch_params()
+        self._ensure_refresher()
+        # Callers may tweak fee/flat_fee, so never hand out the cached object
+        return copy.copy(params)
+
+    def invalidate_params(self):
+        """Forget the cached params, e.g. after a rejected transaction"""
+        with self._lock:
+            self._params = None
+            self._fetched_at = 0.0
+
+    def send_transaction(self, signed_txn):
+        """Submit a signed transaction, dropping cached params if algod rejects it
+
+        Raises ``SubmissionRejected`` when the scheduler turns it away.
+        """
+        try:
+            with metrics.ALGOD_PHASE_SECONDS.time("send_transaction"):
+                return self.scheduler.submit(lambda: self.client.send_transaction(signed_txn),
+                                             signed_txn.get_txid())
+        except SubmissionRejected:
+            raise
+        except Exception:
+            self.invalidate_params()
+            raise
+
+    def send_transactions(self, signed_txns):
+        """Submit a signed atomic group, dropping cached params if algod rejects it
+
+        Raises ``SubmissionRejected`` when the scheduler turns it away.
+        """
+        try:
+            with metrics.ALGOD_PHASE_SECONDS.time("send_transactions"):
+                return self.scheduler.submit(lambda: self.client.send_transactions(signed_txns),
+                                             signed_txns[0].get_txid())
+        except SubmissionRejected:
+            raise
+        except Exception:
+            self.invalidate_params()
+            raise
+
+    def send_raw_transactions(self, blobs, txid):
+        """Submit signed transactions already encoded as msgpack (see ``agritoken.signing``)
+
+        ``blobs`` is one transaction or an atomic group; ``txid`` is its first
+        transaction's ID, which algod answers with.
+        """
+        payload = base64.b64encode(b"".join(blobs))
+        try:
+            with metrics.ALGOD_PHASE_SECONDS.time("send_transactions"):
+                return self.scheduler.submit(lambda: self.client.send_raw_transaction(payload), txid)
+        except SubmissionRejected:
+            raise
+        except Exception:
+            self.invalidate_params()
+            raise
+
+    def wait_for_confirmation(self, txid, wait_rounds=4):
+        """Block until ``txid`` is confirmed; returns its pending-transaction info"""
+        with metrics.ALGOD_PHASE_SECONDS.time("wait_for_confirmation"):
+            return transaction.wait_for_confirmation(self.client, txid, wait_rounds)
+
+    def close(self):
+        self._stop.set()
+        self.client.close()
+
+    def _fetch_params(self):
+        params = self.client.suggested_params()
+        with self._lock:
+            self._params = params
+            self._fetched_at = time.monotonic()
+        return params
+
+    def _ensure_refresher(self):
+        if self._refresher is not None or self.refresh_interval is None:
+            return
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name="algod-params-refresher", daemon=True
+            )
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            if time.monotonic() - self._last_used > self.idle_timeout:
+                continue
+            try:
+                self._fetch_params()
+            except Exception as e:
+                print(f"Warning: failed to refresh suggested params: {e}")
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_algod_service():
+    """Return the process-wide ``AlgodService``, creating it on first use"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = AlgodService(
+                    algod_address=os.getenv("AGRITOKEN_ALGOD_ADDRESS", DEFAULT_ALGOD_ADDRESS),
+                    algod_token=os.getenv("AGRITOKEN_ALGOD_TOKEN", ""),
+                    scheduler=SubmissionScheduler.from_environment(is_transient=_is_transient),
+                )
+    return _service
+
+
+def set_algod_service(service):
+    """Replace the process-wide service (used to point at a stand-in algod)"""
+    global _service
+    with _service_lock:
+        previous, _service = _service, service
+    if previous is not None and previous is not service:
+        previous.close()
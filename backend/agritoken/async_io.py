@@ -0,0 +1,29 @@
+"""Async access to the JSON data files for the FastAPI handlers.
+
+Every call into the storage backend (JSON files or SQLite) is pushed onto
+Starlette's worker threads with ``run_in_threadpool``, so one slow disk
+operation no longer stalls the uvicorn event loop. Read-modify-write
+sequences on the same data are serialized with a per-file ``asyncio.Lock``
+inside the process, in front of the backend's own cross-process locking;
+it keeps waiting requests from tying up threadpool threads on ``flock``.
+"""
+import asyncio
+import os
+
+from starlette.concurrency import run_in_threadpool
+
+_file_locks = {}
+
+
+def file_lock(path):
+    """Return the asyncio lock guarding read-modify-write cycles on ``path``"""
+    key = os.path.abspath(path)
+    lock = _file_locks.get(key)
+    if lock is None:
+        lock = _file_locks.setdefault(key, asyncio.Lock())
+    return lock
+
+
+async def call(func, *args, **kwargs):
+    """Run a blocking store method (``user_store.get`` etc.) off the event loop"""
+    return await run_in_threadpool(func, *args, **kwargs)
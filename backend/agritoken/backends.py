@@ -0,0 +1,129 @@
+"""Pick the storage engine both servers run on.
+
+``AGRITOKEN_STORAGE`` selects it:
+
+* ``json`` (default): the files under ``data/`` as before.
+* ``sqlite``: one SQLite database, ``data/agritoken.db`` unless
+  ``AGRITOKEN_SQLITE_PATH`` says otherwise. Fill it from the JSON files
+  with ``python -m agritoken.migrate``.
+
+Either backend exposes the same stores:
+
+* ``farm_catalog``: canonical, confirmed farms for the Flask API
+* ``farms``: the raw ``langs_farm.json`` farm list the FastAPI server edits
+* ``holdings`` and ``users``
+
+``purchase`` moves tokens from a farm to an investor as one step, and
+``upgrade_farms`` rewrites legacy farm records into the canonical schema
+(run by hand, through ``python -m agritoken.farm_schema``).
+"""
+import os
+
+from agritoken import codec, storage
+from agritoken.farm_catalog import FarmCatalog, FarmListFile
+from agritoken.farm_schema import upgrade_farm_dir
+from agritoken.holdings_store import HoldingsStore
+from agritoken.sqlite_store import (
+    SqliteDatabase,
+    SqliteFarmCatalog,
+    SqliteFarmList,
+    SqliteHoldingsStore,
+    SqliteUserStore,
+    update_farm,
+    upgrade_farms,
+)
+from agritoken.user_store import UserStore
+
+FARM_LIST_FILE = "langs_farm.json"
+
+
+def debit_farm(farm, tokens, date):
+    """Take ``tokens`` out of a raw farm record's available supply"""
+    farm["Tokens Sold"] += tokens
+    farm["Tokens Available"] -= tokens
+    farm["Last Updated"] = date
+
+
+class JsonBackend:
+    """The original JSON files under ``data_root``"""
+
+    kind = "json"
+
+    def __init__(self, data_root):
+        self.data_root = data_root
+        self.farm_dir = farm_dir = os.path.join(data_root, "farm_info")
+        self.farm_catalog = FarmCatalog(farm_dir)
+        self.farms = FarmListFile(os.path.join(farm_dir, FARM_LIST_FILE))
+        self.holdings = HoldingsStore(os.path.join(data_root, "investor_holdings.json"))
+        self.users = UserStore(os.path.join(data_root, "user_info", "signup_info.json"))
+
+    def purchase(self, farm_id, investor_email, tokens, cost, date, validate):
+        """Sell ``tokens`` of ``farm_id`` to ``investor_email`` in one step.
+
+        ``validate(farm)`` runs while the farm is locked. It gets the raw farm
+        record (None when there is no such farm), raises to abort, and returns
+        the holding to create if the investor has no position yet. The farm
+        file is written first; if recording the holding then fails, the old
+        farm file is put back. Returns the farm as saved.
+        """
+        with self.farms.lock():
+            with open(self.farms.path, 'rb') as f:
+                original = f.read()
+            farm_data = codec.loads(original)
+            farm = next((f for f in farm_data["farms"] if f.get("Farm ID") == farm_id), None)
+            holding = validate(farm)
+            debit_farm(farm, tokens, date)
+            storage.atomic_write_json(self.farms.path, farm_data)
+            try:
+                self.holdings.record_purchase(
+                    investor_email, farm_id, tokens, cost, farm.get("Price per Token (USD)", 0), holding
+                )
+            except Exception:
+                storage.atomic_write_bytes(self.farms.path, original)
+                raise
+        return farm
+
+    def upgrade_farms(self):
+        """Rewrite legacy farm files in place; returns the number of farms upgraded"""
+        return upgrade_farm_dir(self.farm_dir)
+
+
+class SqliteBackend:
+    """Everything in one SQLite database at ``db_path``"""
+
+    kind = "sqlite"
+
+    def __init__(self, db_path):
+        self.db = SqliteDatabase(db_path)
+        self.farm_catalog = SqliteFarmCatalog(self.db)
+        self.farms = SqliteFarmList(self.db, FARM_LIST_FILE)
+        self.holdings = SqliteHoldingsStore(self.db)
+        self.users = SqliteUserStore(self.db)
+
+    def purchase(self, farm_id, investor_email, tokens, cost, date, validate):
+        """Same contract as ``JsonBackend.purchase``, in one transaction"""
+        with self.db.transaction() as conn:
+            found = self.farms.find(conn, farm_id)
+            farm = found[1] if found else None
+            holding = validate(farm)
+            debit_farm(farm, tokens, date)
+            update_farm(conn, found[0], self.farms.source, farm)
+            self.db.bump(conn, "farms")
+            self.holdings.purchase_in(
+                conn, investor_email, farm_id, tokens, cost, farm.get("Price per Token (USD)", 0), holding
+            )
+        return farm
+
+    def upgrade_farms(self):
+        """Rewrite legacy farm rows; returns the number of farms upgraded"""
+        return upgrade_farms(self.db)
+
+
+def open_backend(data_root, kind=None):
+    """Open the backend named by ``kind`` or ``AGRITOKEN_STORAGE``"""
+    kind = (kind or os.getenv("AGRITOKEN_STORAGE", "json")).lower()
+    if kind == "json":
+        return JsonBackend(data_root)
+    if kind == "sqlite":
+        return SqliteBackend(os.getenv("AGRITOKEN_SQLITE_PATH") or os.path.join(data_root, "agritoken.db"))
+    raise ValueError(f"Unknown storage backend {kind!r}; expected 'json' or 'sqlite'")
@@ -0,0 +1,116 @@
+"""Atomic-group batching for paying one asset out to many receivers.
+
+Instead of one sign/send/wait cycle per investor, transfers are packed into
+atomic groups of up to ``constants.TX_GROUP_LIMIT`` (16) transactions that
+share one set of suggested params. The groups are signed in one batch by
+``agritoken.signing.SigningService`` (across processes when large), then
+submitted and confirmed concurrently over the shared algod pool, and every
+receiver gets its own result entry.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from algosdk import constants, encoding, transaction
+
+from agritoken.submission import SubmissionRejected
+
+
+class InvalidTransfer(ValueError):
+    """A malformed batch; ``index`` is the offending transfer's, or None for the batch itself"""
+
+    def __init__(self, message, index=None):
+        super().__init__(message)
+        self.index = index
+
+
+def parse_asset_id(value):
+    """``value`` as a positive int asset ID (numeric strings too), or None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    return value if isinstance(value, int) and value > 0 else None
+
+
+def validate_transfers(asset_id, transfers):
+    """Check the whole batch before anything is built; returns the asset ID as an int
+
+    Raises ``InvalidTransfer`` for the first problem found.
+    """
+    batch_asset_id = parse_asset_id(asset_id)
+    if batch_asset_id is None:
+        raise InvalidTransfer('asset_id must be a positive integer')
+    if not isinstance(transfers, list) or not transfers:
+        raise InvalidTransfer('transfers must be a non-empty list')
+    for i, item in enumerate(transfers):
+        if not isinstance(item, dict):
+            raise InvalidTransfer(f'transfers[{i}] must be an object', i)
+        receiver = item.get("receiver_address")
+        if not isinstance(receiver, str) or not encoding.is_valid_address(receiver.strip()):
+            raise InvalidTransfer(f'transfers[{i}] has an invalid receiver_address', i)
+        amount = item.get("amount")
+        if not isinstance(amount, int) or isinstance(amount, bool) or amount <= 0:
+            raise InvalidTransfer(f'transfers[{i}] amount must be a positive integer', i)
+        # Items may repeat the asset, but a batch pays out only one
+        if "asset_id" in item and parse_asset_id(item["asset_id"]) != batch_asset_id:
+            raise InvalidTransfer(f'transfers[{i}] asset_id must match the batch asset_id {batch_asset_id}', i)
+    return batch_asset_id
+
+
+def build_transfer_groups(sender, params, asset_id, transfers, group_size=constants.TX_GROUP_LIMIT):
+    """Build unsigned AssetTransferTxn groups, each with its group ID assigned"""
+    group_size = max(1, min(group_size, constants.TX_GROUP_LIMIT))
+    groups = []
+    for start in range(0, len(transfers), group_size):
+        txns = [
+            transaction.AssetTransferTxn(
+                sender=sender,
+                sp=params,
+                receiver=item["receiver_address"].strip(),
+                amt=item["amount"],
+                index=int(asset_id),
+            )
+            for item in transfers[start:start + group_size]
+        ]
+        if len(txns) > 1:
+            transaction.assign_group_id(txns)
+        groups.append(txns)
+    return groups
+
+
+def submit_groups(algod, signed_groups, wait=True, wait_rounds=4, max_workers=8):
+    """Send every signed group concurrently and return one result per group
+
+    ``signed_groups`` holds ``(txid, blob)`` pairs from ``SigningService``.
+
+    Each result holds ``transaction_id`` (the group's first txid), the
+    per-transaction ``txids`` and, when waiting, ``confirmed_round`` or
+    ``error``. Groups the submission scheduler turned away have status
+    ``rejected`` and the ``SubmissionRejected`` under ``rejection``.
+    """
+    def run(signed_txns):
+        txids = [txid for txid, _ in signed_txns]
+        result = {'transaction_id': txids[0], 'txids': txids}
+        try:
+            algod.send_raw_transactions([blob for _, blob in signed_txns], txids[0])
+            if wait:
+                confirmed = algod.wait_for_confirmation(txids[0], wait_rounds)
+                result['confirmed_round'] = confirmed.get('confirmed-round')
+                result['status'] = 'confirmed'
+            else:
+                result['status'] = 'pending'
+            result['success'] = True
+        except SubmissionRejected as e:
+            result['success'] = False
+            result['status'] = 'rejected'
+            result['error'] = str(e)
+            result['rejection'] = e
+        except Exception as e:
+            result['success'] = False
+            result['status'] = 'failed'
+            result['error'] = str(e)
+        return result
+
+    if len(signed_groups) == 1:
+        return [run(signed_groups[0])]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(signed_groups))) as executor:
+        return list(executor.map(run, signed_groups))
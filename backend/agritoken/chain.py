@@ -0,0 +1,51 @@
+"""Deferred loading of the Algorand stack for the Flask server.
+
+``algokit_utils`` and ``algosdk`` make up most of the Flask server's import
+time, yet the read-only endpoints (``/farms``, ``/investor-holdings``,
+``/health``) never touch the chain. The server therefore imports them on
+first use: through ``algod_service()`` or inside the endpoints that build
+transactions. ``warm()`` loads everything up front, for ``/ready?warm=true``
+or a deployment that would rather pay the cost before taking traffic.
+"""
+import importlib
+import sys
+import threading
+import time
+
+# Everything a chain endpoint needs, heaviest first
+MODULES = ("algokit_utils", "algosdk", "agritoken.algod_pool", "agritoken.batch_transfer")
+
+_warm_lock = threading.Lock()
+_indexer_lock = threading.Lock()
+_indexer = None
+
+
+def loaded():
+    """True once every module in ``MODULES`` has been imported"""
+    return all(name in sys.modules for name in MODULES)
+
+
+def algod_service():
+    """The process-wide ``AlgodService``; imports the SDK on the first call"""
+    from agritoken.algod_pool import get_algod_service
+    return get_algod_service()
+
+
+def transaction_indexer():
+    """The process-wide ``TransactionIndexer``, created on the first call"""
+    global _indexer
+    with _indexer_lock:
+        if _indexer is None:
+            from agritoken.reconcile import TransactionIndexer
+            _indexer = TransactionIndexer()
+        return _indexer
+
+
+def warm():
+    """Import the chain stack and create the algod service; returns seconds spent"""
+    started = time.perf_counter()
+    with _warm_lock:
+        for name in MODULES:
+            importlib.import_module(name)
+        algod_service()
+    return time.perf_counter() - started
@@ -0,0 +1,74 @@
+"""One JSON codec for HTTP bodies and the data files.
+
+Both servers and every store encode and decode through here. With orjson
+installed, serializing and parsing the farm and holding lists is several
+times faster than the stdlib ``json`` module (see
+``benchmarks/bench_codec.py``). Without it the stdlib is used, and the
+output has the same shape either way.
+
+Data files are written with two-space indentation, as before. Set
+``AGRITOKEN_JSON_COMPACT=1`` to write them compact: they get smaller and
+faster to parse, but harder to read by hand.
+"""
+import json
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib
+    orjson = None
+
+COMPACT_ON_DISK = os.getenv("AGRITOKEN_JSON_COMPACT", "").lower() in ("1", "true", "yes")
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (date, datetime, time)):  # as orjson writes them
+        return obj.isoformat()
+    if hasattr(obj, 'tolist'):  # numpy scalars and arrays on the stdlib path
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Compact UTF-8 JSON bytes, for HTTP bodies and log records"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=_OPTIONS)
+        except TypeError:
+            # e.g. integers wider than 64 bits, which the stdlib handles
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def dumps_file(obj, compact=None):
+    """UTF-8 JSON bytes for a data file; indented unless compact"""
+    if compact is None:
+        compact = COMPACT_ON_DISK
+    if compact:
+        return dumps(obj)
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=_OPTIONS | orjson.OPT_INDENT_2)
+        except TypeError:
+            pass
+    return json.dumps(obj, indent=2, ensure_ascii=False, default=_default).encode('utf-8')
+
+
+def loads(data):
+    """Parse JSON from bytes or str; raises a ``json.JSONDecodeError`` subclass"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_file(path):
+    """Parse the JSON file at ``path``; raises FileNotFoundError if missing"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
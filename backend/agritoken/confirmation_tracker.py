@@ -0,0 +1,387 @@
+"""Background confirmation tracking for submitted transactions.
+
+Endpoints that submit in non-blocking mode hand the txid to the tracker and
+return straight away. A single background thread checks every pending txid
+against algod (concurrently, over the shared keep-alive pool) once per
+``poll_interval``, records the outcome and runs the callbacks registered for
+the transaction's kind with ``on``, e.g. to write the Asset ID and confirmed
+round back into the farm record.
+
+A transaction only fails when algod rejects it from the pool, or when the
+chain has moved past its last valid round without it being confirmed.
+Lookup errors leave it pending. Algod forgets confirmed transactions after
+a while, so a txid it no longer knows is looked up in the indexer before it
+can count as expired; the indexer is given ``settle_rounds`` rounds past
+the last valid round to catch up.
+
+Pending txids are also written to a ``PendingTransactionStore`` ledger
+shared by every worker process, and only removed once their callback has
+run. Each entry is leased to the tracker watching it, which renews the
+lease while it runs. ``resume`` claims the entries nobody holds, e.g. after
+a restart, and a running tracker takes over the entries of a worker that
+died once their lease runs out, so every txid is polled and its callback
+run by one worker at a time. ``lookup`` asks algod, then the indexer,
+about txids no local tracker knows, e.g. ones confirmed by another worker.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from agritoken import metrics
+from agritoken.ledger import JsonLedger
+
+PENDING = "pending"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+
+# The protocol's maximum validity window: last valid is at most 1000 rounds
+# past first valid, so at most this far past the round a txn was seen pending
+MAX_TXN_LIFE = 1000
+
+
+class PendingTransactionStore(JsonLedger):
+    """Submitted txids still waiting for their outcome to be recorded.
+
+    * ``{"op": "track", "txid", "kind", "details", "submitted_at", "owner",
+      "expires"}`` adds one, leased to ``owner`` until ``expires``
+    * ``{"op": "claim", "txids", "owner", "expires"}`` takes or renews leases
+    * ``{"op": "valid", "txid", "last_valid"}`` records the last valid round
+    * ``{"op": "finish", "txid"}`` removes it once its callback has run
+    """
+
+    name = "pending transactions"
+
+    def add(self, txid, kind, details, submitted_at, owner=None, expires=0):
+        self._append({"op": "track", "txid": txid, "kind": kind, "details": details,
+                      "submitted_at": submitted_at, "owner": owner, "expires": expires})
+
+    def claim(self, owner, lease, txids=None):
+        """Lease ``txids`` (default: all) to ``owner`` unless another owner holds them
+
+        Returns copies of the entries ``owner`` holds afterwards.
+        """
+        with self._transaction():
+            now = time.time()
+            wanted = self._entries if txids is None else [txid for txid in txids if txid in self._entries]
+            claimed = [txid for txid in wanted
+                       if self._entries[txid].get("owner") == owner or self._entries[txid].get("expires", 0) <= now]
+            if claimed:
+                self._append({"op": "claim", "txids": claimed, "owner": owner, "expires": now + lease})
+            return [dict(self._entries[txid]) for txid in claimed]
+
+    def set_last_valid(self, txid, last_valid):
+        self._append({"op": "valid", "txid": txid, "last_valid": last_valid})
+
+    def finish(self, txid):
+        self._append({"op": "finish", "txid": txid})
+
+    def get(self, txid):
+        """Return a copy of the entry for ``txid`` or None"""
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(txid)
+            return dict(entry) if entry is not None else None
+
+    def pending(self):
+        """Return copies of every entry in submission order"""
+        with self._lock:
+            self._refresh()
+            return [dict(entry) for entry in self._entries.values()]
+
+    def _load_state(self, data):
+        entries = data.get("transactions", []) if isinstance(data, dict) else []
+        self._entries = {entry["txid"]: entry for entry in entries}
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "track":
+            self._entries[record["txid"]] = {key: record.get(key) for key in
+                                             ("txid", "kind", "details", "submitted_at", "owner", "expires")}
+        elif op == "claim":
+            for txid in record["txids"]:
+                entry = self._entries.get(txid)
+                if entry is not None:
+                    entry.update(owner=record["owner"], expires=record["expires"])
+        elif op == "valid":
+            entry = self._entries.get(record["txid"])
+            if entry is not None:
+                entry["last_valid"] = record["last_valid"]
+        elif op == "finish":
+            self._entries.pop(record["txid"], None)
+        else:
+            raise KeyError(f"unknown op {op!r}")
+
+    def _snapshot_data(self):
+        return {"transactions": list(self._entries.values())}
+
+
+def status_from_info(txid, info, kind=None, **details):
+    """A tracker status for algod's pending-transaction ``info``"""
+    status = {
+        "transaction_id": txid,
+        "type": kind,
+        "status": PENDING,
+        "confirmed_round": None,
+        "asset_id": None,
+        "error": None,
+        **details,
+    }
+    if info.get("confirmed-round"):
+        status.update(status=CONFIRMED, confirmed_round=info["confirmed-round"],
+                      asset_id=info.get("asset-index"))
+    elif info.get("pool-error"):
+        status.update(status=FAILED, error=info["pool-error"])
+    return status
+
+
+class ConfirmationTracker:
+    """Tracks pending txids until they are confirmed, rejected or expire"""
+
+    def __init__(self, get_service, store=None, get_indexer=None, poll_interval=1.0, lease=30.0,
+                 settle_rounds=10, retention=3600.0, max_workers=8):
+        self._get_service = get_service
+        self._get_indexer = get_indexer
+        self.store = store
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.settle_rounds = settle_rounds
+        self.retention = retention
+        self.owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._handlers = {}  # kind -> (callback, failure callback)
+        self._pending = set()
+        self._statuses = {}
+        self._renewed_at = time.monotonic()
+        self._wakeup = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tx-check")
+        self._thread = None
+
+    def on(self, kind, on_confirmed=None, on_failed=None):
+        """Run ``on_confirmed``/``on_failed`` with the final status of each ``kind`` txid"""
+        self._handlers[kind] = (on_confirmed, on_failed)
+
+    def track(self, txid, kind, **details):
+        """Start tracking ``txid`` and return its initial status
+
+        ``details`` are kept with the status and must be JSON-serializable,
+        since they are stored for ``resume``.
+        """
+        submitted_at = time.time()
+        if self.store is not None:
+            self.store.add(txid, kind, details, submitted_at, self.owner, submitted_at + self.lease)
+        return self._watch(txid, kind, details, submitted_at)
+
+    def resume(self):
+        """Claim and track the stored txids no tracker holds, e.g. after a restart
+
+        Entries still leased to another worker are left to it; the polling
+        thread takes them over if that worker stops renewing. Returns how
+        many were picked up.
+        """
+        if self.store is None:
+            return 0
+        resumed = 0
+        for entry in self.store.claim(self.owner, self.lease):
+            with self._lock:
+                if entry["txid"] in self._pending:
+                    continue
+            self._watch(entry["txid"], entry["kind"], entry["details"], entry["submitted_at"],
+                        entry.get("last_valid"))
+            resumed += 1
+        if self.store.pending():
+            self._ensure_thread()
+        return resumed
+
+    def status(self, txid):
+        """Return the latest known status for ``txid`` or None
+
+        Txids tracked by another process show as pending until they finish.
+        """
+        with self._lock:
+            status = self._statuses.get(txid)
+            if status is not None:
+                return dict(status)
+        entry = self.store.get(txid) if self.store is not None else None
+        if entry is None:
+            return None
+        return status_from_info(txid, {}, entry["kind"], submitted_at=entry["submitted_at"], **entry["details"])
+
+    def lookup(self, txid):
+        """``status``, asking algod and the indexer about txids this process is not tracking
+
+        Returns None when neither the trackers nor the chain know the txid.
+        """
+        with self._lock:
+            status = self._statuses.get(txid)
+            if status is not None:
+                return dict(status)
+        status = self.status(txid)
+        try:
+            with metrics.ALGOD_PHASE_SECONDS.time("pending_transaction_info"):
+                info = self._get_service().client.pending_transaction_info(txid)
+        except Exception as e:
+            if getattr(e, "code", None) != 404:
+                raise
+            info = self._indexed(txid) if self._get_indexer is not None else None
+            if info is None:
+                return status
+        reported = status_from_info(txid, info)
+        if status is None:
+            return reported
+        # Tracked by another process: its poll may not have caught up yet
+        if reported["status"] != PENDING:
+            status.update({key: reported[key] for key in ("status", "confirmed_round", "asset_id", "error")})
+        return status
+
+    def _watch(self, txid, kind, details, submitted_at, last_valid=None):
+        status = {
+            "transaction_id": txid,
+            "type": kind,
+            "status": PENDING,
+            "confirmed_round": None,
+            "asset_id": None,
+            "error": None,
+            "submitted_at": submitted_at,
+            "last_valid": last_valid,
+            **details,
+        }
+        with self._lock:
+            self._statuses[txid] = status
+            self._pending.add(txid)
+        self._ensure_thread()
+        self._wakeup.set()
+        return dict(status)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="tx-confirmation-tracker", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                if self.store is not None and time.monotonic() - self._renewed_at >= self.lease / 3:
+                    self._renew()
+                self._poll()
+            except Exception as e:
+                print(f"Warning: confirmation tracker poll failed: {e}")
+
+    def _renew(self):
+        """Extend the leases on this tracker's txids and adopt those of dead workers"""
+        self._renewed_at = time.monotonic()
+        with self._lock:
+            txids = list(self._pending)
+        held = {entry["txid"] for entry in self.store.claim(self.owner, self.lease, txids)} if txids else set()
+        with self._lock:
+            # Finished by, or lost to, another worker
+            for txid in set(txids) - held:
+                self._pending.discard(txid)
+                self._statuses.pop(txid, None)
+        self.resume()
+
+    def _poll(self):
+        with self._lock:
+            txids = list(self._pending)
+        if txids:
+            client = self._get_service().client
+            try:
+                with metrics.ALGOD_PHASE_SECONDS.time("status"):
+                    last_round = client.status()["last-round"]
+            except Exception:
+                last_round = None
+            results = self._executor.map(lambda txid: self._check(client, txid), txids)
+            for txid, info in zip(txids, results):
+                self._handle(txid, info, last_round)
+        self._evict()
+
+    @staticmethod
+    def _check(client, txid):
+        try:
+            with metrics.ALGOD_PHASE_SECONDS.time("pending_transaction_info"):
+                return client.pending_transaction_info(txid)
+        except Exception as e:
+            return {"_error": str(e), "_code": getattr(e, "code", None)}
+
+    def _indexed(self, txid):
+        """The indexer's ``info`` for ``txid``, or None if it has not indexed it"""
+        with metrics.ALGOD_PHASE_SECONDS.time("indexer_transaction"):
+            return self._get_indexer().transaction(txid)
+
+    def _handle(self, txid, info, last_round):
+        with self._lock:
+            status = self._statuses.get(txid)
+            if status is None or txid not in self._pending:
+                return
+
+        if info.get("_code") == 404 and self._get_indexer is not None:
+            # Algod drops confirmed txns from its pending cache after a while
+            try:
+                info = self._indexed(txid) or info
+            except Exception as e:
+                info = {"_error": str(e)}
+        elif "txn" in info and status["last_valid"] is None:
+            self._learn_last_valid(txid, status, info["txn"].get("txn", {}).get("lv"))
+
+        on_confirmed, on_failed = self._handlers.get(status["type"], (None, None))
+        if info.get("confirmed-round"):
+            updates = {
+                "status": CONFIRMED,
+                "confirmed_round": info["confirmed-round"],
+                "asset_id": info.get("asset-index"),
+            }
+            callback = on_confirmed
+        elif info.get("pool-error"):
+            updates = {"status": FAILED, "error": info["pool-error"]}
+            callback = on_failed
+        elif last_round is None or (info.get("_error") and info.get("_code") != 404):
+            # Neither algod's round nor the txn's fate is known
+            return
+        elif status["last_valid"] is None:
+            # Never seen in the pool: it cannot outlive a full validity window from now
+            self._learn_last_valid(txid, status, last_round + MAX_TXN_LIFE)
+            return
+        elif last_round > status["last_valid"] + (self.settle_rounds if "_code" in info else 0):
+            updates = {"status": FAILED,
+                       "error": f"Expired unconfirmed after last valid round {status['last_valid']}"}
+            callback = on_failed
+        else:
+            return
+
+        with self._lock:
+            self._pending.discard(txid)
+            status.update(updates, finished_at=time.time())
+            snapshot = dict(status)
+        if callback is not None:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                # Left in the store, so the next start retries it
+                print(f"Warning: confirmation callback for {txid} failed: {e}")
+                return
+        if self.store is not None:
+            try:
+                self.store.finish(txid)
+            except Exception as e:
+                print(f"Warning: could not record {txid} as finished: {e}")
+
+    def _learn_last_valid(self, txid, status, last_valid):
+        if last_valid is None:
+            return
+        with self._lock:
+            status["last_valid"] = last_valid
+        if self.store is not None:
+            self.store.set_last_valid(txid, last_valid)
+
+    def _evict(self):
+        cutoff = time.time() - self.retention
+        with self._lock:
+            for txid in [t for t, s in self._statuses.items()
+                         if s["status"] != PENDING and s.get("finished_at", 0) < cutoff]:
+                del self._statuses[txid]
@@ -0,0 +1,100 @@
+"""scrypt password hashing run off the event loop.
+
+scrypt is deliberately slow and memory-hard, so hashing inline in an
+``async def`` handler would stall every other request on the uvicorn loop.
+``CredentialService`` runs hashing and verification in a bounded
+``ThreadPoolExecutor`` (hashlib's scrypt releases the GIL), which also caps
+how much memory concurrent logins can claim.
+
+Stored hashes look like ``scrypt$<n>$<r>$<p>$<salt>$<hash>`` (base64 salt
+and hash). Anything else is treated as a legacy plaintext password:
+``verify`` still accepts it but reports that the record needs upgrading.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+PREFIX = "scrypt"
+DEFAULT_N = 2 ** 14
+DEFAULT_R = 8
+DEFAULT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode('ascii')
+
+
+class CredentialService:
+    """Hashes and verifies passwords with scrypt at a configurable cost"""
+
+    def __init__(self, n=DEFAULT_N, r=DEFAULT_R, p=DEFAULT_P, max_workers=4):
+        if n < 2 or n & (n - 1):
+            raise ValueError("scrypt n must be a power of two greater than 1")
+        self.n = n
+        self.r = r
+        self.p = p
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="kdf")
+        # Hash of a random password, verified against when the user is unknown
+        # so failed logins take as long as real ones
+        self._dummy_hash = self.hash_password(_b64(os.urandom(SALT_BYTES)))
+
+    @classmethod
+    def from_environment(cls):
+        """Build a service from AGRITOKEN_SCRYPT_N/_R/_P and AGRITOKEN_KDF_WORKERS"""
+        return cls(
+            n=int(os.getenv("AGRITOKEN_SCRYPT_N", DEFAULT_N)),
+            r=int(os.getenv("AGRITOKEN_SCRYPT_R", DEFAULT_R)),
+            p=int(os.getenv("AGRITOKEN_SCRYPT_P", DEFAULT_P)),
+            max_workers=int(os.getenv("AGRITOKEN_KDF_WORKERS", 4)),
+        )
+
+    def hash_password(self, password):
+        salt = os.urandom(SALT_BYTES)
+        key = self._derive(password, salt, self.n, self.r, self.p)
+        return f"{PREFIX}${self.n}${self.r}${self.p}${_b64(salt)}${_b64(key)}"
+
+    def verify_password(self, stored, password):
+        """Return ``(matches, needs_upgrade)`` for a stored hash or legacy plaintext"""
+        stored = stored or ""
+        if not stored.startswith(PREFIX + "$"):
+            matches = hmac.compare_digest(stored.encode('utf-8'), (password or "").encode('utf-8'))
+            return matches, True
+        try:
+            _, n, r, p, salt, expected = stored.split("$")
+            n, r, p = int(n), int(r), int(p)
+            salt = base64.b64decode(salt)
+            expected = base64.b64decode(expected)
+        except ValueError:
+            return False, False
+        key = self._derive(password, salt, n, r, p, len(expected))
+        matches = hmac.compare_digest(key, expected)
+        return matches, matches and (n, r, p) != (self.n, self.r, self.p)
+
+    async def hash(self, password):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.hash_password, password)
+
+    async def verify(self, stored, password):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.verify_password, stored, password)
+
+    async def burn(self, password):
+        """Spend one verification's worth of work for an unknown user"""
+        await self.verify(self._dummy_hash, password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    @staticmethod
+    def _derive(password, salt, n, r, p, length=KEY_BYTES):
+        return hashlib.scrypt(
+            (password or "").encode('utf-8'),
+            salt=salt, n=n, r=r, p=p,
+            maxmem=256 * n * r + 1024 * 1024,
+            dklen=length,
+        )
@@ -0,0 +1,255 @@
+"""In-memory index of the farm records stored in ``data/farm_info``.
+
+Every JSON file in the farm directory is parsed once. Later reads only stat
+the directory, and files are re-parsed when their mtime or size changes, so
+``GET /farms`` no longer scales with the number of files. Records are stored
+in the canonical schema (``agritoken.farm_schema``) and indexed as they
+are; only files not yet upgraded are brought into shape while loading.
+"""
+import json
+import os
+import threading
+import time
+
+from agritoken.farm_schema import FARM_FILE_LABEL, canonical_farm, ensure_canonical, merge_farm
+from agritoken.storage import atomic_write_json, locked, read_json, update_json
+
+
+def extract_farms(data):
+    """Pull the raw farm objects out of one parsed farm_info file"""
+    # If the file contains a "farms" array, extract those farms
+    if isinstance(data, dict):
+        if "farms" in data and isinstance(data["farms"], list):
+            return list(data["farms"])
+        # If it's a single farm object, add it directly
+        if "Farm Name" in data:
+            return [data]
+        return []
+    # If it's already a list, use it as is
+    if isinstance(data, list):
+        return list(data)
+    return []
+
+
+class FarmCatalog:
+    """Canonical farms indexed by Farm ID, Asset ID and farmer email.
+
+    ``refresh`` is cheap when nothing changed: it compares the directory mtime
+    and only walks the directory again when that moved or when
+    ``rescan_interval`` seconds have passed (in-place edits do not touch the
+    directory mtime). During a walk only files whose (mtime, size) signature
+    changed are parsed again.
+    """
+
+    def __init__(self, data_dir, rescan_interval=2.0):
+        self.data_dir = data_dir
+        self.rescan_interval = rescan_interval
+        self._lock = threading.RLock()
+        self._files = {}  # filename -> ((mtime_ns, size), [canonical farms])
+        self._dir_mtime = None
+        self._last_scan = 0.0
+        self._farms = []
+        self._version = 0
+        self._by_farm_id = {}
+        self._by_asset_id = {}
+        self._by_farmer_email = {}
+
+    def refresh(self, force=False):
+        """Bring the index up to date with the files on disk"""
+        with self._lock:
+            try:
+                dir_mtime = os.stat(self.data_dir).st_mtime_ns
+            except FileNotFoundError:
+                if self._files:
+                    self._files = {}
+                    self._rebuild()
+                self._dir_mtime = None
+                return
+
+            now = time.monotonic()
+            if (not force and dir_mtime == self._dir_mtime
+                    and now - self._last_scan < self.rescan_interval):
+                return
+
+            changed = False
+            seen = set()
+            with os.scandir(self.data_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.json') or not entry.is_file():
+                        continue
+                    seen.add(entry.name)
+                    stat = entry.stat()
+                    signature = (stat.st_mtime_ns, stat.st_size)
+                    cached = self._files.get(entry.name)
+                    if cached is not None and cached[0] == signature:
+                        continue
+                    self._files[entry.name] = (signature, self._load_file(entry.path))
+                    changed = True
+
+            for filename in list(self._files):
+                if filename not in seen:
+                    del self._files[filename]
+                    changed = True
+
+            self._dir_mtime = dir_mtime
+            self._last_scan = now
+            if changed:
+                self._rebuild()
+
+    def reload_file(self, filepath):
+        """Re-read a single file that this process just wrote"""
+        with self._lock:
+            filename = os.path.basename(filepath)
+            try:
+                stat = os.stat(filepath)
+            except FileNotFoundError:
+                if self._files.pop(filename, None) is not None:
+                    self._rebuild()
+                return
+            signature = (stat.st_mtime_ns, stat.st_size)
+            self._files[filename] = (signature, self._load_file(filepath))
+            self._rebuild()
+
+    def save(self, filename, farm):
+        """Write ``farm`` to its own file and index it; returns the file path"""
+        filepath = os.path.join(self.data_dir, filename)
+        atomic_write_json(filepath, canonical_farm(farm), FARM_FILE_LABEL)
+        self.reload_file(filepath)
+        return filepath
+
+    def update(self, filepath, updates):
+        """Merge fields into a farm saved with ``save`` and re-index it"""
+        def merge(farm):
+            merged = merge_farm(farm, updates)
+            farm.clear()
+            farm.update(merged)
+        update_json(filepath, merge, label=FARM_FILE_LABEL)
+        self.reload_file(filepath)
+
+    def update_by_farm_id(self, farm_id, updates):
+        """Merge fields into every listed farm with this Farm ID, in whichever files hold it"""
+        with self._lock:
+            self.refresh()
+            filenames = [name for name, (_, farms) in self._files.items()
+                         if any(farm["Farm ID"] == farm_id for farm in farms)]
+        updated = 0
+        for filename in filenames:
+            filepath = os.path.join(self.data_dir, filename)
+
+            def merge(data):
+                count = 0
+                for farm in extract_farms(data):
+                    if isinstance(farm, dict) and ensure_canonical(farm)["Farm ID"] == farm_id:
+                        merged = merge_farm(farm, updates)
+                        farm.clear()
+                        farm.update(merged)
+                        count += 1
+                return count
+
+            updated += update_json(filepath, merge, label=FARM_FILE_LABEL)
+            self.reload_file(filepath)
+        return updated
+
+    def all(self):
+        """Return every confirmed farm"""
+        self.refresh()
+        return self._farms
+
+    def snapshot(self):
+        """Return ``(version, farms)``; the version changes whenever the list does"""
+        with self._lock:
+            self.refresh()
+            return self._version, self._farms
+
+    def get_by_farm_id(self, farm_id):
+        self.refresh()
+        return self._by_farm_id.get(farm_id)
+
+    def get_by_asset_id(self, asset_id):
+        self.refresh()
+        return self._by_asset_id.get(str(asset_id))
+
+    def get_by_farmer_email(self, email):
+        self.refresh()
+        return self._by_farmer_email.get((email or "").lower(), [])
+
+    def _load_file(self, filepath):
+        try:
+            data = read_json(filepath, FARM_FILE_LABEL)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error reading {os.path.basename(filepath)}: {e}")
+            return []
+        # Farms whose asset creation is still pending (or failed) are not listed
+        return [ensure_canonical(farm) for farm in extract_farms(data)
+                if isinstance(farm, dict) and farm.get("Transaction Status", "confirmed") == "confirmed"]
+
+    def _rebuild(self):
+        farms = []
+        by_farm_id = {}
+        by_asset_id = {}
+        by_farmer_email = {}
+        for filename in sorted(self._files):
+            for farm in self._files[filename][1]:
+                farms.append(farm)
+                by_farm_id.setdefault(farm["Farm ID"], farm)
+                if farm["Asset ID"] != "unknown":
+                    by_asset_id.setdefault(farm["Asset ID"], farm)
+                by_farmer_email.setdefault(farm["Farmer Email"].lower(), []).append(farm)
+        # Swap in whole structures so readers never see a half-built index
+        self._farms = farms
+        self._by_farm_id = by_farm_id
+        self._by_asset_id = by_asset_id
+        self._by_farmer_email = by_farmer_email
+        self._version += 1
+
+
+class FarmListFile:
+    """Raw farm records kept in one ``{"farms": [...]}`` file.
+
+    This is the layout of ``langs_farm.json`` that the FastAPI server reads
+    and extends. Writers go through the file's cross-process lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._cache = (None, [])
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def all(self):
+        """Return every farm in the file; raises FileNotFoundError if missing"""
+        return self.snapshot()[1]
+
+    def snapshot(self):
+        """Return ``(signature, farms)``, parsing the file again only when it changed"""
+        stat = os.stat(self.path)
+        # Writers replace the file, so the inode changes even within one mtime tick
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = self._cache
+        if cached[0] != signature:
+            cached = (signature, read_json(self.path)["farms"])
+            self._cache = cached
+        return cached
+
+    def get(self, farm_id):
+        return next((farm for farm in self.all() if farm.get("Farm ID") == farm_id), None)
+
+    def for_farmer(self, email):
+        email = (email or "").lower()
+        return [farm for farm in self.all() if farm.get("Farmer Email", "").lower() == email]
+
+    def add_if_absent(self, farm):
+        """Append ``farm`` unless its Farm ID is taken; returns False on a duplicate"""
+        farm = canonical_farm(farm)
+
+        def add(data):
+            if any(existing.get("Farm ID", "") == farm.get("Farm ID") for existing in data["farms"]):
+                return False
+            data["farms"].append(farm)
+            return True
+        return update_json(self.path, add, default=lambda: {"farms": []})
+
+    def lock(self):
+        """Cross-process lock for a read-modify-write of the whole file"""
+        return locked(self.path)
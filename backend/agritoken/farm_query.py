@@ -0,0 +1,259 @@
+"""Server-side filtering, sorting and cursor pagination for farm listings.
+
+``FarmSearch`` keeps a ``FarmIndex`` for the current version of a farm list.
+The index sorts the farms by ``(value, created_at, Farm ID)`` for a sort
+key the first time that key is asked for. Any write makes a new version,
+and each sort key used after it is sorted again in full. A filter
+combination is applied to that order in one pass the first time it is
+seen and the result is cached for the version, so every further page is a
+bisect to the cursor plus ``limit`` steps.
+
+Cursors are opaque, URL-safe strings holding the sort key and the last
+farm's ``(value, created_at, Farm ID)`` (keyset pagination). None of these
+depends on where a farm sits in the list, so adding or removing farms
+between pages neither skips nor repeats rows. A farm whose sort value
+itself changes (e.g. ``Tokens Available`` after a purchase) moves to its
+new place in the order.
+
+Without ``limit`` or ``cursor`` the default order is the list's own; pages
+of the default order go by ``created_at`` and ``Farm ID``.
+"""
+import base64
+import binascii
+import json
+import math
+import threading
+from bisect import bisect_left, bisect_right
+
+from agritoken.farm_schema import ensure_canonical
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_CACHED_FILTERS = 128
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _text(value):
+    return str(value or "").lower()
+
+
+# Sort key -> value extracted from a canonical farm; "default" orders by the tiebreakers alone
+SORT_KEYS = {
+    "default": None,
+    "name": lambda farm: _text(farm["Farm Name"]),
+    "price": lambda farm: _number(farm["Price per Token (USD)"]),
+    "apy": lambda farm: _number(farm["Est. APY"]),
+    "available": lambda farm: _number(farm["Tokens Available"]),
+    "harvest": lambda farm: _text(farm["Harvest Date"]),
+    "created": lambda farm: _text(farm["created_at"]),
+}
+
+
+class FarmQueryError(ValueError):
+    """A query parameter or cursor that cannot be used"""
+
+
+class FarmQuery:
+    """Parsed listing parameters.
+
+    ``crop``, ``status``: case-insensitive match; ``location``: substring;
+    ``min_apy``/``max_apy``, ``min_price``/``max_price``: inclusive ranges;
+    ``available=true``: only farms with tokens left; ``sort``: one of
+    ``SORT_KEYS``, ``-`` prefix for descending; ``limit`` and ``cursor``
+    page through the result.
+    """
+
+    def __init__(self, crop=None, location=None, status=None, min_apy=None, max_apy=None,
+                 min_price=None, max_price=None, available=False, sort="default", descending=False,
+                 limit=None, cursor=None):
+        self.crop = crop
+        self.location = location
+        self.status = status
+        self.min_apy = min_apy
+        self.max_apy = max_apy
+        self.min_price = min_price
+        self.max_price = max_price
+        self.available = available
+        self.sort = sort
+        self.descending = descending
+        self.limit = limit
+        self.cursor = cursor
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a query from request parameters (``request.args`` or ``query_params``)"""
+        def number(name):
+            value = args.get(name)
+            if value in (None, ""):
+                return None
+            try:
+                return float(value)
+            except ValueError:
+                raise FarmQueryError(f"{name} must be a number")
+
+        sort = args.get("sort") or "default"
+        descending = sort.startswith("-")
+        sort = sort.lstrip("-")
+        if sort not in SORT_KEYS:
+            raise FarmQueryError(f"sort must be one of {', '.join(sorted(SORT_KEYS))}")
+
+        limit = args.get("limit")
+        if limit not in (None, ""):
+            try:
+                limit = int(limit)
+            except ValueError:
+                raise FarmQueryError("limit must be an integer")
+            if not 1 <= limit <= MAX_PAGE_SIZE:
+                raise FarmQueryError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        else:
+            limit = None
+
+        return cls(
+            crop=_text(args.get("crop")) or None,
+            location=_text(args.get("location")) or None,
+            status=_text(args.get("status")) or None,
+            min_apy=number("min_apy"),
+            max_apy=number("max_apy"),
+            min_price=number("min_price"),
+            max_price=number("max_price"),
+            available=_text(args.get("available")) in ("1", "true", "yes"),
+            sort=sort,
+            descending=descending,
+            limit=limit,
+            cursor=args.get("cursor") or None,
+        )
+
+    @property
+    def paginated(self):
+        return self.limit is not None or self.cursor is not None
+
+    def filter_key(self):
+        return (self.crop, self.location, self.status, self.min_apy, self.max_apy,
+                self.min_price, self.max_price, self.available)
+
+    def matches(self, farm):
+        if self.crop is not None and _text(farm["Crop Type"]) != self.crop:
+            return False
+        if self.location is not None and self.location not in _text(farm["Farm Location"]):
+            return False
+        if self.status is not None and _text(farm["Farm Status"]) != self.status:
+            return False
+        apy = _number(farm["Est. APY"])
+        if (self.min_apy is not None and apy < self.min_apy) or (self.max_apy is not None and apy > self.max_apy):
+            return False
+        price = _number(farm["Price per Token (USD)"])
+        if (self.min_price is not None and price < self.min_price) or (self.max_price is not None and price > self.max_price):
+            return False
+        if self.available and _number(farm["Tokens Available"]) <= 0:
+            return False
+        return True
+
+
+def encode_cursor(sort, key):
+    """Cursor resuming after the farm with sort ``key`` ``(value, created_at, Farm ID)``"""
+    raw = json.dumps([sort, list(key)], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, key = json.loads(raw)
+        value, created_at, farm_id = key
+    except (binascii.Error, ValueError, TypeError):
+        raise FarmQueryError("cursor is not valid")
+    if cursor_sort != sort:
+        raise FarmQueryError("cursor was issued for a different sort order")
+    return (value, created_at, farm_id)
+
+
+class FarmIndex:
+    """Sorted views over one version of a farm list"""
+
+    def __init__(self, farms):
+        self.farms = farms
+        self._canonical = [ensure_canonical(farm) for farm in farms]
+        self._orders = {}
+        self._filtered = {}
+        self._lock = threading.Lock()
+
+    def search(self, query):
+        """Return ``(farms, next_cursor, total)`` for ``query``"""
+        if not query.paginated and query.sort == "default":
+            farms = [farm for farm, canonical in zip(self.farms, self._canonical) if query.matches(canonical)]
+            return (farms[::-1] if query.descending else farms), None, len(farms)
+
+        keys = self._matching(query)
+        total = len(keys)
+        if not query.paginated:
+            page = keys[::-1] if query.descending else keys
+            return [self.farms[key[3]] for key in page], None, total
+
+        size = query.limit or DEFAULT_PAGE_SIZE
+        try:
+            # Keys carry the list position last, only to find the farm; cursors leave it out
+            if query.descending:
+                end = bisect_left(keys, decode_cursor(query.cursor, query.sort)) if query.cursor else total
+                start = max(0, end - size)
+                page = keys[start:end][::-1]
+                more = start > 0
+            else:
+                start = bisect_right(keys, decode_cursor(query.cursor, query.sort) + (math.inf,)) if query.cursor else 0
+                end = min(total, start + size)
+                page = keys[start:end]
+                more = end < total
+        except TypeError:
+            # Cursor value of the wrong type for this sort key
+            raise FarmQueryError("cursor is not valid")
+        next_cursor = encode_cursor(query.sort, page[-1][:3]) if more and page else None
+        return [self.farms[key[3]] for key in page], next_cursor, total
+
+    def _order(self, sort):
+        keys = self._orders.get(sort)
+        if keys is None:
+            value_of = SORT_KEYS[sort]
+            keys = sorted(
+                ("" if value_of is None else value_of(farm), _text(farm["created_at"]), str(farm["Farm ID"]), position)
+                for position, farm in enumerate(self._canonical)
+            )
+            with self._lock:
+                self._orders[sort] = keys
+        return keys
+
+    def _matching(self, query):
+        cache_key = (query.filter_key(), query.sort)
+        keys = self._filtered.get(cache_key)
+        if keys is None:
+            canonical = self._canonical
+            keys = [key for key in self._order(query.sort) if query.matches(canonical[key[3]])]
+            with self._lock:
+                if len(self._filtered) >= MAX_CACHED_FILTERS:
+                    self._filtered.clear()
+                self._filtered[cache_key] = keys
+        return keys
+
+
+class FarmSearch:
+    """Answers ``FarmQuery`` objects against the latest version of a farm list.
+
+    ``snapshot`` returns ``(version, farms)``; the index is rebuilt only when
+    the version changes.
+    """
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+        self._index = (None, None)
+
+    def search(self, query):
+        version, farms = self._snapshot()
+        current_version, index = self._index
+        if index is None or current_version != version:
+            index = FarmIndex(farms)
+            self._index = (version, index)
+        return index.search(query)
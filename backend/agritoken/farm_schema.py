@@ -0,0 +1,190 @@
+"""The canonical shape of a stored farm record.
+
+Farms arrive in many shapes: the tokenize form, the FastAPI create call and
+older files each use a different subset of fields (``ASA ID`` or
+``Asset ID``, ``Farm Email`` or ``Farmer Email``, no APY, ...). They are
+brought into one shape when they are written, so readers can serve stored
+records as they are:
+
+* every field the frontend's FarmData expects is present, with the same
+  fallbacks and defaults ``GET /farms`` used to fill in per request
+* ``ASA ID`` and ``Asset ID`` are the same string (``"unknown"`` until the
+  asset exists)
+* any other fields the record carried are kept after those
+* ``Schema Version`` marks the record as canonical
+
+``GET /farms`` serves only the ``FARM_FIELDS`` of each record
+(``public_farm``), the fixed set it has always returned.
+
+Records written before this are brought into the schema when they are
+read, and cached in that form. Rewriting the files themselves is a
+migration step run by hand:
+
+    python -m agritoken.farm_schema ../data
+"""
+import os
+
+from agritoken.storage import atomic_write_json, locked, read_json
+
+SCHEMA_KEY = "Schema Version"
+SCHEMA_VERSION = 1
+
+# File metrics label for the farm directory, rather than one per farm file
+FARM_FILE_LABEL = "farm_info/*.json"
+
+
+def canonical_farm(farm):
+    """Return ``farm`` in the canonical schema; extra fields are kept"""
+    asset_id = farm.get("Asset ID")
+    if asset_id is None:
+        asset_id = farm.get("ASA ID")
+    asset_id = "unknown" if asset_id is None else str(asset_id)
+    canonical = {
+        "Farm ID": farm.get("Farm ID", f"farm_{asset_id}"),
+        "Farm Name": farm.get("Farm Name", "Unknown Farm"),
+        "Farmer Name": farm.get("Farmer Name", "Unknown Farmer"),
+        "Farmer Email": farm.get("Farmer Email", farm.get("Farm Email", "unknown@example.com")),
+        "Farm Email": farm.get("Farm Email", farm.get("Farmer Email", "unknown@example.com")),
+        "Farm Phone": farm.get("Farm Phone", ""),
+        "Farm Size (Acres)": farm.get("Farm Size (Acres)", 100),
+        "Crop Type": farm.get("Crop Type", "Unknown"),
+        "Farm Location": farm.get("Farm Location", "Unknown Location"),
+        "Number of Tokens": farm.get("Number of Tokens", 0),
+        "Tokens Sold": farm.get("Tokens Sold", 0),
+        "Tokens Available": farm.get("Tokens Available", farm.get("Number of Tokens", 0)),
+        "Price per Token (USD)": farm.get("Price per Token (USD)", 1.0),
+        "ASA ID": asset_id,
+        "Asset ID": asset_id,
+        "Est. APY": farm.get("Est. APY", 12.5),
+        "Harvest Date": farm.get("Harvest Date", "2024-12-31"),
+        "Farm Status": farm.get("Farm Status", "Active"),
+        # Required by FarmData interface
+        "Token Name": farm.get("Token Name", farm.get("Token Unit", "TOKEN")),
+        "Token Unit": farm.get("Token Unit", ""),
+        "Expected Yield /unit": farm.get("Expected Yield /unit", 1000),
+        "Payout Method": farm.get("Payout Method", "ALGO"),
+        "Insurance Enabled": farm.get("Insurance Enabled", True),
+        "Insurance Type": farm.get("Insurance Type", "Parametric Weather-Based"),
+        "Verification Method": farm.get("Verification Method", "Self-Reported"),
+        "Farm Images": farm.get("Farm Images", []),
+        "Local Currency": farm.get("Local Currency", "USD"),
+        "Wallet Address": farm.get("Wallet Address", ""),
+        "Transaction ID": farm.get("Transaction ID", ""),
+        "Blockchain": farm.get("Blockchain", "Algorand Testnet"),
+        "Contract Address": farm.get("Contract Address", ""),
+        "created_at": farm.get("created_at", "")
+    }
+    for key, value in farm.items():
+        if key not in canonical:
+            canonical[key] = value
+    canonical[SCHEMA_KEY] = SCHEMA_VERSION
+    return canonical
+
+
+# The fields every canonical record has, in order, without the schema marker
+FARM_FIELDS = tuple(key for key in canonical_farm({}) if key != SCHEMA_KEY)
+
+
+def public_farm(farm):
+    """``farm`` as the read endpoints serve it: canonical, with only ``FARM_FIELDS``"""
+    farm = ensure_canonical(farm)
+    return {key: farm[key] for key in FARM_FIELDS}
+
+
+def is_canonical(farm):
+    return farm.get(SCHEMA_KEY) == SCHEMA_VERSION
+
+
+def ensure_canonical(farm):
+    """``farm`` itself if it is already canonical, else its canonical form"""
+    return farm if is_canonical(farm) else canonical_farm(farm)
+
+
+def merge_farm(farm, updates):
+    """Apply ``updates`` to a stored farm and return the canonical result.
+
+    A new Asset ID (e.g. once a pending tokenization confirms) replaces both
+    ID aliases, and a placeholder ``farm_unknown`` Farm ID is derived again
+    from it.
+    """
+    merged = dict(ensure_canonical(farm))
+    asset_id = updates.get("Asset ID", updates.get("ASA ID"))
+    if asset_id is not None:
+        if merged["Farm ID"] == "farm_unknown":
+            del merged["Farm ID"]
+        merged["ASA ID"] = merged["Asset ID"] = asset_id
+    merged.update(updates)
+    return canonical_farm(merged)
+
+
+def upgrade_document(data):
+    """Return ``(document, upgraded)`` for one parsed farm_info file.
+
+    The file keeps its layout (a ``{"farms": [...]}`` list, a bare list or a
+    single farm); only the farm records in it are rewritten.
+    """
+    if isinstance(data, dict) and isinstance(data.get("farms"), list):
+        farms, upgraded = _upgrade_list(data["farms"])
+        return ({**data, "farms": farms} if upgraded else data), upgraded
+    if isinstance(data, dict) and "Farm Name" in data:
+        if is_canonical(data):
+            return data, 0
+        return canonical_farm(data), 1
+    if isinstance(data, list):
+        farms, upgraded = _upgrade_list(data)
+        return (farms if upgraded else data), upgraded
+    return data, 0
+
+
+def _upgrade_list(farms):
+    upgraded = 0
+    out = []
+    for farm in farms:
+        if isinstance(farm, dict) and not is_canonical(farm):
+            farm = canonical_farm(farm)
+            upgraded += 1
+        out.append(farm)
+    return out, upgraded
+
+
+def upgrade_farm_file(path):
+    """Rewrite the legacy farms in one file under its lock; returns how many"""
+    with locked(path):
+        try:
+            data = read_json(path, FARM_FILE_LABEL)
+        except FileNotFoundError:
+            return 0
+        except ValueError as e:
+            print(f"Skipping {os.path.basename(path)}: {e}")
+            return 0
+        data, upgraded = upgrade_document(data)
+        if upgraded:
+            atomic_write_json(path, data, FARM_FILE_LABEL)
+    return upgraded
+
+
+def upgrade_farm_dir(farm_dir):
+    """Upgrade every ``*.json`` file in ``farm_dir``; returns farms rewritten"""
+    if not os.path.isdir(farm_dir):
+        return 0
+    upgraded = 0
+    for filename in sorted(os.listdir(farm_dir)):
+        if filename.endswith('.json'):
+            upgraded += upgrade_farm_file(os.path.join(farm_dir, filename))
+    return upgraded
+
+
+def main():
+    import argparse
+
+    from agritoken.backends import open_backend
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('data_root', help='directory holding farm_info/ (AGRITOKEN_STORAGE picks the backend)')
+    args = parser.parse_args()
+    upgraded = open_backend(args.data_root).upgrade_farms()
+    print(f"Upgraded {upgraded} farm records to schema version {SCHEMA_VERSION}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""Append-only ledger for ``investor_holdings.json``.
+
+The JSON file stays the snapshot and new purchases are appended to
+``investor_holdings.log`` (see ``agritoken.ledger``), so a trade costs O(1)
+instead of rewriting every holding. Per-investor portfolio totals are kept
+alongside (see ``agritoken.portfolio``).
+"""
+from agritoken.ledger import JsonLedger
+from agritoken.portfolio import PortfolioBook
+
+
+def holdings_from_data(data):
+    """Pull holdings out of either the list or {"holdings": [...]} layout"""
+    # Handle both formats: direct array or wrapped in "holdings" property
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and isinstance(data.get("holdings"), list):
+        return data["holdings"]
+    return []
+
+
+def _mark_to_market(holding, price):
+    holding["Est. Value"] = holding["Tokens Owned"] * price
+    holding["P&L"] = holding["Est. Value"] - holding["Cost Basis"]
+    holding["P&L Percentage"] = (holding["P&L"] / holding["Cost Basis"]) * 100 if holding["Cost Basis"] > 0 else 0
+
+
+def apply_purchase(holding, tokens, cost, price):
+    """Top up an existing position and recompute its value and P&L"""
+    holding["Tokens Owned"] += tokens
+    holding["Cost Basis"] += cost
+    _mark_to_market(holding, price)
+
+
+def apply_price(holding, price):
+    """Revalue a holding at a new token price"""
+    holding["Token Price"] = price
+    _mark_to_market(holding, price)
+
+
+def apply_payout(holding, per_token, date):
+    """Credit a payout of ``per_token`` USD per token owned"""
+    amount = round(holding.get("Tokens Owned", 0) * per_token, 2)
+    holding["Total Payouts Received"] = round(holding.get("Total Payouts Received", 0) + amount, 2)
+    holding["Last Payout"] = date
+
+
+def apply_adjustment(holding, tokens):
+    """Add ``tokens`` (may be negative) and revalue at the holding's token price"""
+    held = holding.get("Tokens Owned", 0)
+    price = holding.get("Token Price") or (holding.get("Est. Value", 0) / held if held else 0)
+    holding["Tokens Owned"] = held + tokens
+    _mark_to_market(holding, price)
+
+
+def _position_key(investor_email, farm_id):
+    return ((investor_email or "").lower(), farm_id)
+
+
+class HoldingsStore(JsonLedger):
+    """Investor holdings backed by a JSON snapshot and a JSON-lines log.
+
+    Log records are operations rather than row images, so replaying them in
+    order gives the same result no matter which server appended them:
+
+    * ``{"op": "add", "holding": {...}}`` appends a new holding row.
+    * ``{"op": "purchase", ...}`` tops up the investor's existing position in
+      a farm, or appends ``holding`` when there is none yet.
+    * ``{"op": "update", "transaction_id": ..., "fields": {...}}`` sets fields
+      on the holdings linked to an on-chain transfer.
+    * ``{"op": "price", "farm_id": ..., "price": ...}`` revalues every holding
+      in a farm at a new token price.
+    * ``{"op": "payout", "farm_id": ..., "per_token": ..., "date": ...}``
+      credits a payout to every holding in a farm.
+    * ``{"op": "adjust", "investor_email": ..., "farm_id": ..., "tokens": ...}``
+      corrects the token count of an investor's position, e.g. to match the
+      on-chain balance (see ``agritoken.reconcile``).
+
+    Rows handed out are copies, as with the SQLite store: replaying later
+    records changes the store's own rows in place.
+    """
+
+    name = "investor holdings"
+
+    def all(self):
+        """Return every holding row in insertion order"""
+        with self._lock:
+            self._refresh()
+            return [dict(holding) for holding in self._holdings]
+
+    def snapshot(self):
+        """Return ``(version, holdings)``; the version changes whenever state does"""
+        with self._lock:
+            self._refresh()
+            return self._version, [dict(holding) for holding in self._holdings]
+
+    def for_investor(self, investor_email):
+        with self._lock:
+            self._refresh()
+            return [dict(self._holdings[i]) for i in self._by_investor.get((investor_email or "").lower(), [])]
+
+    def for_farm(self, farm_id):
+        with self._lock:
+            self._refresh()
+            return [dict(self._holdings[i]) for i in self._by_farm.get(farm_id, [])]
+
+    def portfolio(self, investor_email):
+        """Totals and per-farm positions for one investor"""
+        with self._lock:
+            self._refresh()
+            return self._book.payload(investor_email)
+
+    def add(self, holding):
+        """Append a new holding row"""
+        self._append({"op": "add", "holding": holding})
+        return holding
+
+    def record_purchase(self, investor_email, farm_id, tokens, cost, price, holding):
+        """Add tokens to an investor's position, creating it from ``holding`` if needed"""
+        record = {
+            "op": "purchase",
+            "investor_email": investor_email,
+            "farm_id": farm_id,
+            "tokens": tokens,
+            "cost": cost,
+            "price": price,
+            "holding": holding,
+        }
+        self._append(record)
+        with self._lock:
+            position = self._by_position.get(_position_key(investor_email, farm_id))
+            return dict(self._holdings[position]) if position is not None else holding
+
+    def update_by_transaction(self, transaction_id, fields):
+        """Set fields on every holding whose Transaction ID matches"""
+        self._append({"op": "update", "transaction_id": transaction_id, "fields": fields})
+
+    def reprice_farm(self, farm_id, price):
+        """Revalue every holding in ``farm_id`` at ``price`` per token"""
+        self._append({"op": "price", "farm_id": farm_id, "price": price})
+
+    def record_payout(self, farm_id, per_token, date):
+        """Credit ``per_token`` USD per token owned to every holding in ``farm_id``"""
+        self._append({"op": "payout", "farm_id": farm_id, "per_token": per_token, "date": date})
+
+    def adjust_position(self, investor_email, farm_id, tokens):
+        """Add ``tokens`` (may be negative) to an investor's existing position"""
+        self._append({"op": "adjust", "investor_email": investor_email, "farm_id": farm_id, "tokens": tokens})
+
+    def _load_state(self, data):
+        self._holdings = []
+        self._by_position = {}
+        self._by_investor = {}
+        self._by_farm = {}
+        self._by_transaction = {}
+        self._book = PortfolioBook()
+        for holding in holdings_from_data(data):
+            self._insert(holding)
+
+    def _insert(self, holding):
+        index = len(self._holdings)
+        self._holdings.append(holding)
+        email = holding.get("Investor Email", "")
+        farm_id = holding.get("Farm ID")
+        self._by_position.setdefault(_position_key(email, farm_id), index)
+        self._by_investor.setdefault((email or "").lower(), []).append(index)
+        self._by_farm.setdefault(farm_id, []).append(index)
+        if holding.get("Transaction ID"):
+            self._by_transaction.setdefault(holding["Transaction ID"], []).append(index)
+        self._book.add(holding)
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "add":
+            self._insert(record["holding"])
+        elif op == "purchase":
+            position = self._by_position.get(_position_key(record["investor_email"], record["farm_id"]))
+            if position is None:
+                self._insert(record["holding"])
+                return
+            self._change(position, apply_purchase, record["tokens"], record["cost"], record["price"])
+        elif op == "update":
+            for index in self._by_transaction.get(record["transaction_id"], []):
+                self._change(index, dict.update, record["fields"])
+        elif op == "price":
+            for index in self._by_farm.get(record["farm_id"], []):
+                self._change(index, apply_price, record["price"])
+        elif op == "payout":
+            for index in self._by_farm.get(record["farm_id"], []):
+                self._change(index, apply_payout, record["per_token"], record["date"])
+        elif op == "adjust":
+            position = self._by_position.get(_position_key(record["investor_email"], record["farm_id"]))
+            if position is not None:
+                self._change(position, apply_adjustment, record["tokens"])
+        else:
+            raise KeyError(f"unknown op {op!r}")
+
+    def _change(self, index, mutate, *args):
+        # Swap the row's old figures for its new ones in the portfolio totals
+        holding = self._holdings[index]
+        self._book.remove(holding)
+        try:
+            mutate(holding, *args)
+        finally:
+            self._book.add(holding)
+
+    def _snapshot_data(self):
+        return self._holdings
@@ -0,0 +1,152 @@
+"""Versioned JSON responses with strong ETags and precompressed bodies.
+
+Polled endpoints hand ``ResponseCache.serve`` a cache key, a cheap
+``version_of()`` (the store's write counter or file signature) and a
+``render()`` that builds the payload. While the version stays the same the
+serialized body, its ETag and its gzip/brotli encodings are reused, so a
+steady-state poll costs a version check and, with ``If-None-Match``, a
+bodiless ``304``.
+
+The ETag is a digest of the body rather than the version counter, so it
+stays strong and comparable across worker processes whose counters differ.
+Each content coding is a different representation with different bytes,
+so the gzip and brotli bodies get their own tags (``"<digest>-gzip"``,
+``"<digest>-br"``). ``If-None-Match`` may name any of them: they all stand
+for the same payload.
+
+Brotli is used when the ``brotli`` package is installed; otherwise only
+gzip is offered.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from agritoken import codec
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    raise ValueError(f"unsupported encoding {encoding!r}")
+
+
+def negotiate_encoding(accept_encoding, size):
+    """Pick ``br``, ``gzip`` or None (identity) from an Accept-Encoding header"""
+    if size < MIN_COMPRESS_BYTES or not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(name.strip().lower())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def etag_matches(if_none_match, etags):
+    """Weak comparison of an If-None-Match header against any of ``etags``"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
+
+
+class CachedResponse:
+    """One serialized body plus the encodings requested so far"""
+
+    def __init__(self, payload, headers=None):
+        self.body = codec.dumps(payload)
+        self.digest = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        self.etag = '"%s"' % self.digest
+        self.headers = headers or {}
+        self._encoded = {}
+
+    def etag_for(self, encoding):
+        """The strong ETag of the body in ``encoding`` (None for identity)"""
+        if encoding is None:
+            return self.etag
+        return '"%s-%s"' % (self.digest, encoding)
+
+    @property
+    def etags(self):
+        """Every ETag this payload may have been served under"""
+        return {self.etag, self.etag_for('gzip'), self.etag_for('br')}
+
+    def encoded(self, encoding):
+        """The body in ``encoding`` (None for identity), compressed at most once"""
+        if encoding is None:
+            return self.body
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded.setdefault(encoding, compress(self.body, encoding))
+        return data
+
+
+class ResponseCache:
+    """Latest ``CachedResponse`` per key, for the ``max_entries`` most recent keys"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version, CachedResponse)
+        self._lock = threading.Lock()
+
+    def get(self, key, version, render):
+        """Return the response for ``key`` at ``version``, calling ``render`` on a miss.
+
+        ``render()`` returns ``(payload, headers)``.
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == version:
+                self._entries.move_to_end(key)
+                return cached[1]
+        payload, headers = render()
+        entry = CachedResponse(payload, headers)
+        with self._lock:
+            self._entries[key] = (version, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def serve(self, key, version_of, render, if_none_match=None, accept_encoding=None):
+        """Return ``(status, body, headers)`` for a conditional, compressible GET"""
+        entry = self.get(key, version_of(), render)
+        encoding = negotiate_encoding(accept_encoding, len(entry.body))
+        headers = dict(entry.headers)
+        headers['ETag'] = entry.etag_for(encoding)
+        headers['Cache-Control'] = 'no-cache'
+        headers['Vary'] = 'Accept-Encoding'
+        if etag_matches(if_none_match, entry.etags):
+            return 304, b"", headers
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        return 200, entry.encoded(encoding), headers
@@ -0,0 +1,220 @@
+"""Replay-safe chain endpoints through ``Idempotency-Key``.
+
+A client that retries a slow ``/tokenize_farm`` or ``/transfer_assets``
+must not create a second asset or send tokens twice. When the request
+carries an ``Idempotency-Key`` header, ``IdempotencyCache.run`` executes it
+at most once per key:
+
+* a key that already completed replays the stored status and body
+* a duplicate that arrives while the original is still running in the same
+  process attaches to it (single-flight) and returns the same result once
+  it finishes, waiting at most ``join_timeout``. A duplicate whose original
+  runs in another worker process, or outlasts that wait, gets
+  ``IdempotencyInFlight`` (409 with Retry-After) rather than holding a
+  request thread
+* a key reused with a different request body is a conflict
+
+Results are kept in ``IdempotencyStore``, a ledger (see
+``agritoken.ledger``) shared by every worker process, for ``ttl`` seconds.
+Expired entries are skipped on lookup and dropped when the ledger compacts.
+Server errors (5xx) and 429s are not stored, so the client can retry them.
+
+A request claims its key with a lease of ``pending_timeout`` seconds
+before running; if the process dies mid-request the key frees up once the
+lease runs out.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+
+from agritoken.ledger import JsonLedger
+
+PENDING = "pending"
+DONE = "done"
+
+# Outcomes, as counted in agritoken.metrics
+EXECUTED = "executed"
+REPLAYED = "replayed"
+JOINED = "joined"
+CONFLICT = "conflict"
+IN_FLIGHT = "in_flight"
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request"""
+
+
+class IdempotencyInFlight(Exception):
+    """The request holding the key has not finished yet"""
+
+    def __init__(self, key, retry_after=1.0):
+        super().__init__(key)
+        self.retry_after = retry_after
+
+    def retry_after_header(self):
+        """Whole seconds for a ``Retry-After`` header"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def fingerprint(*parts):
+    """Digest of a request's method, path and raw body (``str`` or ``bytes`` parts)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class IdempotencyStore(JsonLedger):
+    """Claimed and completed keys backed by a JSON snapshot and a JSON-lines log.
+
+    * ``{"op": "begin", "key", "fingerprint", "expires"}`` claims a key
+    * ``{"op": "done", "key", "fingerprint", "status", "body", "expires"}``
+      stores its result
+    * ``{"op": "release", "key"}`` frees a key whose request failed
+    """
+
+    name = "idempotency keys"
+
+    def claim(self, key, request_fingerprint, lease):
+        """Claim ``key`` for one request; returns None, or the entry already holding it"""
+        with self._transaction():
+            entry = self._live(key)
+            if entry is not None:
+                return entry
+            self._append({"op": "begin", "key": key, "fingerprint": request_fingerprint,
+                          "expires": time.time() + lease})
+            return None
+
+    def complete(self, key, request_fingerprint, status, body, ttl):
+        self._append({"op": "done", "key": key, "fingerprint": request_fingerprint,
+                      "status": status, "body": body, "expires": time.time() + ttl})
+
+    def release(self, key):
+        self._append({"op": "release", "key": key})
+
+    def _live(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry["expires"] <= time.time():
+            del self._entries[key]
+            return None
+        return entry
+
+    def _load_state(self, data):
+        self._entries = {}
+        entries = data.get("entries", {}) if isinstance(data, dict) else {}
+        now = time.time()
+        for key, entry in entries.items():
+            if entry.get("expires", 0) > now:
+                self._entries[key] = entry
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "begin":
+            entry = {"state": PENDING}
+        elif op == "done":
+            entry = {"state": DONE, "status": record["status"], "body": record["body"]}
+        elif op == "release":
+            self._entries.pop(record["key"], None)
+            return
+        else:
+            raise KeyError(f"unknown op {op!r}")
+        entry["fingerprint"] = record["fingerprint"]
+        entry["expires"] = record["expires"]
+        self._entries[record["key"]] = entry
+
+    def _snapshot_data(self):
+        # Compaction is where expired keys are evicted, here as well as on disk
+        now = time.time()
+        self._entries = {key: entry for key, entry in self._entries.items() if entry["expires"] > now}
+        return {"entries": self._entries}
+
+
+class _Flight:
+    """A request running in this process, for duplicates to wait on"""
+
+    __slots__ = ("fingerprint", "done", "result")
+
+    def __init__(self, request_fingerprint):
+        self.fingerprint = request_fingerprint
+        self.done = threading.Event()
+        self.result = None
+
+
+class IdempotencyCache:
+    """Runs each keyed request once and hands its result to every duplicate"""
+
+    def __init__(self, store, ttl=86400.0, pending_timeout=300.0, join_timeout=10.0, retry_after=1.0):
+        self.store = store
+        self.ttl = ttl
+        self.pending_timeout = pending_timeout
+        self.join_timeout = join_timeout
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    @classmethod
+    def from_environment(cls, data_root):
+        """Keys under ``data_root``, kept for AGRITOKEN_IDEMPOTENCY_TTL seconds (default a day)"""
+        return cls(
+            IdempotencyStore(os.path.join(data_root, "idempotency_keys.json")),
+            ttl=float(os.getenv("AGRITOKEN_IDEMPOTENCY_TTL", 86400)),
+        )
+
+    def run(self, key, request_fingerprint, execute):
+        """``(status, body, outcome)`` for the request; ``execute()`` returns ``(status, body)``
+
+        Raises ``IdempotencyConflict`` when ``key`` belongs to a different
+        request and ``IdempotencyInFlight`` when its request is still running.
+        """
+        while True:
+            # The lock only guards the flight map; the ledger is claimed outside it
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight(request_fingerprint)
+            if leader:
+                break
+            if flight.fingerprint != request_fingerprint:
+                raise IdempotencyConflict(key)
+            if not flight.done.wait(self.join_timeout):
+                raise IdempotencyInFlight(key, self.retry_after)
+            if flight.result is not None:
+                return flight.result + (JOINED,)
+            # The original raised or found the key taken; go round and look again
+
+        try:
+            entry = self.store.claim(key, request_fingerprint, self.pending_timeout)
+        except BaseException:
+            self._land(key, flight, None)
+            raise
+        if entry is not None:
+            self._land(key, flight, None)
+            if entry["fingerprint"] != request_fingerprint:
+                raise IdempotencyConflict(key)
+            if entry["state"] == DONE:
+                return entry["status"], entry["body"], REPLAYED
+            # Running in another worker process
+            raise IdempotencyInFlight(key, self.retry_after)
+
+        try:
+            status, body = execute()
+        except BaseException:
+            self.store.release(key)
+            self._land(key, flight, None)
+            raise
+        if status >= 500 or status == 429:
+            self.store.release(key)
+        else:
+            self.store.complete(key, request_fingerprint, status, body, self.ttl)
+        self._land(key, flight, (status, body))
+        return status, body, EXECUTED
+
+    def _land(self, key, flight, result):
+        flight.result = result
+        with self._lock:
+            self._flights.pop(key, None)
+        flight.done.set()
@@ -0,0 +1,164 @@
+"""Snapshot-plus-log persistence shared by the holdings and user stores.
+
+A JSON file is the snapshot. Writes are appended as one JSON line each to a
+sibling ``.log`` file, so a write costs O(1) instead of rewriting the whole
+file. Readers rebuild state by replaying the snapshot plus the log tail, and
+only read log bytes they have not seen yet. Once the tail grows past
+``compact_every`` records it is folded back into the snapshot.
+
+Appends and compaction hold the snapshot's cross-process lock (see
+``agritoken.storage``), so several worker processes can share one ledger
+without losing records to a concurrent compaction.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from agritoken import codec
+from agritoken.storage import atomic_write_bytes, atomic_write_json, locked, read_json, record_io
+
+
+class JsonLedger:
+    """Base class for stores backed by a JSON snapshot and a JSON-lines log.
+
+    Subclasses implement ``_load_state`` (rebuild from the parsed snapshot,
+    ``None`` when there is none), ``_apply`` (replay one log record) and
+    ``_snapshot_data`` (what compaction writes back).
+    """
+
+    name = "ledger"
+
+    def __init__(self, snapshot_path, log_path=None, compact_every=1000):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path or os.path.splitext(snapshot_path)[0] + '.log'
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._snapshot_sig = None
+        self._log_ino = None
+        self._log_offset = 0
+        self._tail_records = 0
+        self._version = 0
+        self._reset(None)
+
+    def exists(self):
+        return os.path.exists(self.snapshot_path) or os.path.exists(self.log_path)
+
+    def version(self):
+        """Counter that changes whenever the replayed state does"""
+        with self._lock:
+            self._refresh()
+            return self._version
+
+    def compact(self):
+        """Fold the log into the snapshot and start an empty log"""
+        with self._transaction():
+            atomic_write_json(self.snapshot_path, self._snapshot_data())
+            # A fresh inode tells other processes to reload rather than seek
+            atomic_write_bytes(self.log_path, b"")
+            self._snapshot_sig = self._signature(self.snapshot_path)
+            self._log_ino = self._signature(self.log_path)[0]
+            self._log_offset = 0
+            self._tail_records = 0
+
+    def _load_state(self, data):
+        raise NotImplementedError
+
+    def _apply(self, record):
+        raise NotImplementedError
+
+    def _snapshot_data(self):
+        raise NotImplementedError
+
+    @contextmanager
+    def _transaction(self):
+        """Hold the thread and process locks with state caught up to disk"""
+        with self._lock, locked(self.snapshot_path):
+            self._refresh()
+            yield
+
+    def _append(self, record):
+        line = codec.dumps(record) + b"\n"
+        with self._transaction():
+            os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+            # A single O_APPEND write keeps each record contiguous in the log
+            started = time.perf_counter()
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+            record_io('append', self.log_path, len(line), started)
+            self._refresh()
+            if self._tail_records >= self.compact_every:
+                self.compact()
+
+    def _refresh(self):
+        snapshot_sig = self._signature(self.snapshot_path)
+        if snapshot_sig != self._snapshot_sig:
+            self._reload()
+            return
+        log_sig = self._signature(self.log_path)
+        if log_sig is None:
+            if self._log_offset:
+                self._reload()
+            return
+        # A log that was replaced or truncated means another writer compacted
+        if log_sig[0] != self._log_ino or log_sig[1] < self._log_offset:
+            self._reload()
+        elif log_sig[1] > self._log_offset:
+            self._read_tail()
+
+    def _reload(self):
+        # Shared lock: never pair a new snapshot with a log about to be emptied
+        with locked(self.snapshot_path, shared=True):
+            self._snapshot_sig = self._signature(self.snapshot_path)
+            self._reset(self._read_snapshot())
+            self._log_offset = 0
+            self._tail_records = 0
+            log_sig = self._signature(self.log_path)
+            self._log_ino = log_sig[0] if log_sig else None
+            if log_sig is not None:
+                self._read_tail()
+
+    def _read_snapshot(self):
+        try:
+            return read_json(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error reading {self.name}: {e}")
+            return None
+
+    def _read_tail(self):
+        started = time.perf_counter()
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            chunk = f.read()
+        record_io('read', self.log_path, len(chunk), started)
+        # Only consume complete lines; a partial one is picked up next time
+        end = chunk.rfind(b"\n") + 1
+        for raw in chunk[:end].splitlines():
+            if not raw.strip():
+                continue
+            try:
+                self._version += 1
+                self._apply(codec.loads(raw))
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                print(f"Skipping bad {self.name} log record: {e}")
+                continue
+            self._tail_records += 1
+        self._log_offset += end
+
+    def _reset(self, data):
+        self._version += 1
+        self._load_state(data)
+
+    @staticmethod
+    def _signature(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
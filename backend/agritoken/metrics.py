@@ -0,0 +1,291 @@
+"""Prometheus-style metrics shared by the Flask and FastAPI servers.
+
+Counters, gauges and histograms are recorded into per-thread shards: the
+hot path only touches a dict owned by the calling thread, so no lock is
+taken per observation. ``render()`` sums the shards into the Prometheus
+text exposition format served on ``/metrics``. Shards of threads that have
+exited (Flask's per-request threads, short-lived executors) are folded into
+a retired total when metrics are rendered, so nothing is lost and the shard
+list does not grow without bound.
+
+Every worker process keeps its own registry; scrape each worker, as with
+any multi-process Prometheus setup.
+
+Recorded here:
+
+* ``agritoken_http_request_duration_seconds``: per app, method, route and status
+* ``agritoken_http_requests_in_flight``: per app
+* ``agritoken_file_io_seconds`` and ``agritoken_file_io_bytes_total``: JSON
+  data file reads and writes, per operation and file
+* ``agritoken_algod_phase_seconds``: suggested params, signing, submission
+  and confirmation waits
+* ``agritoken_algod_request_seconds``: every HTTP call to algod, per route
+* ``agritoken_submit_queue_depth``, ``agritoken_submit_wait_seconds``,
+  ``agritoken_submit_retries_total`` and ``agritoken_submit_rejected_total``:
+  the algod submission scheduler (see ``agritoken.submission``)
+* ``agritoken_idempotent_requests_total``: requests with an ``Idempotency-Key``,
+  per route and outcome (executed, replayed, joined, conflict)
+"""
+import threading
+import time
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; wide enough for a cached GET and a multi-round confirmation wait
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Shards:
+    """One values dict per thread, plus the folded totals of exited threads"""
+
+    def __init__(self, merge):
+        self._merge = merge
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._live = []  # (thread, values)
+        self._retired = {}
+
+    def mine(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._live.append((threading.current_thread(), values))
+            return values
+
+    def collect(self):
+        """Sum of every shard as ``{labels: value}``"""
+        with self._lock:
+            live = []
+            for thread, values in self._live:
+                if thread.is_alive():
+                    live.append((thread, values))
+                else:
+                    # The thread is gone, so nothing writes to its shard any more
+                    self._merge_into(self._retired, values)
+            self._live = live
+            totals = {}
+            self._merge_into(totals, self._retired)
+            for _, values in live:
+                self._merge_into(totals, values)
+        return totals
+
+    def _merge_into(self, totals, values):
+        # list() copies the items in one step even while the owner writes
+        for labels, value in list(values.items()):
+            totals[labels] = self._merge(totals.get(labels), value)
+
+
+def _add(total, value):
+    return value if total is None else total + value
+
+
+def _add_rows(total, row):
+    row = list(row)
+    return row if total is None else [a + b for a, b in zip(total, row)]
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _check(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {labels}")
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._shards = _Shards(_add)
+
+    def inc(self, *labels, amount=1):
+        values = self._shards.mine()
+        values[labels] = values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self._shards.collect().items()):
+            self._check(labels)
+            yield self.name, labels, value
+
+
+class Gauge(Counter):
+    """Up/down gauge; each thread's increments and decrements sum to the value"""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram, labels):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._start, *self._labels)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _Shards(_add_rows)
+
+    def observe(self, value, *labels):
+        values = self._shards.mine()
+        row = values.get(labels)
+        if row is None:
+            # One count per bucket plus +Inf, then sum and count
+            row = values[labels] = [0] * (len(self.buckets) + 3)
+        row[bisect_left(self.buckets, value)] += 1
+        row[-2] += value
+        row[-1] += 1
+
+    def time(self, *labels):
+        """Context manager observing the seconds spent inside it"""
+        return _Timer(self, labels)
+
+    def samples(self):
+        for labels, row in sorted(self._shards.collect().items()):
+            self._check(labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), row):
+                cumulative += count
+                yield f"{self.name}_bucket", labels + (_format_bound(bound),), cumulative, "le"
+            yield f"{self.name}_sum", labels, row[-2]
+            yield f"{self.name}_count", labels, row[-1]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Every metric in the Prometheus text format, as bytes"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample in metric.samples():
+                name, labels, value = sample[:3]
+                names = metric.labelnames + ((sample[3],) if len(sample) > 3 else ())
+                lines.append(f"{name}{_format_labels(names, labels)} {_format_value(value)}")
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _escape_help(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "agritoken_http_request_duration_seconds",
+    "Time to handle an HTTP request, by route template",
+    ("app", "method", "endpoint", "status"),
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "agritoken_http_requests_in_flight",
+    "Requests currently being handled",
+    ("app",),
+)
+FILE_IO_SECONDS = REGISTRY.histogram(
+    "agritoken_file_io_seconds",
+    "Time spent reading or writing a JSON data file",
+    ("op", "file"),
+)
+FILE_IO_BYTES = REGISTRY.counter(
+    "agritoken_file_io_bytes_total",
+    "Bytes read from or written to JSON data files",
+    ("op", "file"),
+)
+ALGOD_PHASE_SECONDS = REGISTRY.histogram(
+    "agritoken_algod_phase_seconds",
+    "Time spent in each step of an Algorand transaction",
+    ("phase",),
+)
+ALGOD_REQUEST_SECONDS = REGISTRY.histogram(
+    "agritoken_algod_request_seconds",
+    "Time for one HTTP call to algod, by route",
+    ("method", "route", "status"),
+)
+SUBMIT_QUEUE_DEPTH = REGISTRY.gauge(
+    "agritoken_submit_queue_depth",
+    "Transaction submissions waiting for a turn, backing off or in flight",
+)
+SUBMIT_WAIT_SECONDS = REGISTRY.histogram(
+    "agritoken_submit_wait_seconds",
+    "Time a submission waited for the rate limiter before going to algod",
+)
+SUBMIT_RETRIES = REGISTRY.counter(
+    "agritoken_submit_retries_total",
+    "Submissions retried after a transient algod error, by HTTP status",
+    ("status",),
+)
+SUBMIT_REJECTED = REGISTRY.counter(
+    "agritoken_submit_rejected_total",
+    "Submissions turned away by the scheduler, by reason",
+    ("reason",),
+)
+IDEMPOTENT_REQUESTS = REGISTRY.counter(
+    "agritoken_idempotent_requests_total",
+    "Requests carrying an Idempotency-Key, by how they were answered",
+    ("endpoint", "outcome"),
+)
+
+
+def render():
+    """The default registry in the Prometheus text format"""
+    return REGISTRY.render()
@@ -0,0 +1,85 @@
+"""One-shot copy of the JSON data files into the SQLite backend.
+
+Run from ``backend/``:
+
+    python -m agritoken.migrate ../data
+    python -m agritoken.migrate ../data --db /srv/agritoken.db --force
+
+Holdings and users are read through their ledgers, so purchases still
+sitting in the ``.log`` files are included. The JSON files are left as they
+are; switch the servers over with ``AGRITOKEN_STORAGE=sqlite``.
+"""
+import argparse
+import os
+import sys
+
+from agritoken import codec
+from agritoken.farm_catalog import extract_farms
+from agritoken.holdings_store import HoldingsStore
+from agritoken.sqlite_store import SqliteDatabase, insert_farm, insert_holding, insert_user
+from agritoken.user_store import UserStore
+
+TABLES = ("farms", "holdings", "users")
+
+
+def migrate(data_root, db_path, force=False):
+    """Load every farm, holding and user under ``data_root`` into ``db_path``.
+
+    Refuses to touch a database that already has data unless ``force`` is
+    set, in which case the tables are emptied first. Returns row counts.
+    """
+    db = SqliteDatabase(db_path)
+    counts = dict.fromkeys(TABLES, 0)
+    try:
+        with db.transaction() as conn:
+            existing = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in TABLES}
+            if any(existing.values()):
+                if not force:
+                    raise RuntimeError(f"{db_path} already has data ({existing}); use --force to replace it")
+                for table in TABLES + ("portfolio_positions",):
+                    conn.execute(f"DELETE FROM {table}")
+
+            farm_dir = os.path.join(data_root, "farm_info")
+            filenames = sorted(name for name in os.listdir(farm_dir) if name.endswith('.json')) if os.path.isdir(farm_dir) else []
+            for filename in filenames:
+                data = codec.load_file(os.path.join(farm_dir, filename))
+                for farm in extract_farms(data):
+                    if isinstance(farm, dict):
+                        insert_farm(conn, filename, farm)
+                        counts["farms"] += 1
+
+            holdings = HoldingsStore(os.path.join(data_root, "investor_holdings.json"))
+            for holding in holdings.all():
+                insert_holding(conn, holding)
+                counts["holdings"] += 1
+
+            users = UserStore(os.path.join(data_root, "user_info", "signup_info.json"))
+            for user in users.all():
+                counts["users"] += insert_user(conn, user)
+
+            for table in TABLES:
+                db.bump(conn, table)
+        db.connection().execute("ANALYZE")
+    finally:
+        db.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('data_root', help='directory holding farm_info/, investor_holdings.json and user_info/')
+    parser.add_argument('--db', help='database to create (default: <data_root>/agritoken.db)')
+    parser.add_argument('--force', action='store_true', help='replace the contents of an existing database')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(args.data_root, "agritoken.db")
+    try:
+        counts = migrate(args.data_root, db_path, force=args.force)
+    except RuntimeError as e:
+        print(f"Migration aborted: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Migrated {counts['farms']} farms, {counts['holdings']} holdings and {counts['users']} users into {db_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""Vectorized pro-rata payout simulation over investor holdings.
+
+Holdings are kept as columnar NumPy arrays (tokens owned, farm index,
+investor index) sorted by farm, so every farm's holders are one contiguous
+slice. Payouts are split in whole cents with the largest-remainder method:
+each holder gets the floor of their exact share and the leftover cents go
+to the largest fractional remainders, so the parts always add up to the
+payout exactly.
+
+Farm tokens are whole ASA units, so a ``Tokens Owned`` that is not a whole
+number is a data error. It is logged when the engine is built, and
+simulating that farm raises ``InvalidHoldings`` instead of paying a
+rounded count.
+"""
+import numpy as np
+
+# Above this, tokens * cents may not fit in int64 and we fall back to Python ints
+_INT64_SAFE = 2 ** 62
+
+
+class InvalidHoldings(ValueError):
+    """A farm has holdings whose token count is not a whole number"""
+
+    def __init__(self, farm_id, holding_ids):
+        super().__init__(f"Holdings in farm {farm_id} have a non-integral Tokens Owned: "
+                         f"{', '.join(str(h) for h in holding_ids)}")
+        self.farm_id = farm_id
+        self.holding_ids = holding_ids
+
+
+def token_count(value):
+    """``Tokens Owned`` as an int; ValueError unless it is a whole number"""
+    if value is None or value == "":
+        return 0
+    if isinstance(value, bool):
+        raise ValueError(f"not a token count: {value!r}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(f"not a whole number of tokens: {value!r}")
+    return int(number)
+
+
+def to_cents(amount):
+    return int(round(float(amount) * 100))
+
+
+def _exact_dtype(max_tokens, max_cents):
+    return np.int64 if int(max_tokens) * int(max_cents) < _INT64_SAFE else object
+
+
+def allocate_cents(tokens, total_cents):
+    """Split ``total_cents`` across ``tokens`` pro rata with largest remainder"""
+    tokens = np.asarray(tokens)
+    total_tokens = int(tokens.sum())
+    if total_tokens <= 0:
+        return np.zeros(len(tokens), dtype=np.int64)
+    dtype = _exact_dtype(tokens.max(initial=0), total_cents)
+    numer = tokens.astype(dtype) * total_cents
+    base = numer // total_tokens
+    remainder = numer % total_tokens
+    leftover = int(total_cents - base.sum())
+    # Stable sort keeps earlier holders first when remainders tie
+    order = np.argsort(-remainder.astype(np.float64), kind='stable')
+    base[order[:leftover]] += 1
+    return base.astype(np.int64)
+
+
+class PayoutEngine:
+    """Columnar snapshot of holdings that answers payout simulations"""
+
+    def __init__(self, holdings):
+        farm_ids = {}
+        investors = {}
+        farm_col = []
+        investor_col = []
+        tokens_col = []
+        self.invalid = {}
+        for holding in holdings:
+            farm_col.append(farm_ids.setdefault(holding.get("Farm ID"), len(farm_ids)))
+            email = holding.get("Investor Email", "")
+            investor_col.append(investors.setdefault(email, len(investors)))
+            try:
+                tokens_col.append(token_count(holding.get("Tokens Owned", 0)))
+            except (TypeError, ValueError) as e:
+                print(f"Warning: holding {holding.get('Holding ID')} in farm {holding.get('Farm ID')}: {e}")
+                self.invalid.setdefault(holding.get("Farm ID"), []).append(holding.get("Holding ID"))
+                tokens_col.append(0)
+
+        farm_idx = np.asarray(farm_col, dtype=np.int32)
+        order = np.argsort(farm_idx, kind='stable')
+        self.farm_idx = farm_idx[order]
+        self.investor_idx = np.asarray(investor_col, dtype=np.int32)[order]
+        self.tokens = np.asarray(tokens_col, dtype=np.int64)[order]
+        self.rows = [holdings[i] for i in order]
+
+        self.farm_ids = list(farm_ids)
+        self._farm_index = farm_ids
+        self.investor_emails = list(investors)
+        # offsets[f]:offsets[f + 1] is farm f's slice of the sorted columns
+        self.offsets = np.searchsorted(self.farm_idx, np.arange(len(self.farm_ids) + 1))
+        self.farm_tokens = np.add.reduceat(self.tokens, self.offsets[:-1]) if len(self.tokens) else np.zeros(0, dtype=np.int64)
+
+    def check(self, farm_id):
+        """Raise ``InvalidHoldings`` if any of the farm's holdings has a non-integral token count"""
+        if farm_id in self.invalid:
+            raise InvalidHoldings(farm_id, self.invalid[farm_id])
+
+    def farm_slice(self, farm_id):
+        f = self._farm_index.get(farm_id)
+        if f is None:
+            return None
+        return slice(int(self.offsets[f]), int(self.offsets[f + 1]))
+
+    def total_tokens(self, farm_id):
+        f = self._farm_index.get(farm_id)
+        return int(self.farm_tokens[f]) if f is not None else 0
+
+    def simulate(self, farm_id, payout_amount):
+        """Return per-holder payout cents for one farm, or None if it has no holders"""
+        self.check(farm_id)
+        rows = self.farm_slice(farm_id)
+        if rows is None:
+            return None
+        return allocate_cents(self.tokens[rows], to_cents(payout_amount))
+
+    def simulate_all(self, payouts):
+        """Distribute ``{farm_id: amount}`` across every farm in one pass
+
+        Returns an array of cents aligned with ``self.rows``; farms missing
+        from ``payouts`` receive nothing.
+        """
+        for farm_id in payouts:
+            self.check(farm_id)
+        n_farms = len(self.farm_ids)
+        cents = np.zeros(n_farms, dtype=np.int64)
+        for farm_id, amount in payouts.items():
+            f = self._farm_index.get(farm_id)
+            if f is not None:
+                cents[f] = to_cents(amount)
+        if not len(self.tokens):
+            return np.zeros(0, dtype=np.int64)
+
+        dtype = _exact_dtype(self.tokens.max(), cents.max(initial=0))
+        totals = np.maximum(self.farm_tokens, 1).astype(dtype)
+        row_cents = cents.astype(dtype)[self.farm_idx]
+        numer = self.tokens.astype(dtype) * row_cents
+        base = numer // totals[self.farm_idx]
+        remainder = (numer % totals[self.farm_idx]).astype(np.float64)
+        leftover = cents - np.add.reduceat(base, self.offsets[:-1]).astype(np.int64)
+        leftover[self.farm_tokens <= 0] = 0
+
+        # Rank rows by remainder within their farm; the top `leftover` get a cent
+        order = np.lexsort((np.arange(len(remainder)), -remainder, self.farm_idx))
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order)) - self.offsets[self.farm_idx[order]]
+        base = base.astype(np.int64)
+        base[rank < leftover[self.farm_idx]] += 1
+        base[self.farm_tokens[self.farm_idx] <= 0] = 0
+        return base
+
+    def simulate_scenarios(self, farm_id, payout_amounts):
+        """Simulate many payout amounts for one farm at once
+
+        Returns an ``(len(payout_amounts), holders)`` array of cents, one row
+        per scenario, or None if the farm has no holders.
+        """
+        self.check(farm_id)
+        rows = self.farm_slice(farm_id)
+        if rows is None:
+            return None
+        tokens = self.tokens[rows]
+        total_tokens = int(tokens.sum())
+        cents = np.asarray([to_cents(a) for a in payout_amounts], dtype=np.int64)
+        if total_tokens <= 0 or not len(tokens):
+            return np.zeros((len(cents), len(tokens)), dtype=np.int64)
+
+        dtype = _exact_dtype(tokens.max(), cents.max(initial=0))
+        numer = cents.astype(dtype)[:, None] * tokens.astype(dtype)[None, :]
+        base = numer // total_tokens
+        remainder = (numer % total_tokens).astype(np.float64)
+        leftover = cents - base.sum(axis=1).astype(np.int64)
+
+        order = np.argsort(-remainder, axis=1, kind='stable')
+        rank = np.empty_like(order)
+        np.put_along_axis(rank, order, np.arange(len(tokens))[None, :].repeat(len(cents), axis=0), axis=1)
+        base = base.astype(np.int64)
+        base[rank < leftover[:, None]] += 1
+        return base
+
+    def simulate_batch(self, scenarios):
+        """Run ``[(farm_id, payout_amount), ...]`` grouped by farm
+
+        Returns a list aligned with ``scenarios`` holding each scenario's
+        cents array (or None when the farm has no holders). Scenarios for a
+        farm that fails ``check`` get the ``InvalidHoldings`` error instead.
+        """
+        results = [None] * len(scenarios)
+        by_farm = {}
+        for i, (farm_id, amount) in enumerate(scenarios):
+            by_farm.setdefault(farm_id, []).append((i, amount))
+        for farm_id, items in by_farm.items():
+            try:
+                matrix = self.simulate_scenarios(farm_id, [amount for _, amount in items])
+            except InvalidHoldings as e:
+                for i, _ in items:
+                    results[i] = e
+                continue
+            if matrix is None:
+                continue
+            for row, (i, _) in enumerate(items):
+                results[i] = matrix[row]
+        return results
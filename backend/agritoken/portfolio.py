@@ -0,0 +1,116 @@
+"""Per-investor portfolio totals, kept current as holdings change.
+
+Dashboards want tokens owned, cost basis, Est. Value, P&L and payouts per
+investor and per farm. Rather than summing every holding on each request,
+the holdings stores keep a running aggregate per (investor, farm) position:
+whenever a holding row changes, its old figures are subtracted and its new
+ones added. A portfolio lookup then only touches the investor's own
+positions, however many holdings there are in total.
+
+``PortfolioBook`` is the in-memory aggregate the JSON ledger maintains; the
+SQLite backend keeps the same figures in its ``portfolio_positions`` table.
+Both render through ``portfolio_payload``.
+"""
+
+# Holding fields that are summed, in the order positions store them
+FIGURES = ("Tokens Owned", "Cost Basis", "Est. Value", "Total Payouts Received")
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def holding_figures(holding):
+    """The summed figures of one holding row, in ``FIGURES`` order"""
+    return [_number(holding.get(field, 0)) for field in FIGURES]
+
+
+def position_key(holding):
+    """``(investor email, Farm ID)`` a holding counts towards"""
+    return (holding.get("Investor Email") or "").lower(), holding.get("Farm ID") or ""
+
+
+def _money(value):
+    return round(float(value), 2)
+
+
+def _summary(tokens, cost, value, payouts):
+    pnl = value - cost
+    return {
+        "Tokens Owned": tokens,
+        "Cost Basis": _money(cost),
+        "Est. Value": _money(value),
+        "P&L": _money(pnl),
+        "P&L Percentage": round(pnl / cost * 100, 2) if cost > 0 else 0,
+        "Total Payouts Received": _money(payouts),
+    }
+
+
+def portfolio_payload(investor_email, positions):
+    """Response body for one investor.
+
+    ``positions`` yields ``(farm_id, farm_name, tokens, cost, value,
+    payouts, holdings)`` per farm the investor holds.
+    """
+    totals = [0, 0, 0, 0]
+    rows = []
+    for farm_id, farm_name, tokens, cost, value, payouts, holdings in positions:
+        figures = (tokens, cost, value, payouts)
+        for i, amount in enumerate(figures):
+            totals[i] += amount
+        rows.append({"Farm ID": farm_id, "Farm Name": farm_name, **_summary(*figures), "Holdings": holdings})
+    return {
+        "investor_email": investor_email,
+        "summary": {**_summary(*totals), "Farms": len(rows)},
+        "positions": rows,
+    }
+
+
+class PortfolioBook:
+    """Running per-position figures for every investor"""
+
+    def __init__(self):
+        # email -> {farm_id: [tokens, cost, value, payouts, holdings, farm_name]}
+        self._positions = {}
+
+    def add(self, holding):
+        self._adjust(holding, 1)
+
+    def remove(self, holding):
+        self._adjust(holding, -1)
+
+    def payload(self, investor_email):
+        """Response body for ``investor_email`` (empty when they hold nothing)"""
+        positions = self._positions.get((investor_email or "").lower(), {})
+        return portfolio_payload(investor_email, (
+            (farm_id, farm_name, tokens, cost, value, payouts, holdings)
+            for farm_id, (tokens, cost, value, payouts, holdings, farm_name) in positions.items()
+        ))
+
+    def positions(self):
+        """Every position as ``(email, farm_id, farm_name, tokens, cost, value, payouts, holdings)``"""
+        for email, positions in self._positions.items():
+            for farm_id, (tokens, cost, value, payouts, holdings, farm_name) in positions.items():
+                yield email, farm_id, farm_name, tokens, cost, value, payouts, holdings
+
+    def _adjust(self, holding, sign):
+        email, farm_id = position_key(holding)
+        positions = self._positions.setdefault(email, {})
+        position = positions.get(farm_id)
+        if position is None:
+            position = positions[farm_id] = [0, 0, 0, 0, 0, None]
+        for i, amount in enumerate(holding_figures(holding)):
+            position[i] += sign * amount
+        position[4] += sign
+        if sign > 0:
+            position[5] = holding.get("Farm Name", position[5])
+        if position[4] <= 0:
+            # Drop emptied positions rather than keep float residue around
+            del positions[farm_id]
+            if not positions:
+                del self._positions[email]
@@ -0,0 +1,323 @@
+"""Reconcile local holdings and farm token counters with on-chain balances.
+
+``investor_holdings.json`` and each farm's ``Tokens Sold`` / ``Tokens
+Available`` are kept off-chain and can drift from the ASA balances that
+tokenization and transfers actually produced. ``Reconciler`` pulls the
+holder balances of every tracked asset from an indexer, concurrently (at
+most ``concurrency`` assets in flight, each paged through with
+``next-token``), and compares them with the local records:
+
+* farm: tokens still held by the asset's creator and reserve accounts are
+  "available", the rest of the total supply is "sold"
+* holding: the tokens an investor's wallet holds versus the ``Tokens Owned``
+  summed over their local holdings in that farm
+* untracked holder: a wallet with a balance but no local holding
+
+Corrections are reported, and with ``apply`` written back through the
+storage backend. Holding corrections are only applied when the wallet
+belongs to exactly one known investor who already has a position.
+
+    python -m agritoken.reconcile ../data
+    python -m agritoken.reconcile ../data --apply --indexer http://localhost:8980
+
+The indexer defaults to Algonode TestNet and can be pointed elsewhere (for
+example a local stand-in serving fixture data) with
+``AGRITOKEN_INDEXER_ADDRESS`` and ``AGRITOKEN_INDEXER_TOKEN``.
+"""
+import asyncio
+import os
+import random
+
+import httpx
+
+from agritoken import codec
+
+DEFAULT_INDEXER_ADDRESS = "https://testnet-idx.algonode.cloud"
+
+# Statuses worth another try; anything else fails the asset straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class IndexerError(Exception):
+    pass
+
+
+class AsyncIndexer:
+    """The two indexer lookups reconciliation needs, over one async pool"""
+
+    def __init__(self, address=None, token=None, max_connections=32, page_size=1000,
+                 retries=4, timeout=30.0, transport=None):
+        address = address or os.getenv("AGRITOKEN_INDEXER_ADDRESS", DEFAULT_INDEXER_ADDRESS)
+        token = token if token is not None else os.getenv("AGRITOKEN_INDEXER_TOKEN", "")
+        self.page_size = page_size
+        self.retries = retries
+        self._http = httpx.AsyncClient(
+            base_url=address.rstrip('/'),
+            headers={"X-Indexer-API-Token": token} if token else None,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            transport=transport,
+        )
+
+    async def close(self):
+        await self._http.aclose()
+
+    async def asset_params(self, asset_id):
+        """The asset's params (``creator``, ``reserve``, ``total``, ...)"""
+        body = await self._get(f"/v2/assets/{asset_id}")
+        return body["asset"]["params"]
+
+    async def balances(self, asset_id):
+        """``{address: amount}`` for every current holder, following pagination"""
+        holders = {}
+        params = {"limit": self.page_size}
+        while True:
+            body = await self._get(f"/v2/assets/{asset_id}/balances", params)
+            for balance in body.get("balances", []):
+                if not balance.get("deleted"):
+                    holders[balance["address"]] = balance.get("amount", 0)
+            next_token = body.get("next-token")
+            if not next_token or not body.get("balances"):
+                return holders
+            params = {"limit": self.page_size, "next": next_token}
+
+    async def _get(self, path, params=None):
+        for attempt in range(self.retries + 1):
+            try:
+                resp = await self._http.get(path, params=params)
+            except httpx.TransportError as e:
+                if attempt == self.retries:
+                    raise IndexerError(f"{path}: {e}") from e
+            else:
+                if resp.status_code == 200:
+                    return codec.loads(resp.content)
+                if resp.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    raise IndexerError(f"{path}: HTTP {resp.status_code} {resp.text[:200]}")
+            # Exponential backoff with jitter so throttled workers spread out
+            await asyncio.sleep(min(8.0, 0.25 * 2 ** attempt) * (0.5 + random.random()))
+
+
+class TransactionIndexer:
+    """Blocking transaction lookups by txid, for the confirmation tracker"""
+
+    def __init__(self, address=None, token=None, timeout=10.0, transport=None):
+        address = address or os.getenv("AGRITOKEN_INDEXER_ADDRESS", DEFAULT_INDEXER_ADDRESS)
+        token = token if token is not None else os.getenv("AGRITOKEN_INDEXER_TOKEN", "")
+        self._http = httpx.Client(
+            base_url=address.rstrip('/'),
+            headers={"X-Indexer-API-Token": token} if token else None,
+            timeout=timeout,
+            transport=transport,
+        )
+
+    def close(self):
+        self._http.close()
+
+    def transaction(self, txid):
+        """algod-style ``confirmed-round``/``asset-index`` of ``txid``, or None if not indexed"""
+        try:
+            resp = self._http.get(f"/v2/transactions/{txid}")
+        except httpx.TransportError as e:
+            raise IndexerError(f"/v2/transactions/{txid}: {e}") from e
+        if resp.status_code == 404:
+            return None
+        if resp.status_code != 200:
+            raise IndexerError(f"/v2/transactions/{txid}: HTTP {resp.status_code} {resp.text[:200]}")
+        txn = codec.loads(resp.content)["transaction"]
+        return {"confirmed-round": txn.get("confirmed-round"), "asset-index": txn.get("created-asset-index")}
+
+
+class ChainAsset:
+    """Supply and holder balances of one ASA as the indexer reports them"""
+
+    def __init__(self, asset_id, params, holders):
+        self.asset_id = asset_id
+        self.total = params.get("total", 0)
+        self.issuers = {address for address in (params.get("creator"), params.get("reserve")) if address}
+        self.holders = holders
+
+    @property
+    def available(self):
+        return sum(self.holders.get(address, 0) for address in self.issuers)
+
+    @property
+    def sold(self):
+        return self.total - self.available
+
+
+class Reconciler:
+    """Compare a storage backend against the chain and correct it"""
+
+    def __init__(self, backend, indexer, concurrency=16):
+        self.backend = backend
+        self.indexer = indexer
+        self.concurrency = concurrency
+
+    async def fetch(self, asset_ids):
+        """Return ``(assets, errors)``: ChainAsset and error message by asset ID"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        assets = {}
+        errors = {}
+
+        async def fetch_one(asset_id):
+            async with semaphore:
+                try:
+                    params = await self.indexer.asset_params(asset_id)
+                    holders = await self.indexer.balances(asset_id)
+                except (IndexerError, KeyError, ValueError) as e:
+                    errors[asset_id] = str(e)
+                    return
+            assets[asset_id] = ChainAsset(asset_id, params, holders)
+
+        await asyncio.gather(*(fetch_one(asset_id) for asset_id in asset_ids))
+        return assets, errors
+
+    def tracked_farms(self):
+        """``{asset_id: [farm, ...]}`` for every listed farm with an asset"""
+        farms = {}
+        for farm in self.backend.farm_catalog.all():
+            if farm["Asset ID"] != "unknown":
+                farms.setdefault(farm["Asset ID"], []).append(farm)
+        return farms
+
+    def diff(self, farms_by_asset, assets):
+        """List the corrections needed to match ``assets``"""
+        owners = {}  # wallet address -> investor emails
+        wallet_of = {}
+        for user in self.backend.users.all():
+            address = user.get("Wallet Address")
+            if address:
+                email = (user.get("User Email") or "").lower()
+                owners.setdefault(address, set()).add(email)
+                wallet_of[email] = address
+
+        farm_assets = {farm["Farm ID"]: asset_id
+                       for asset_id, farms in farms_by_asset.items() for farm in farms}
+        # asset -> wallet -> {investor email: [Farm ID, tokens owned locally]}
+        local = {}
+        for holding in self.backend.holdings.all():
+            if holding.get("Transaction Status") == "pending":
+                continue  # not on chain yet
+            farm_id = holding.get("Farm ID")
+            asset_id = farm_assets.get(farm_id)
+            email = (holding.get("Investor Email") or "").lower()
+            address = wallet_of.get(email)
+            if asset_id not in assets or address is None:
+                continue
+            position = local.setdefault(asset_id, {}).setdefault(address, {}).setdefault(email, [farm_id, 0])
+            position[1] += holding.get("Tokens Owned", 0) or 0
+
+        corrections = []
+        for asset_id, chain in assets.items():
+            for farm in farms_by_asset.get(asset_id, []):
+                if farm["Tokens Sold"] != chain.sold or farm["Tokens Available"] != chain.available:
+                    corrections.append({
+                        "kind": "farm",
+                        "asset_id": asset_id,
+                        "farm_id": farm["Farm ID"],
+                        "local": {"Tokens Sold": farm["Tokens Sold"], "Tokens Available": farm["Tokens Available"]},
+                        "chain": {"Tokens Sold": chain.sold, "Tokens Available": chain.available},
+                        "applicable": True,
+                    })
+
+            held = local.get(asset_id, {})
+            for address, positions in held.items():
+                if address in chain.issuers:
+                    continue
+                held_locally = sum(tokens for _, tokens in positions.values())
+                on_chain = chain.holders.get(address, 0)
+                if held_locally == on_chain:
+                    continue
+                # A wallet shared by several accounts cannot be split between them
+                sole_owner = len(owners[address]) == 1
+                email = min(positions)
+                corrections.append({
+                    "kind": "holding",
+                    "asset_id": asset_id,
+                    "farm_id": positions[email][0],
+                    "address": address,
+                    "investor_email": email if sole_owner else sorted(positions),
+                    "local": held_locally,
+                    "chain": on_chain,
+                    "applicable": sole_owner,
+                })
+
+            for address, amount in chain.holders.items():
+                if amount and address not in chain.issuers and address not in held:
+                    corrections.append({
+                        "kind": "untracked",
+                        "asset_id": asset_id,
+                        "address": address,
+                        "investor_email": sorted(owners.get(address, ())),
+                        "chain": amount,
+                        "applicable": False,
+                    })
+        return corrections
+
+    def apply(self, corrections):
+        """Write the applicable corrections back; returns how many were applied"""
+        applied = 0
+        for correction in corrections:
+            if not correction["applicable"]:
+                continue
+            if correction["kind"] == "farm":
+                self.backend.farm_catalog.update_by_farm_id(correction["farm_id"], correction["chain"])
+            elif correction["kind"] == "holding":
+                self.backend.holdings.adjust_position(
+                    correction["investor_email"], correction["farm_id"], correction["chain"] - correction["local"]
+                )
+            else:
+                continue
+            applied += 1
+        return applied
+
+    async def run(self, apply=False):
+        """Fetch, diff and optionally apply; returns a report dict"""
+        farms_by_asset = self.tracked_farms()
+        assets, errors = await self.fetch(sorted(farms_by_asset))
+        corrections = self.diff(farms_by_asset, assets)
+        applied = self.apply(corrections) if apply else 0
+        return {
+            "assets": len(farms_by_asset),
+            "fetched": len(assets),
+            "holders": sum(len(chain.holders) for chain in assets.values()),
+            "errors": errors,
+            "corrections": corrections,
+            "applied": applied,
+        }
+
+
+async def reconcile(backend, apply=False, concurrency=16, **indexer_options):
+    """Run one reconciliation pass against the configured indexer"""
+    indexer = AsyncIndexer(max_connections=concurrency, **indexer_options)
+    try:
+        return await Reconciler(backend, indexer, concurrency).run(apply=apply)
+    finally:
+        await indexer.close()
+
+
+def main():
+    import argparse
+    import sys
+
+    from agritoken.backends import open_backend
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('data_root', help='data directory (AGRITOKEN_STORAGE picks the backend)')
+    parser.add_argument('--apply', action='store_true', help='write the applicable corrections back')
+    parser.add_argument('--indexer', help='indexer URL (default: AGRITOKEN_INDEXER_ADDRESS or Algonode TestNet)')
+    parser.add_argument('--concurrency', type=int, default=16, help='assets fetched at once')
+    args = parser.parse_args()
+
+    report = asyncio.run(reconcile(open_backend(args.data_root), apply=args.apply,
+                                   concurrency=args.concurrency, address=args.indexer))
+    for correction in report["corrections"]:
+        sys.stdout.write(codec.dumps(correction).decode('utf-8') + "\n")
+    for asset_id, message in report["errors"].items():
+        print(f"Asset {asset_id}: {message}", file=sys.stderr)
+    print(f"{report['fetched']}/{report['assets']} assets, {report['holders']} holders, "
+          f"{len(report['corrections'])} corrections, {report['applied']} applied", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
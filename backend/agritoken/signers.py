@@ -0,0 +1,51 @@
+"""Process-wide registry of ready-to-use transaction signers.
+
+Building a signer is not free: the deployer account is looked up in the
+environment through algokit (which fails when ``DEPLOYER_MNEMONIC`` is not
+set) before the key is derived from the mnemonic installed with
+``/set_mnemonic``. ``SignerRegistry`` does that once per name and hands the
+same object to every later request, so per-request setup is a dict lookup.
+
+``replace`` swaps a signer in one assignment: requests that already picked
+up the old signer finish with it, the next lookup sees the new one.
+``discard`` drops a signer so the next lookup resolves it again.
+"""
+import threading
+
+DEPLOYER = "deployer"
+
+
+class SignerRegistry:
+    """Signers by name, each built by ``resolve(name)`` on first use"""
+
+    def __init__(self, resolve):
+        self._resolve = resolve
+        self._lock = threading.Lock()
+        self._signers = {}
+
+    def get(self, name=DEPLOYER):
+        """The signer for ``name``; exceptions from ``resolve`` propagate"""
+        signer = self._signers.get(name)
+        if signer is not None:
+            return signer
+        with self._lock:
+            signer = self._signers.get(name)
+            if signer is None:
+                signer = self._resolve(name)
+                self._signers = {**self._signers, name: signer}
+            return signer
+
+    def replace(self, name, signer):
+        """Install ``signer`` for ``name``; returns the one it replaced, if any"""
+        with self._lock:
+            previous = self._signers.get(name)
+            self._signers = {**self._signers, name: signer}
+        return previous
+
+    def discard(self, name=DEPLOYER):
+        """Drop the signer for ``name``; returns it, if there was one"""
+        with self._lock:
+            previous = self._signers.get(name)
+            if previous is not None:
+                self._signers = {key: value for key, value in self._signers.items() if key != name}
+        return previous
@@ -0,0 +1,147 @@
+"""Batch signing with the deployer key, spread over a process pool.
+
+Signing hundreds of transfers for a payout or token distribution is CPU
+work (msgpack encoding and ed25519) that holds the GIL in the request
+thread. ``SigningService`` signs small batches inline and shards large ones
+across worker processes, each of which loads the key once when it starts.
+Results come back in the order the transactions were given.
+
+Every transaction is encoded once: the canonical msgpack bytes are signed,
+hashed into the txid and wrapped into the signed-transaction blob, instead
+of ``Transaction.sign`` plus ``get_txid`` plus another encoding on
+submission. Blobs go straight to algod through
+``AlgodService.send_raw_transactions``.
+
+Workers are started by a fork server where the platform has one, else
+spawned. Either way they begin from a fresh single-threaded interpreter
+that imports only this module. Forking the server itself could copy locks
+held by its other threads (confirmation tracker, params refresher, request
+threads) into a worker and deadlock it.
+"""
+import base64
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from algosdk import constants, encoding
+from nacl.signing import SigningKey
+
+# Canonical msgpack for {"sig": <64 bytes>, "txn": ...}: a two-entry map with
+# the keys in order, the signature as bin8
+_SIG_PREFIX = b"\x82\xa3sig\xc4\x40"
+_TXN_KEY = b"\xa3txn"
+
+_worker_key = None
+
+
+def signing_key(private_key):
+    """nacl key for an algosdk base64 private key"""
+    return SigningKey(base64.b64decode(private_key)[:constants.key_len_bytes])
+
+
+def sign_with(key, txns):
+    """``[(txid, signed msgpack bytes)]`` for ``txns``, signed by the nacl ``key``"""
+    signed = []
+    for txn in txns:
+        packed = base64.b64decode(encoding.msgpack_encode(txn))
+        message = constants.txid_prefix + packed
+        # algod's txid: the unpadded base32 of the SHA-512/256 digest
+        txid = base64.b32encode(encoding.checksum(message)).decode().rstrip("=")
+        signature = key.sign(message).signature
+        signed.append((txid, _SIG_PREFIX + signature + _TXN_KEY + packed))
+    return signed
+
+
+def _init_worker(private_key):
+    global _worker_key
+    _worker_key = signing_key(private_key)
+
+
+def _sign_shard(txns):
+    return sign_with(_worker_key, txns)
+
+
+def _pool_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # Workers need nacl and algosdk, not the server that runs as __main__
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class SigningService:
+    """Signs transactions with one private key; large batches go to a process pool
+
+    Batches smaller than ``inline_below`` are signed in the calling thread.
+    The pool of ``workers`` processes is started by the first larger batch.
+    """
+
+    def __init__(self, private_key, workers=None, inline_below=128, shard_size=64):
+        self.workers = workers or os.cpu_count() or 1
+        self.inline_below = inline_below
+        self.shard_size = shard_size
+        self._private_key = private_key
+        self._key = signing_key(private_key)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._closed = False
+
+    @classmethod
+    def from_environment(cls, private_key):
+        """Build a service from AGRITOKEN_SIGNING_WORKERS and AGRITOKEN_SIGNING_INLINE"""
+        return cls(
+            private_key,
+            workers=int(os.getenv("AGRITOKEN_SIGNING_WORKERS", 0)) or None,
+            inline_below=int(os.getenv("AGRITOKEN_SIGNING_INLINE", 128)),
+        )
+
+    def sign(self, txns):
+        """``[(txid, signed msgpack bytes)]`` in the order of ``txns``"""
+        txns = list(txns)
+        if len(txns) < self.inline_below or self.workers < 2 or self._closed:
+            return sign_with(self._key, txns)
+        # Several shards per worker so an unlucky slow one does not hold up the rest
+        size = max(self.shard_size, -(-len(txns) // (self.workers * 4)))
+        shards = [txns[i:i + size] for i in range(0, len(txns), size)]
+        signed = []
+        try:
+            for shard in self._executor().map(_sign_shard, shards):
+                signed.extend(shard)
+        except RuntimeError:
+            if not self._closed:
+                raise
+            # Closed between the check and the map
+            return sign_with(self._key, txns)
+        return signed
+
+    def sign_groups(self, groups):
+        """``sign`` for a list of groups, keeping the grouping"""
+        signed = iter(self.sign([txn for group in groups for txn in group]))
+        return [[next(signed) for _ in group] for group in groups]
+
+    def close(self):
+        """Stop the pool once the work already handed to it is done
+
+        Later batches, e.g. from requests still holding a replaced signer,
+        are signed inline.
+        """
+        with self._lock:
+            self._closed = True
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def _executor(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("signing service is closed")
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=_pool_context(),
+                    initializer=_init_worker,
+                    initargs=(self._private_key,),
+                )
+            return self._pool
@@ -0,0 +1,553 @@
+"""SQLite storage engine for farms, holdings and users.
+
+Each record is kept whole as a JSON document next to the columns it is
+looked up by, so the API keeps returning exactly the dicts it returned with
+the JSON files while lookups go through indexes:
+
+* ``farms``: Farm ID, Asset ID and farmer email (plus the farm_info file
+  the record belongs to, ``source``)
+* ``holdings``: (investor email, Farm ID), Farm ID and Transaction ID
+* ``users``: lowercased email as the primary key
+
+``portfolio_positions`` holds running totals per (investor, farm), adjusted
+in the same transaction as every holdings write (see ``agritoken.portfolio``).
+
+The database runs in WAL mode, so readers in any worker process never block
+the single writer. Every write bumps a per-table counter in ``meta``; it
+plays the role of ``JsonLedger.version()`` for caches such as the payout
+engine.
+
+The stores mirror the interfaces of ``FarmCatalog``, ``FarmListFile``,
+``HoldingsStore`` and ``UserStore``, see ``agritoken.backends``.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from agritoken import codec
+from agritoken.farm_schema import canonical_farm, ensure_canonical, is_canonical, merge_farm
+from agritoken.holdings_store import apply_adjustment, apply_payout, apply_price, apply_purchase
+from agritoken.portfolio import PortfolioBook, holding_figures, portfolio_payload, position_key
+from agritoken.user_store import email_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS farms (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    farm_id TEXT,
+    asset_id TEXT,
+    farmer_email TEXT,
+    status TEXT NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS farms_farm_id ON farms (farm_id);
+CREATE INDEX IF NOT EXISTS farms_asset_id ON farms (asset_id);
+CREATE INDEX IF NOT EXISTS farms_farmer_email ON farms (farmer_email);
+CREATE INDEX IF NOT EXISTS farms_source ON farms (source);
+
+CREATE TABLE IF NOT EXISTS holdings (
+    id INTEGER PRIMARY KEY,
+    investor_email TEXT NOT NULL,
+    farm_id TEXT,
+    transaction_id TEXT,
+    doc TEXT NOT NULL
+);
+-- Also serves lookups by investor email alone (leftmost column)
+CREATE INDEX IF NOT EXISTS holdings_position ON holdings (investor_email, farm_id);
+CREATE INDEX IF NOT EXISTS holdings_farm_id ON holdings (farm_id);
+CREATE INDEX IF NOT EXISTS holdings_transaction_id ON holdings (transaction_id)
+    WHERE transaction_id IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS portfolio_positions (
+    investor_email TEXT NOT NULL,
+    farm_id TEXT NOT NULL,
+    farm_name TEXT,
+    tokens NUMERIC NOT NULL,
+    cost_basis REAL NOT NULL,
+    est_value REAL NOT NULL,
+    payouts REAL NOT NULL,
+    holdings INTEGER NOT NULL,
+    PRIMARY KEY (investor_email, farm_id)
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    email TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+# Bump to rebuild portfolio_positions when its meaning changes
+PORTFOLIO_VERSION = 1
+
+
+def _dumps(doc):
+    return codec.dumps(doc).decode('utf-8')
+
+
+class SqliteDatabase:
+    """One SQLite file shared by the stores; a connection per thread"""
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly below
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction; takes the write lock up front to avoid upgrade deadlocks"""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def snapshot(self):
+        """Read transaction: every query inside sees the same committed state"""
+        conn = self.connection()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+    def version(self, table, conn=None):
+        row = (conn or self.connection()).execute("SELECT value FROM meta WHERE key = ?", (table,)).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def bump(conn, table):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1",
+            (table,)
+        )
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def farm_columns(source, farm):
+    """Indexed column values and stored document for a farm record"""
+    farm = ensure_canonical(farm)
+    asset_id = farm["Asset ID"]
+    return (
+        source,
+        farm["Farm ID"],
+        None if asset_id == "unknown" else asset_id,
+        farm["Farmer Email"].lower(),
+        farm.get("Transaction Status", "confirmed"),
+        _dumps(farm),
+    )
+
+
+def insert_farm(conn, source, farm):
+    conn.execute(
+        "INSERT INTO farms (source, farm_id, asset_id, farmer_email, status, doc) VALUES (?, ?, ?, ?, ?, ?)",
+        farm_columns(source, farm)
+    )
+
+
+def update_farm(conn, row_id, source, farm):
+    conn.execute(
+        "UPDATE farms SET source = ?, farm_id = ?, asset_id = ?, farmer_email = ?, status = ?, doc = ? WHERE id = ?",
+        farm_columns(source, farm) + (row_id,)
+    )
+
+
+def upgrade_farms(db, batch_size=500):
+    """Rewrite farm documents not yet in the canonical schema; returns how many.
+
+    Works through the table a batch per transaction so writers are never
+    held up for long.
+    """
+    upgraded = 0
+    last_id = 0
+    while True:
+        with db.transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, source, doc FROM farms WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+            ).fetchall()
+            changed = 0
+            for row_id, source, doc in rows:
+                farm = codec.loads(doc)
+                if not is_canonical(farm):
+                    update_farm(conn, row_id, source, canonical_farm(farm))
+                    changed += 1
+            if changed:
+                db.bump(conn, "farms")
+        if not rows:
+            return upgraded
+        upgraded += changed
+        last_id = rows[-1][0]
+
+
+def holding_columns(holding):
+    return (
+        email_key(holding.get("Investor Email", "")),
+        holding.get("Farm ID"),
+        holding.get("Transaction ID") or None,
+        _dumps(holding),
+    )
+
+
+def insert_holding(conn, holding):
+    conn.execute(
+        "INSERT INTO holdings (investor_email, farm_id, transaction_id, doc) VALUES (?, ?, ?, ?)",
+        holding_columns(holding)
+    )
+    adjust_portfolio(conn, holding, 1)
+
+
+def replace_holding(conn, row_id, old, new):
+    """Store ``new`` over the row holding ``old`` and move the portfolio totals"""
+    adjust_portfolio(conn, old, -1)
+    conn.execute(
+        "UPDATE holdings SET investor_email = ?, farm_id = ?, transaction_id = ?, doc = ? WHERE id = ?",
+        holding_columns(new) + (row_id,)
+    )
+    adjust_portfolio(conn, new, 1)
+
+
+def adjust_portfolio(conn, holding, sign):
+    """Add (``sign`` 1) or take out (-1) one holding's figures from its position"""
+    email, farm_id = position_key(holding)
+    tokens, cost, value, payouts = (sign * amount for amount in holding_figures(holding))
+    conn.execute(
+        "INSERT INTO portfolio_positions "
+        "(investor_email, farm_id, farm_name, tokens, cost_basis, est_value, payouts, holdings) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (investor_email, farm_id) DO UPDATE SET "
+        "tokens = tokens + excluded.tokens, cost_basis = cost_basis + excluded.cost_basis, "
+        "est_value = est_value + excluded.est_value, payouts = payouts + excluded.payouts, "
+        "holdings = holdings + excluded.holdings, farm_name = coalesce(excluded.farm_name, farm_name)",
+        (email, farm_id, holding.get("Farm Name") if sign > 0 else None, tokens, cost, value, payouts, sign)
+    )
+    if sign < 0:
+        conn.execute(
+            "DELETE FROM portfolio_positions WHERE investor_email = ? AND farm_id = ? AND holdings <= 0",
+            (email, farm_id)
+        )
+
+
+def rebuild_portfolio(conn):
+    """Recompute every position from the holdings table"""
+    book = PortfolioBook()
+    for doc, in conn.execute("SELECT doc FROM holdings ORDER BY id"):
+        book.add(codec.loads(doc))
+    conn.execute("DELETE FROM portfolio_positions")
+    conn.executemany(
+        "INSERT INTO portfolio_positions "
+        "(investor_email, farm_id, farm_name, tokens, cost_basis, est_value, payouts, holdings) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        book.positions()
+    )
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('portfolio', ?) "
+        "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+        (PORTFOLIO_VERSION,)
+    )
+
+
+def insert_user(conn, user):
+    """Insert ``user`` unless the email is taken; returns False on a duplicate"""
+    cursor = conn.execute(
+        "INSERT OR IGNORE INTO users (email, doc) VALUES (?, ?)",
+        (email_key(user.get("User Email")), _dumps(user))
+    )
+    return cursor.rowcount == 1
+
+
+class SqliteFarmCatalog:
+    """``FarmCatalog`` over the farms table: confirmed farms, canonical"""
+
+    def __init__(self, db):
+        self.db = db
+        self._cache = (None, [])
+
+    def refresh(self, force=False):
+        """Nothing to rescan; kept for interface compatibility"""
+
+    def reload_file(self, filepath):
+        """Nothing to re-read; kept for interface compatibility"""
+
+    def save(self, filename, farm):
+        """Insert a farm under ``filename``; returns the reference ``update`` takes"""
+        with self.db.transaction() as conn:
+            insert_farm(conn, filename, farm)
+            self.db.bump(conn, "farms")
+        return filename
+
+    def update(self, filename, updates):
+        """Merge fields into the farm saved under ``filename``"""
+        with self.db.transaction() as conn:
+            for row_id, doc in conn.execute("SELECT id, doc FROM farms WHERE source = ?", (filename,)).fetchall():
+                update_farm(conn, row_id, filename, merge_farm(codec.loads(doc), updates))
+            self.db.bump(conn, "farms")
+
+    def update_by_farm_id(self, farm_id, updates):
+        """Merge fields into every stored farm with this Farm ID"""
+        with self.db.transaction() as conn:
+            rows = conn.execute("SELECT id, source, doc FROM farms WHERE farm_id = ?", (farm_id,)).fetchall()
+            for row_id, source, doc in rows:
+                update_farm(conn, row_id, source, merge_farm(codec.loads(doc), updates))
+            if rows:
+                self.db.bump(conn, "farms")
+        return len(rows)
+
+    def all(self):
+        """Return every confirmed farm, ordered like the per-file catalog"""
+        return self.snapshot()[1]
+
+    def snapshot(self):
+        """Return ``(version, farms)``; re-queried only after a farm write"""
+        with self.db.snapshot() as conn:
+            version = self.db.version("farms", conn)
+            if self._cache[0] == version:
+                return self._cache
+            self._cache = (version, self._query(conn, "1 = 1", ()))
+        return self._cache
+
+    def get_by_farm_id(self, farm_id):
+        farms = self._query(self.db.connection(), "farm_id = ?", (farm_id,), limit=1)
+        return farms[0] if farms else None
+
+    def get_by_asset_id(self, asset_id):
+        farms = self._query(self.db.connection(), "asset_id = ?", (str(asset_id),), limit=1)
+        return farms[0] if farms else None
+
+    def get_by_farmer_email(self, email):
+        return self._query(self.db.connection(), "farmer_email = ?", ((email or "").lower(),))
+
+    @staticmethod
+    def _query(conn, where, params, limit=-1):
+        rows = conn.execute(
+            f"SELECT doc FROM farms WHERE {where} AND status = 'confirmed' ORDER BY source, id LIMIT ?",
+            params + (limit,)
+        )
+        return [ensure_canonical(codec.loads(doc)) for doc, in rows]
+
+
+class SqliteFarmList:
+    """``FarmListFile`` over the farms table, limited to one ``source``"""
+
+    def __init__(self, db, source):
+        self.db = db
+        self.source = source
+        self._cache = (None, [])
+
+    def exists(self):
+        return True
+
+    def all(self):
+        return self.snapshot()[1]
+
+    def snapshot(self):
+        """Return ``(version, farms)``; re-queried only after a farm write"""
+        with self.db.snapshot() as conn:
+            version = self.db.version("farms", conn)
+            if self._cache[0] == version:
+                return self._cache
+            rows = conn.execute("SELECT doc FROM farms WHERE source = ? ORDER BY id", (self.source,))
+            self._cache = (version, [codec.loads(doc) for doc, in rows])
+        return self._cache
+
+    def get(self, farm_id):
+        found = self.find(self.db.connection(), farm_id)
+        return found[1] if found else None
+
+    def for_farmer(self, email):
+        email = (email or "").lower()
+        rows = self.db.connection().execute(
+            "SELECT doc FROM farms WHERE farmer_email = ? AND source = ? ORDER BY id", (email, self.source)
+        )
+        farms = [codec.loads(doc) for doc, in rows]
+        return [farm for farm in farms if farm.get("Farmer Email", "").lower() == email]
+
+    def add_if_absent(self, farm):
+        farm = canonical_farm(farm)
+        with self.db.transaction() as conn:
+            if self.find(conn, farm.get("Farm ID")) is not None:
+                return False
+            insert_farm(conn, self.source, farm)
+            self.db.bump(conn, "farms")
+        return True
+
+    def find(self, conn, farm_id):
+        """Return ``(row id, raw farm)`` for ``farm_id`` or None"""
+        row = conn.execute(
+            "SELECT id, doc FROM farms WHERE farm_id = ? AND source = ? ORDER BY id LIMIT 1",
+            (farm_id, self.source)
+        ).fetchone()
+        return (row[0], codec.loads(row[1])) if row else None
+
+
+class SqliteHoldingsStore:
+    """``HoldingsStore`` over the holdings table"""
+
+    name = "investor holdings"
+
+    def __init__(self, db):
+        self.db = db
+        # Databases from before portfolio_positions existed are filled in once
+        if self.db.version("portfolio") != PORTFOLIO_VERSION:
+            with self.db.transaction() as conn:
+                if self.db.version("portfolio", conn) != PORTFOLIO_VERSION:
+                    rebuild_portfolio(conn)
+
+    def exists(self):
+        return True
+
+    def version(self):
+        return self.db.version("holdings")
+
+    def all(self):
+        return self._docs(self.db.connection().execute("SELECT doc FROM holdings ORDER BY id"))
+
+    def snapshot(self):
+        with self.db.snapshot() as conn:
+            return self.db.version("holdings", conn), self._docs(conn.execute("SELECT doc FROM holdings ORDER BY id"))
+
+    def for_investor(self, investor_email):
+        return self._docs(self.db.connection().execute(
+            "SELECT doc FROM holdings WHERE investor_email = ? ORDER BY id", (email_key(investor_email),)
+        ))
+
+    def for_farm(self, farm_id):
+        return self._docs(self.db.connection().execute(
+            "SELECT doc FROM holdings WHERE farm_id = ? ORDER BY id", (farm_id,)
+        ))
+
+    def add(self, holding):
+        with self.db.transaction() as conn:
+            insert_holding(conn, holding)
+            self.db.bump(conn, "holdings")
+        return holding
+
+    def record_purchase(self, investor_email, farm_id, tokens, cost, price, holding):
+        with self.db.transaction() as conn:
+            return self.purchase_in(conn, investor_email, farm_id, tokens, cost, price, holding)
+
+    def purchase_in(self, conn, investor_email, farm_id, tokens, cost, price, holding):
+        """``record_purchase`` inside the caller's transaction"""
+        row = conn.execute(
+            "SELECT id, doc FROM holdings WHERE investor_email = ? AND farm_id = ? ORDER BY id LIMIT 1",
+            (email_key(investor_email), farm_id)
+        ).fetchone()
+        if row is None:
+            insert_holding(conn, holding)
+        else:
+            old = codec.loads(row[1])
+            holding = codec.loads(row[1])
+            apply_purchase(holding, tokens, cost, price)
+            replace_holding(conn, row[0], old, holding)
+        self.db.bump(conn, "holdings")
+        return holding
+
+    def update_by_transaction(self, transaction_id, fields):
+        self._change("transaction_id = ?", (transaction_id,), dict.update, fields)
+
+    def reprice_farm(self, farm_id, price):
+        self._change("farm_id = ?", (farm_id,), apply_price, price)
+
+    def record_payout(self, farm_id, per_token, date):
+        self._change("farm_id = ?", (farm_id,), apply_payout, per_token, date)
+
+    def adjust_position(self, investor_email, farm_id, tokens):
+        with self.db.transaction() as conn:
+            row = conn.execute(
+                "SELECT id, doc FROM holdings WHERE investor_email = ? AND farm_id = ? ORDER BY id LIMIT 1",
+                (email_key(investor_email), farm_id)
+            ).fetchone()
+            if row is None:
+                return
+            holding = codec.loads(row[1])
+            apply_adjustment(holding, tokens)
+            replace_holding(conn, row[0], codec.loads(row[1]), holding)
+            self.db.bump(conn, "holdings")
+
+    def portfolio(self, investor_email):
+        rows = self.db.connection().execute(
+            "SELECT farm_id, farm_name, tokens, cost_basis, est_value, payouts, holdings "
+            "FROM portfolio_positions WHERE investor_email = ? ORDER BY rowid",
+            (email_key(investor_email),)
+        )
+        return portfolio_payload(investor_email, rows)
+
+    def _change(self, where, params, mutate, *args):
+        with self.db.transaction() as conn:
+            rows = conn.execute(f"SELECT id, doc FROM holdings WHERE {where}", params).fetchall()
+            for row_id, doc in rows:
+                holding = codec.loads(doc)
+                mutate(holding, *args)
+                replace_holding(conn, row_id, codec.loads(doc), holding)
+            self.db.bump(conn, "holdings")
+
+    @staticmethod
+    def _docs(rows):
+        return [codec.loads(doc) for doc, in rows]
+
+
+class SqliteUserStore:
+    """``UserStore`` over the users table"""
+
+    name = "user data"
+
+    def __init__(self, db):
+        self.db = db
+
+    def exists(self):
+        return True
+
+    def all(self):
+        rows = self.db.connection().execute("SELECT doc FROM users ORDER BY rowid")
+        return [codec.loads(doc) for doc, in rows]
+
+    def get(self, email):
+        row = self.db.connection().execute(
+            "SELECT doc FROM users WHERE email = ?", (email_key(email),)
+        ).fetchone()
+        return codec.loads(row[0]) if row else None
+
+    def add_if_absent(self, user):
+        with self.db.transaction() as conn:
+            added = insert_user(conn, user)
+            if added:
+                self.db.bump(conn, "users")
+        return added
+
+    def update(self, email, fields):
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT doc FROM users WHERE email = ?", (email_key(email),)).fetchone()
+            if row is None:
+                return
+            user = codec.loads(row[0])
+            user.update(fields)
+            conn.execute("UPDATE users SET doc = ? WHERE email = ?", (_dumps(user), email_key(email)))
+            self.db.bump(conn, "users")
@@ -0,0 +1,152 @@
+"""Crash-safe, multi-process writes for the JSON data files.
+
+Both servers may run with several worker processes, so in-process locks are
+not enough. Writers take an ``fcntl.flock`` on a sidecar ``<file>.lock`` and
+every document is written to a temporary file in the same directory,
+fsynced and swapped in with ``os.replace``. Readers never lock: they only
+ever see the old file or the new one, never a half-written mix.
+
+Locks are reentrant per thread, so a helper that already holds the lock for
+a file can call another helper that takes it again.
+
+Reads and writes are timed and counted in ``agritoken.metrics`` under the
+file's name, or under ``label`` for files saved one per record.
+"""
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from agritoken import codec, metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+_held = threading.local()
+_process_locks = {}
+_process_locks_guard = threading.Lock()
+
+
+def _process_lock(key):
+    with _process_locks_guard:
+        lock = _process_locks.get(key)
+        if lock is None:
+            lock = _process_locks[key] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def locked(path, shared=False):
+    """Hold the cross-process lock for ``path`` (exclusive unless ``shared``)"""
+    key = os.path.abspath(path)
+    held = getattr(_held, 'paths', None)
+    if held is None:
+        held = _held.paths = {}
+    if key in held:
+        held[key] += 1
+        try:
+            yield
+        finally:
+            held[key] -= 1
+        return
+
+    lock_path = f"{key}.lock"
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    if fcntl is None:
+        process_lock = _process_lock(key)
+        process_lock.acquire()
+        fd = None
+    else:
+        process_lock = None
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+    held[key] = 1
+    try:
+        yield
+    finally:
+        del held[key]
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        else:
+            process_lock.release()
+
+
+def record_io(op, path, nbytes, started, label=None):
+    """Account one read or write of ``nbytes`` that began at ``started``"""
+    label = label or os.path.basename(path)
+    metrics.FILE_IO_SECONDS.observe(time.perf_counter() - started, op, label)
+    metrics.FILE_IO_BYTES.inc(op, label, amount=nbytes)
+
+
+def atomic_write_bytes(path, payload, label=None):
+    """Replace ``path`` with ``payload`` via a fsynced temporary file"""
+    started = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    _fsync_directory(directory)
+    record_io('write', path, len(payload), started, label)
+
+
+def atomic_write_json(path, data, label=None):
+    """Serialize ``data`` and atomically replace ``path`` with it"""
+    atomic_write_bytes(path, codec.dumps_file(data), label)
+
+
+def read_json(path, label=None):
+    """Parse ``path``; raises FileNotFoundError if it does not exist"""
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        raw = f.read()
+    record_io('read', path, len(raw), started, label)
+    return codec.loads(raw)
+
+
+def update_json(path, mutate, default=None, label=None):
+    """Read-modify-write ``path`` under its lock.
+
+    ``mutate`` gets the parsed document (or a fresh ``default()`` when the
+    file is missing and ``default`` is given) and changes it in place; its
+    return value is passed back to the caller. Exceptions from ``mutate``
+    leave the file untouched.
+    """
+    with locked(path):
+        try:
+            data = read_json(path, label)
+        except FileNotFoundError:
+            if default is None:
+                raise
+            data = default()
+        result = mutate(data)
+        atomic_write_json(path, data, label)
+        return result
+
+
+def _fsync_directory(directory):
+    # Make the rename itself durable; not supported on every platform
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
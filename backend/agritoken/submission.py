@@ -0,0 +1,163 @@
+"""Rate-limited, bounded submission of signed transactions to algod.
+
+Public algod endpoints (Algonode) throttle clients that send too fast, and
+a burst of tokenize or transfer requests used to hit algod all at once and
+fail after long waits. ``SubmissionScheduler`` sits in front of every
+``POST /v2/transactions``:
+
+* a token bucket spaces submissions out to ``rate`` per second, allowing
+  bursts of up to ``burst``; callers are served in arrival order
+* at most ``max_queue`` submissions may be waiting at once, and none waits
+  longer than ``max_wait`` for its turn. Beyond either limit ``submit``
+  fails straight away with ``SubmissionRejected`` (HTTP 429 with a
+  Retry-After hint) instead of letting the request hang
+* transient failures (connection errors, 429 and 5xx from algod) are
+  retried with exponential backoff and full jitter, each retry taking its
+  own token. When they run out the submission fails with 503
+
+A retry can race with a first attempt that did reach the node; algod then
+reports the transaction as already in the ledger, which counts as success.
+
+Queue depth, time spent waiting for a turn, retries and rejections are
+recorded in ``agritoken.metrics``.
+"""
+import math
+import os
+import random
+import threading
+import time
+
+from agritoken import metrics
+
+
+class SubmissionRejected(Exception):
+    """The scheduler turned a submission away or gave up retrying it"""
+
+    def __init__(self, message, status_code=429, retry_after=1.0):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    def retry_after_header(self):
+        """Whole seconds for a ``Retry-After`` header"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``burst``"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def reserve(self, max_wait):
+        """Take the next token; returns seconds until it is due, or None past ``max_wait``
+
+        Tokens may go negative: each reservation queues behind the earlier
+        ones, so waiting callers are served in order.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+def is_transient(e):
+    """True for errors worth retrying: no HTTP status, 429 or 5xx"""
+    code = getattr(e, 'code', None)
+    return code is None or code == 429 or code >= 500
+
+
+def already_submitted(e):
+    return 'already in ledger' in str(e)
+
+
+class SubmissionScheduler:
+    """Runs algod submissions through a token bucket with bounded waiting and retries"""
+
+    def __init__(self, rate=25.0, burst=25, max_queue=100, max_wait=10.0,
+                 retries=4, backoff=0.25, max_backoff=4.0, is_transient=is_transient):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.is_transient = is_transient
+        self._lock = threading.Lock()
+        self._depth = 0
+
+    @classmethod
+    def from_environment(cls, **kwargs):
+        """Build a scheduler from AGRITOKEN_SUBMIT_RATE/_BURST/_QUEUE/_MAX_WAIT/_RETRIES"""
+        rate = float(os.getenv("AGRITOKEN_SUBMIT_RATE", 25))
+        return cls(
+            rate=rate,
+            burst=float(os.getenv("AGRITOKEN_SUBMIT_BURST", rate)),
+            max_queue=int(os.getenv("AGRITOKEN_SUBMIT_QUEUE", 100)),
+            max_wait=float(os.getenv("AGRITOKEN_SUBMIT_MAX_WAIT", 10)),
+            retries=int(os.getenv("AGRITOKEN_SUBMIT_RETRIES", 4)),
+            **kwargs,
+        )
+
+    def depth(self):
+        """Submissions currently waiting for a turn, backing off or in flight"""
+        return self._depth
+
+    def submit(self, send, txid):
+        """Call ``send()`` when rate allows; returns its result, or ``txid`` for a duplicate"""
+        with self._lock:
+            if self._depth >= self.max_queue:
+                metrics.SUBMIT_REJECTED.inc("queue_full")
+                raise SubmissionRejected(
+                    f"Submission queue is full ({self.max_queue} waiting); retry shortly",
+                    429, self._depth / self.bucket.rate,
+                )
+            self._depth += 1
+        metrics.SUBMIT_QUEUE_DEPTH.inc()
+        try:
+            return self._submit(send, txid)
+        finally:
+            with self._lock:
+                self._depth -= 1
+            metrics.SUBMIT_QUEUE_DEPTH.dec()
+
+    def _submit(self, send, txid):
+        attempt = 0
+        while True:
+            wait = self.bucket.reserve(self.max_wait)
+            if wait is None:
+                metrics.SUBMIT_REJECTED.inc("rate_limited")
+                raise SubmissionRejected(
+                    f"Submission rate limit reached; no slot within {self.max_wait:g}s",
+                    429, self.max_wait,
+                )
+            metrics.SUBMIT_WAIT_SECONDS.observe(wait)
+            if wait:
+                time.sleep(wait)
+
+            try:
+                return send()
+            except Exception as e:
+                if attempt and already_submitted(e):
+                    # An earlier attempt got through after all
+                    return txid
+                if not self.is_transient(e):
+                    raise
+                if attempt >= self.retries:
+                    metrics.SUBMIT_REJECTED.inc("retries_exhausted")
+                    raise SubmissionRejected(
+                        f"algod unavailable after {attempt + 1} attempts: {e}",
+                        503, self.max_backoff,
+                    ) from e
+                metrics.SUBMIT_RETRIES.inc(str(getattr(e, 'code', None) or 'error'))
+                attempt += 1
+            time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))))
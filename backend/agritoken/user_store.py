@@ -0,0 +1,79 @@
+"""User accounts from ``signup_info.json`` keyed by lowercased email.
+
+The file is loaded once and kept as a dict, so login and the duplicate
+check on signup are constant-time lookups instead of a scan over
+``data["users"]``. New signups are written through to ``signup_info.log``
+(see ``agritoken.ledger``) rather than rewriting every user.
+"""
+from agritoken.ledger import JsonLedger
+
+
+def email_key(email):
+    return (email or "").lower()
+
+
+class UserStore(JsonLedger):
+    """Users backed by a JSON snapshot and a JSON-lines log.
+
+    * ``{"op": "add", "user": {...}}`` registers a new user.
+    * ``{"op": "update", "email": ..., "fields": {...}}`` changes fields on
+      an existing user, e.g. an upgraded password hash.
+
+    Records handed out are copies; replaying ``update`` changes the store's
+    own ones in place.
+    """
+
+    name = "user data"
+
+    def all(self):
+        """Return every user record in signup order"""
+        with self._lock:
+            self._refresh()
+            return [dict(user) for user in self._users]
+
+    def get(self, email):
+        """Return the user record for ``email`` (any case) or None"""
+        with self._lock:
+            self._refresh()
+            user = self._by_email.get(email_key(email))
+            return dict(user) if user is not None else None
+
+    def add_if_absent(self, user):
+        """Register ``user`` unless the email is taken; returns False on a duplicate"""
+        # Check and append under the file lock, so two workers cannot both
+        # register the same email
+        with self._transaction():
+            if email_key(user.get("User Email")) in self._by_email:
+                return False
+            self._append({"op": "add", "user": user})
+            return True
+
+    def update(self, email, fields):
+        """Set fields on the user registered under ``email``"""
+        self._append({"op": "update", "email": email, "fields": fields})
+
+    def _load_state(self, data):
+        self._users = []
+        self._by_email = {}
+        users = data.get("users", []) if isinstance(data, dict) else []
+        for user in users:
+            self._insert(user)
+
+    def _insert(self, user):
+        self._users.append(user)
+        # Keep the first account for an email, matching the old linear scan
+        self._by_email.setdefault(email_key(user.get("User Email")), user)
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "add":
+            self._insert(record["user"])
+        elif op == "update":
+            user = self._by_email.get(email_key(record["email"]))
+            if user is not None:
+                user.update(record["fields"])
+        else:
+            raise KeyError(f"unknown op {op!r}")
+
+    def _snapshot_data(self):
+        return {"users": self._users}
@@ -1,23 +1,103 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, request, jsonify, send_file
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import json
 import os
+import threading
+import time
 from datetime import datetime
-import algokit_utils
+from functools import wraps
 from dotenv import load_dotenv
-import getpass
-import algosdk
+
+from agritoken import chain, codec, metrics
+from agritoken.backends import open_backend
+from agritoken.confirmation_tracker import ConfirmationTracker, PendingTransactionStore
+from agritoken.farm_query import FarmQuery, FarmQueryError, FarmSearch
+from agritoken.farm_schema import public_farm
+from agritoken.http_cache import ResponseCache
+from agritoken.idempotency import (
+    CONFLICT, IN_FLIGHT, IdempotencyCache, IdempotencyConflict, IdempotencyInFlight, fingerprint
+)
+from agritoken.signers import DEPLOYER, SignerRegistry
+from agritoken.submission import SubmissionRejected
 
 # Load environment variables
 load_dotenv()
 
+
+class CodecJSONProvider(JSONProvider):
+    """jsonify and request.get_json through agritoken.codec"""
+
+    def dumps(self, obj, **kwargs):
+        return codec.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return codec.loads(s)
+
+
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)
 CORS(app)
 
-# Create data directory if it doesn't exist
-DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'farm_info')
+@app.before_request
+def start_request_timer():
+    """Count the request as in flight and note when it started"""
+    g.request_started = time.perf_counter()
+    g.response_status = 500
+    metrics.HTTP_IN_FLIGHT.inc('flask')
+
+@app.after_request
+def note_response_status(response):
+    g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def record_request_metrics(exc):
+    """Observe the request's latency under its route template"""
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    metrics.HTTP_IN_FLIGHT.dec('flask')
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - started, 'flask', request.method, endpoint, str(g.get('response_status', 500))
+    )
+
+# Create data directory if it doesn't exist (next to backend/ unless overridden)
+DATA_ROOT = os.getenv('AGRITOKEN_DATA_DIR', os.path.join(os.path.dirname(__file__), '..', 'data'))
+DATA_DIR = os.path.join(DATA_ROOT, 'farm_info')
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# JSON files or SQLite, picked with AGRITOKEN_STORAGE (see agritoken.backends)
+storage_backend = open_backend(DATA_ROOT)
+
+# Farms indexed by Farm ID, Asset ID and farmer email
+farm_catalog = storage_backend.farm_catalog
+
+# Sorted views of the catalog for filtered, paginated GET /farms
+farm_search = FarmSearch(farm_catalog.snapshot)
+
+# Serialized (and compressed) GET bodies, reused until the data version moves
+response_cache = ResponseCache()
+
+# Investor holdings, shared with the FastAPI server
+holdings_store = storage_backend.holdings
+
+# Users keyed by lowercased email, shared with the FastAPI signup/login
+user_store = storage_backend.users
+
+# Background tracker for transactions submitted with ?wait=false; pending
+# txids are kept on disk, leased to one worker at a time, so a restarted or
+# surviving worker picks them up again
+confirmation_tracker = ConfirmationTracker(
+    chain.algod_service,
+    store=PendingTransactionStore(os.path.join(DATA_ROOT, 'pending_transactions.json')),
+    get_indexer=chain.transaction_indexer
+)
+
+# Results of chain requests sent with an Idempotency-Key, shared by every worker
+idempotency_cache = IdempotencyCache.from_environment(DATA_ROOT)
+
 # Global variable to store the mnemonic once entered
 _global_mnemonic = None
 
@@ -33,7 +113,14 @@ def get_mnemonic():
     return None
 
 class FarmTokenization:
+    _signing_lock = threading.Lock()
+
     def __init__(self, mnemonic=None):
+        # Loaded here rather than at startup; see agritoken.chain
+        import algokit_utils
+        import algosdk
+
+        self._signing = None
         self.algorand_client = algokit_utils.AlgorandClient.from_environment()
 
         # Use provided mnemonic, cached mnemonic, or environment variable
@@ -81,20 +168,35 @@ class FarmTokenization:
                 else:
                     raise Exception("No mnemonic available. Please set mnemonic via /set_mnemonic endpoint first.")
 
-    def tokenize_farm(self, farm_name, token_number, unit_name, wallet_address):
-        """Create a farm asset on Algorand blockchain using direct algosdk"""
+    @property
+    def signing(self):
+        """Batch signer for the deployer key (see agritoken.signing), created on first use"""
+        if self._signing is None:
+            from agritoken.signing import SigningService
+
+            with self._signing_lock:
+                if self._signing is None:
+                    self._signing = SigningService.from_environment(self.deployer.private_key)
+        return self._signing
+
+    def close(self):
+        """Stop the signing pool; requests still holding this instance sign inline"""
+        if self._signing is not None:
+            self._signing.close()
+
+    def tokenize_farm(self, farm_name, token_number, unit_name, wallet_address, wait=True):
+        """Create a farm asset on Algorand blockchain using direct algosdk
+
+        With ``wait=False`` the transaction is only submitted and the result
+        carries ``status: pending`` instead of the asset ID.
+        """
         try:
             # Use direct algosdk calls to avoid KMD issues
-            from algosdk import v2client, transaction
-
-            # Create algod client
-            algod_client = v2client.algod.AlgodClient(
-                algod_token="",
-                algod_address="https://testnet-api.algonode.cloud"
-            )
+            from algosdk import transaction
 
-            # Get suggested parameters
-            params = algod_client.suggested_params()
+            # Shared pooled algod client and cached suggested parameters
+            algod = chain.algod_service()
+            params = algod.suggested_params()
 
             # Create asset creation transaction
             txn = transaction.AssetCreateTxn(
@@ -112,27 +214,57 @@ class FarmTokenization:
             )
 
             # Sign and send transaction
-            signed_txn = txn.sign(self.deployer.private_key)
-            txid = algod_client.send_transaction(signed_txn)
+            with metrics.ALGOD_PHASE_SECONDS.time('sign'):
+                signed_txn = txn.sign(self.deployer.private_key)
+            txid = algod.send_transaction(signed_txn)
+
+            if not wait:
+                return {
+                    'success': True,
+                    'status': 'pending',
+                    'transaction_id': txid
+                }
 
             # Wait for confirmation
-            confirmed_txn = transaction.wait_for_confirmation(algod_client, txid, 4)
+            confirmed_txn = algod.wait_for_confirmation(txid, 4)
 
             # Get asset ID from the confirmed transaction
             asset_id = confirmed_txn['asset-index']
 
             return {
                 'success': True,
+                'status': 'confirmed',
                 'asset_id': asset_id,
                 'transaction_id': txid,
                 'confirmed_round': confirmed_txn.get('confirmed-round')
             }
+        except SubmissionRejected:
+            # The endpoint answers 429/503 with Retry-After
+            raise
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
 
+def resolve_signer(name):
+    """Build the deployer the same way every request used to"""
+    return FarmTokenization()
+
+# One FarmTokenization per process, swapped when /set_mnemonic installs a new key
+signer_registry = SignerRegistry(resolve_signer)
+
+def install_mnemonic(mnemonic):
+    """Make ``mnemonic`` the deployer key: build its signer once and swap it in"""
+    global _global_mnemonic
+    signer = FarmTokenization(mnemonic)
+    _global_mnemonic = mnemonic
+    # Requests already holding the old signer finish with it; its pool stops after
+    previous = signer_registry.replace(DEPLOYER, signer)
+    if previous is not None:
+        previous.close()
+    return signer
+
 def save_farm_data_to_json(farm_data):
     """Save farm data to JSON file"""
     try:
@@ -143,17 +275,137 @@ def save_farm_data_to_json(farm_data):
         farm_name_safe = "".join(c for c in farm_data.get('Farm Name', 'unknown') if c.isalnum() or c in (' ', '-', '_')).rstrip()
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"{farm_name_safe}_{timestamp}.json"
-        filepath = os.path.join(DATA_DIR, filename)
 
-        # Save to JSON file
-        with open(filepath, 'w') as f:
-            json.dump(farm_data, f, indent=2)
-
-        return True, filepath
+        # Save through the storage backend; JSON files are replaced atomically
+        return True, farm_catalog.save(filename, farm_data)
     except Exception as e:
         return False, str(e)
 
+def update_farm_data_file(filepath, updates):
+    """Merge fields into a farm saved by save_farm_data_to_json"""
+    farm_catalog.update(filepath, updates)
+
+def cached_json(key, version_of, render):
+    """Serve a JSON body cached per data version, with ETag/304 and gzip/brotli"""
+    status, body, headers = response_cache.serve(
+        key,
+        version_of,
+        render,
+        if_none_match=request.headers.get('If-None-Match'),
+        accept_encoding=request.headers.get('Accept-Encoding')
+    )
+    return Response(body, status=status, mimetype='application/json', headers=headers)
+
+def wants_async_submission():
+    """True when the caller asked not to wait for confirmation (?wait=false)"""
+    return request.args.get('wait', 'true').lower() in ('false', '0', 'no')
+
+def submission_rejected(e):
+    """429 or 503 with Retry-After for a submission the scheduler turned away"""
+    response = jsonify({
+        'success': False,
+        'error': str(e)
+    })
+    response.status_code = e.status_code
+    response.headers['Retry-After'] = e.retry_after_header()
+    return response
+
+def track_transfer(txid, asset_id, amount, receiver_address):
+    """Hand a submitted asset transfer to the confirmation tracker"""
+    return confirmation_tracker.track(
+        txid,
+        'asset_transfer',
+        asset_id=asset_id,
+        amount=amount,
+        receiver=receiver_address
+    )
+
+def farm_tokenization_confirmed(status):
+    update_farm_data_file(status['data_file'], {
+        'Asset ID': status['asset_id'],
+        'Confirmed Round': status['confirmed_round'],
+        'Transaction Status': 'confirmed'
+    })
+
+def farm_tokenization_failed(status):
+    update_farm_data_file(status['data_file'], {
+        'Transaction Status': 'failed',
+        'Transaction Error': status['error']
+    })
+
+def transfer_confirmed(status):
+    holdings_store.update_by_transaction(status['transaction_id'], {
+        'Transaction Status': 'confirmed',
+        'Confirmed Round': status['confirmed_round']
+    })
+
+def transfer_failed(status):
+    holdings_store.update_by_transaction(status['transaction_id'], {
+        'Transaction Status': 'failed'
+    })
+
+confirmation_tracker.on('tokenize_farm', farm_tokenization_confirmed, farm_tokenization_failed)
+confirmation_tracker.on('asset_transfer', transfer_confirmed, transfer_failed)
+
+# Farms and holdings left pending by a previous run; entries another live
+# worker holds are left to it
+confirmation_tracker.resume()
+
+def idempotent(view):
+    """Run the view once per Idempotency-Key header and replay its response to retries"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return view(*args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > 255:
+            return jsonify({
+                'success': False,
+                'error': 'Idempotency-Key must be 1 to 255 characters'
+            }), 400
+
+        endpoint = request.url_rule.rule
+        # The query string counts: ?wait=false is a different request
+        request_fingerprint = fingerprint(request.method, request.full_path, request.get_data())
+
+        executed = []
+
+        def execute():
+            response = app.make_response(view(*args, **kwargs))
+            executed.append(response)
+            return response.status_code, response.get_json()
+
+        try:
+            status, body, outcome = idempotency_cache.run(f"{endpoint} {key}", request_fingerprint, execute)
+        except IdempotencyConflict:
+            metrics.IDEMPOTENT_REQUESTS.inc(endpoint, CONFLICT)
+            return jsonify({
+                'success': False,
+                'error': 'Idempotency-Key was already used for a different request'
+            }), 422
+        except IdempotencyInFlight as e:
+            metrics.IDEMPOTENT_REQUESTS.inc(endpoint, IN_FLIGHT)
+            response = jsonify({
+                'success': False,
+                'error': 'A request with this Idempotency-Key is still being processed; retry shortly'
+            })
+            response.status_code = 409
+            response.headers['Retry-After'] = e.retry_after_header()
+            return response
+        metrics.IDEMPOTENT_REQUESTS.inc(endpoint, outcome)
+        if executed:
+            # Ran here: keep the view's own headers, e.g. Retry-After
+            return executed[0]
+
+        response = jsonify(body)
+        response.status_code = status
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+    return wrapper
+
 @app.route('/tokenize_farm', methods=['POST'])
+@idempotent
 def tokenize_farm():
     try:
         json_data = request.get_json()
@@ -179,9 +431,9 @@ def tokenize_farm():
         unit_name = json_data["Token Unit"]
         wallet_address = json_data["Wallet Address"]
 
-        # Create farm tokenization instance
+        # Reuse the process-wide farm tokenization instance
         try:
-            farm_tokenization = FarmTokenization()
+            farm_tokenization = signer_registry.get()
         except Exception as e:
             # If mnemonic is not set, try to set it automatically
             if "No mnemonic available" in str(e):
@@ -190,24 +442,14 @@ def tokenize_farm():
                 mnemonic_data = {
                     "mnemonic": "strike grocery delay tip season maze peasant ability buddy submit lock off style crawl crunch hole height robot address fuel reward margin magic abstract around"
                 }
-                # Create a mock request object for set_mnemonic
-                from flask import g
-                g.mnemonic_data = mnemonic_data
-
-                # Set global mnemonic directly
+                # Install it the same way /set_mnemonic does
                 try:
-                    from algosdk import mnemonic, account
-                    private_key = mnemonic.to_private_key(mnemonic_data["mnemonic"])
-                    address = account.address_from_private_key(private_key)
+                    from algosdk import mnemonic
+                    # Fail here rather than fall back to a dummy account
+                    mnemonic.to_private_key(mnemonic_data["mnemonic"])
 
-                    # Set global mnemonic
-                    global _global_mnemonic
-                    _global_mnemonic = mnemonic_data["mnemonic"]
-
-                    print(f"Mnemonic auto-set for address: {address}")
-
-                    # Now create farm tokenization instance
-                    farm_tokenization = FarmTokenization()
+                    farm_tokenization = install_mnemonic(mnemonic_data["mnemonic"])
+                    print(f"Mnemonic auto-set for address: {farm_tokenization.deployer.address}")
                 except Exception as mnemonic_error:
                     return jsonify({
                         'success': False,
@@ -220,7 +462,8 @@ def tokenize_farm():
                 }), 500
 
         # Tokenize the farm on blockchain
-        tokenization_result = farm_tokenization.tokenize_farm(farm_name, token_number, unit_name, wallet_address)
+        wait = not wants_async_submission()
+        tokenization_result = farm_tokenization.tokenize_farm(farm_name, token_number, unit_name, wallet_address, wait=wait)
 
         if not tokenization_result['success']:
             return jsonify({
@@ -231,11 +474,14 @@ def tokenize_farm():
         # Add blockchain information to farm data
         farm_data_with_blockchain = {
             **json_data,
-            'Asset ID': tokenization_result['asset_id'],
+            'Asset ID': tokenization_result.get('asset_id'),
             'Transaction ID': tokenization_result['transaction_id'],
             'Blockchain': 'Algorand Testnet',
             'Contract Address': '745495312'
         }
+        if not wait:
+            # Asset ID stays empty until the confirmation tracker fills it in
+            farm_data_with_blockchain['Transaction Status'] = 'pending'
 
         # Save farm data to JSON file
         save_success, save_result = save_farm_data_to_json(farm_data_with_blockchain)
@@ -246,6 +492,18 @@ def tokenize_farm():
                 'error': f'Failed to save farm data: {save_result}'
             }), 500
 
+        if not wait:
+            txid = tokenization_result['transaction_id']
+            confirmation_tracker.track(txid, 'tokenize_farm', data_file=save_result)
+            return jsonify({
+                'success': True,
+                'status': 'pending',
+                'message': 'Farm tokenization submitted',
+                'transaction_id': txid,
+                'status_url': f'/tx/{txid}',
+                'data_file': save_result
+            }), 202
+
         return jsonify({
             'success': True,
             'message': 'Farm successfully tokenized!',
@@ -254,6 +512,8 @@ def tokenize_farm():
             'data_file': save_result
         })
 
+    except SubmissionRejected as e:
+        return submission_rejected(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -262,81 +522,32 @@ def tokenize_farm():
 
 @app.route('/farms', methods=['GET'])
 def get_farms():
-    """Get all farm data from JSON files"""
+    """Get farm data, optionally filtered, sorted and paginated"""
     try:
-        farms = []
-
-        # Check if data directory exists
-        if not os.path.exists(DATA_DIR):
-            return jsonify([])
-
-        # Read all JSON files in the farm_info directory
-        for filename in os.listdir(DATA_DIR):
-            if filename.endswith('.json'):
-                filepath = os.path.join(DATA_DIR, filename)
-                try:
-                    with open(filepath, 'r') as f:
-                        farm_data = json.load(f)
-
-                        # Handle different data structures
-                        if isinstance(farm_data, dict):
-                            # If the file contains a "farms" array, extract those farms
-                            if "farms" in farm_data and isinstance(farm_data["farms"], list):
-                                farms.extend(farm_data["farms"])
-                            # If it's a single farm object, add it directly
-                            elif "Farm Name" in farm_data:
-                                farms.append(farm_data)
-                        # If it's already a list, extend the farms list
-                        elif isinstance(farm_data, list):
-                            farms.extend(farm_data)
-
-                except (json.JSONDecodeError, IOError) as e:
-                    print(f"Error reading {filename}: {e}")
-                    continue
-
-        # Normalize farm data to ensure all farms have required properties
-        normalized_farms = []
-        for farm in farms:
-            normalized_farm = {
-                "Farm ID": farm.get("Farm ID", f"farm_{farm.get('Asset ID', farm.get('ASA ID', 'unknown'))}"),
-                "Farm Name": farm.get("Farm Name", "Unknown Farm"),
-                "Farmer Name": farm.get("Farmer Name", "Unknown Farmer"),
-                "Farmer Email": farm.get("Farmer Email", farm.get("Farm Email", "unknown@example.com")),
-                "Farm Email": farm.get("Farm Email", farm.get("Farmer Email", "unknown@example.com")),
-                "Farm Phone": farm.get("Farm Phone", ""),
-                "Farm Size (Acres)": farm.get("Farm Size (Acres)", 100),
-                "Crop Type": farm.get("Crop Type", "Unknown"),
-                "Farm Location": farm.get("Farm Location", "Unknown Location"),
-                "Number of Tokens": farm.get("Number of Tokens", 0),
-                "Tokens Sold": farm.get("Tokens Sold", 0),
-                "Tokens Available": farm.get("Tokens Available", farm.get("Number of Tokens", 0)),
-                "Price per Token (USD)": farm.get("Price per Token (USD)", 1.0),
-                "ASA ID": str(farm.get("ASA ID", farm.get("Asset ID", "unknown"))),
-                "Asset ID": str(farm.get("Asset ID", farm.get("ASA ID", "unknown"))),
-                "Est. APY": farm.get("Est. APY", 12.5),
-                "Harvest Date": farm.get("Harvest Date", "2024-12-31"),
-                "Farm Status": farm.get("Farm Status", "Active"),
-                # Required by FarmData interface
-                "Token Name": farm.get("Token Name", farm.get("Token Unit", "TOKEN")),
-                "Token Unit": farm.get("Token Unit", ""),
-                "Expected Yield /unit": farm.get("Expected Yield /unit", 1000),
-                "Payout Method": farm.get("Payout Method", "ALGO"),
-                "Insurance Enabled": farm.get("Insurance Enabled", True),
-                "Insurance Type": farm.get("Insurance Type", "Parametric Weather-Based"),
-                "Verification Method": farm.get("Verification Method", "Self-Reported"),
-                "Farm Images": farm.get("Farm Images", []),
-                "Local Currency": farm.get("Local Currency", "USD"),
-                # Keep original data for reference
-                "Wallet Address": farm.get("Wallet Address", ""),
-                "Transaction ID": farm.get("Transaction ID", ""),
-                "Blockchain": farm.get("Blockchain", "Algorand Testnet"),
-                "Contract Address": farm.get("Contract Address", ""),
-                "created_at": farm.get("created_at", "")
-            }
-            normalized_farms.append(normalized_farm)
+        query = FarmQuery.from_args(request.args)
+    except FarmQueryError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    def render():
+        farms, next_cursor, total = farm_search.search(query)
+        # The body stays a plain list of the fixed farm fields; paging
+        # details travel in headers
+        headers = {'X-Total-Count': str(total)}
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+        return [public_farm(farm) for farm in farms], headers
 
-        return jsonify(normalized_farms)
+    try:
+        return cached_json(('farms', request.query_string), lambda: farm_catalog.snapshot()[0], render)
 
+    except FarmQueryError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'error': f'Failed to load farm data: {str(e)}'
@@ -346,28 +557,7 @@ def get_farms():
 def get_investor_holdings():
     """Get all investor holdings"""
     try:
-        import os
-        import json
-
-        holdings = []
-        holdings_file = os.path.join(os.path.dirname(__file__), '..', 'data', 'investor_holdings.json')
-
-        if os.path.exists(holdings_file):
-            try:
-                with open(holdings_file, 'r') as f:
-                    data = json.load(f)
-                    # Handle both formats: direct array or wrapped in "holdings" property
-                    if isinstance(data, list):
-                        holdings = data
-                    elif isinstance(data, dict) and "holdings" in data:
-                        holdings = data["holdings"]
-                    else:
-                        holdings = []
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Error reading investor holdings: {e}")
-                holdings = []
-
-        return jsonify(holdings)
+        return cached_json('holdings', holdings_store.version, lambda: (holdings_store.all(), {}))
 
     except Exception as e:
         return jsonify({
@@ -394,37 +584,8 @@ def add_investor_holding():
         farm_id = json_data.get("farm_id", "")
         farm_data = None
 
-        # Try to get farm data using the same logic as /farms endpoint
         try:
-            farms = []
-            if os.path.exists(DATA_DIR):
-                for filename in os.listdir(DATA_DIR):
-                    if filename.endswith('.json'):
-                        filepath = os.path.join(DATA_DIR, filename)
-                        try:
-                            with open(filepath, 'r') as f:
-                                farm_data = json.load(f)
-
-                                # Handle different data structures
-                                if isinstance(farm_data, dict):
-                                    # If the file contains a "farms" array, extract those farms
-                                    if "farms" in farm_data and isinstance(farm_data["farms"], list):
-                                        farms.extend(farm_data["farms"])
-                                    # If it's a single farm object, add it directly
-                                    elif "Farm Name" in farm_data:
-                                        farms.append(farm_data)
-                                # If it's already a list, extend the farms list
-                                elif isinstance(farm_data, list):
-                                    farms.extend(farm_data)
-                        except (json.JSONDecodeError, IOError) as e:
-                            print(f"Error reading {filename}: {e}")
-                            continue
-
-            # Find the specific farm
-            for farm in farms:
-                if farm.get("Farm ID") == farm_id:
-                    farm_data = farm
-                    break
+            farm_data = farm_catalog.get_by_farm_id(farm_id)
         except Exception as e:
             print(f"Error loading farm data: {e}")
 
@@ -433,14 +594,9 @@ def add_investor_holding():
         investor_name = "Unknown Investor"
 
         try:
-            user_info_file = os.path.join(os.path.dirname(__file__), '..', 'data', 'user_info', 'signup_info.json')
-            if os.path.exists(user_info_file):
-                with open(user_info_file, 'r') as f:
-                    user_data = json.load(f)
-                    for user in user_data.get("users", []):
-                        if user.get("User Email") == investor_email:
-                            investor_name = f"{user.get('User First Name', '')} {user.get('User Last Name', '')}".strip()
-                            break
+            user = user_store.get(investor_email)
+            if user:
+                investor_name = f"{user.get('User First Name', '')} {user.get('User Last Name', '')}".strip()
         except Exception as e:
             print(f"Error loading user data: {e}")
 
@@ -466,31 +622,18 @@ def add_investor_holding():
             "Total Payouts Received": 0
         }
 
-        # Load existing holdings
-        holdings_file = os.path.join(os.path.dirname(__file__), '..', 'data', 'investor_holdings.json')
-        holdings = []
+        # Link the holding to a transfer submitted with ?wait=false
+        transaction_id = json_data.get("transaction_id")
+        if transaction_id:
+            holding["Transaction ID"] = transaction_id
+            tx_status = confirmation_tracker.status(transaction_id)
+            if tx_status:
+                holding["Transaction Status"] = tx_status["status"]
+                if tx_status["confirmed_round"]:
+                    holding["Confirmed Round"] = tx_status["confirmed_round"]
 
-        if os.path.exists(holdings_file):
-            try:
-                with open(holdings_file, 'r') as f:
-                    data = json.load(f)
-                    # Handle both formats: direct array or wrapped in "holdings" property
-                    if isinstance(data, list):
-                        holdings = data
-                    elif isinstance(data, dict) and "holdings" in data:
-                        holdings = data["holdings"]
-                    else:
-                        holdings = []
-            except (json.JSONDecodeError, IOError):
-                holdings = []
-
-        # Add new holding
-        holdings.append(holding)
-
-        # Save back to file
-        os.makedirs(os.path.dirname(holdings_file), exist_ok=True)
-        with open(holdings_file, 'w') as f:
-            json.dump(holdings, f, indent=2)
+        # Append to the holdings log instead of rewriting the whole file
+        holdings_store.add(holding)
 
         return jsonify({
             'success': True,
@@ -519,25 +662,26 @@ def set_mnemonic():
 
         # Validate mnemonic by trying to create an account
         try:
-            global _global_mnemonic
-            _global_mnemonic = mnemonic
-
             # For testing purposes, accept any 25-word mnemonic
             words = mnemonic.strip().split()
             if len(words) != 25:
                 raise Exception("Mnemonic must contain exactly 25 words")
 
-            # Test the mnemonic by creating a temporary instance
-            test_instance = FarmTokenization(mnemonic)
+            # Later requests reuse this one signer built from the new mnemonic
+            signer = install_mnemonic(mnemonic)
 
             return jsonify({
                 'success': True,
                 'message': 'Mnemonic set successfully',
-                'address': test_instance.deployer.address
+                'address': signer.deployer.address
             })
 
         except Exception as e:
+            global _global_mnemonic
             _global_mnemonic = None  # Clear invalid mnemonic
+            previous = signer_registry.discard(DEPLOYER)
+            if previous is not None:
+                previous.close()
             return jsonify({
                 'success': False,
                 'error': f'Invalid mnemonic: {str(e)}'
@@ -550,6 +694,7 @@ def set_mnemonic():
         }), 500
 
 @app.route('/transfer_assets', methods=['POST'])
+@idempotent
 def transfer_assets():
     """Transfer farm tokens from farmer to investor"""
     try:
@@ -569,14 +714,7 @@ def transfer_assets():
         receiver_address = json_data["receiver_address"].strip()
         amount = json_data["amount"]
 
-        # Debug: Log the exact request data
-        print(f"=== TRANSFER ASSETS REQUEST ===")
-        print(f"Raw JSON data: {json_data}")
-        print(f"Sender address: '{sender_address}' (length: {len(sender_address)})")
-        print(f"Receiver address: '{receiver_address}' (length: {len(receiver_address)})")
-        print(f"Asset ID: {asset_id}")
-        print(f"Amount: {amount}")
-        print(f"=================================")
+        app.logger.debug('Transfer of %s units of asset %s requested', amount, asset_id)
 
         # Validate amount
         if not isinstance(amount, int) or amount <= 0:
@@ -585,9 +723,9 @@ def transfer_assets():
                 'error': 'Amount must be a positive integer'
             }), 400
 
-        # Create farm tokenization instance for real blockchain transactions
+        # Process-wide farm tokenization instance for real blockchain transactions
         try:
-            farm_tokenization = FarmTokenization()
+            farm_tokenization = signer_registry.get()
         except Exception as e:
             return jsonify({
                 'success': False,
@@ -597,22 +735,11 @@ def transfer_assets():
         # Perform real asset transfer using direct algosdk
         try:
             # Import algosdk components
-            from algosdk import v2client, transaction
-
-            # Debug: Print all values before creating transaction
-            print(f"DEBUG - Sender address: '{farm_tokenization.deployer.address}' (length: {len(farm_tokenization.deployer.address)})")
-            print(f"DEBUG - Receiver address: '{receiver_address}' (length: {len(receiver_address)})")
-            print(f"DEBUG - Asset ID: {asset_id} (type: {type(asset_id)})")
-            print(f"DEBUG - Amount: {amount} (type: {type(amount)})")
-
-            # Create algod client for TestNet
-            algod_client = v2client.algod.AlgodClient(
-                algod_token="",
-                algod_address="https://testnet-api.algonode.cloud"
-            )
+            from algosdk import transaction
 
-            # Get suggested parameters
-            params = algod_client.suggested_params()
+            # Shared pooled algod client and cached suggested parameters
+            algod = chain.algod_service()
+            params = algod.suggested_params()
 
             # Create asset transfer transaction
             txn = transaction.AssetTransferTxn(
@@ -624,13 +751,27 @@ def transfer_assets():
             )
 
             # Sign the transaction
-            signed_txn = txn.sign(farm_tokenization.deployer.private_key)
+            with metrics.ALGOD_PHASE_SECONDS.time('sign'):
+                signed_txn = txn.sign(farm_tokenization.deployer.private_key)
 
             # Submit the transaction
-            txid = algod_client.send_transaction(signed_txn)
+            txid = algod.send_transaction(signed_txn)
+
+            if wants_async_submission():
+                track_transfer(txid, asset_id, amount, receiver_address)
+                return jsonify({
+                    'success': True,
+                    'status': 'pending',
+                    'message': f'Transfer of {amount} tokens submitted',
+                    'transaction_id': txid,
+                    'status_url': f'/tx/{txid}',
+                    'asset_id': asset_id,
+                    'amount': amount,
+                    'receiver': receiver_address
+                }), 202
 
             # Wait for confirmation
-            confirmed_txn = transaction.wait_for_confirmation(algod_client, txid, 4)
+            confirmed_txn = algod.wait_for_confirmation(txid, 4)
 
             return jsonify({
                 'success': True,
@@ -642,6 +783,8 @@ def transfer_assets():
                 'confirmed_round': confirmed_txn.get('confirmed-round')
             })
 
+        except SubmissionRejected as e:
+            return submission_rejected(e)
         except Exception as e:
             return jsonify({
                 'success': False,
@@ -654,9 +797,153 @@ def transfer_assets():
             'error': f'Server error: {str(e)}'
         }), 500
 
+@app.route('/transfer_assets/batch', methods=['POST'])
+@idempotent
+def transfer_assets_batch():
+    """Transfer farm tokens to many investors in atomic groups of up to 16"""
+    from agritoken.batch_transfer import InvalidTransfer, build_transfer_groups, submit_groups, validate_transfers
+
+    try:
+        json_data = request.get_json()
+
+        if not json_data or not json_data.get("asset_id"):
+            return jsonify({
+                'success': False,
+                'error': 'Missing required field: asset_id'
+            }), 400
+
+        transfers = json_data.get("transfers")
+
+        # Every item is checked before any group is built or signed
+        try:
+            asset_id = validate_transfers(json_data["asset_id"], transfers)
+        except InvalidTransfer as e:
+            body = {
+                'success': False,
+                'error': str(e)
+            }
+            if e.index is not None:
+                body['index'] = e.index
+            return jsonify(body), 400
+
+        try:
+            farm_tokenization = signer_registry.get()
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'Failed to initialize blockchain connection: {str(e)}'
+            }), 500
+
+        try:
+            algod = chain.algod_service()
+            params = algod.suggested_params()
+
+            # One shared set of params and one deployer key for every group
+            groups = build_transfer_groups(farm_tokenization.deployer.address, params, asset_id, transfers)
+            with metrics.ALGOD_PHASE_SECONDS.time('sign'):
+                signed_groups = farm_tokenization.signing.sign_groups(groups)
+
+            wait = not wants_async_submission()
+            group_results = submit_groups(algod, signed_groups, wait=wait)
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'Batch transfer failed: {str(e)}'
+            }), 500
+
+        # No group was accepted: let the client back off and retry the whole batch
+        if all(group_result['status'] == 'rejected' for group_result in group_results):
+            return submission_rejected(group_results[0]['rejection'])
+
+        # Fan group outcomes back out to one entry per receiver
+        results = []
+        items = iter(transfers)
+        for group_result in group_results:
+            for txid in group_result['txids']:
+                item = next(items)
+                receiver_address = item["receiver_address"].strip()
+                if not wait and group_result['success']:
+                    track_transfer(txid, asset_id, item["amount"], receiver_address)
+                results.append({
+                    'receiver': receiver_address,
+                    'amount': item["amount"],
+                    'success': group_result['success'],
+                    'status': group_result['status'],
+                    'transaction_id': txid,
+                    'group_transaction_id': group_result['transaction_id'],
+                    'confirmed_round': group_result.get('confirmed_round'),
+                    'error': group_result.get('error')
+                })
+
+        succeeded = sum(1 for r in results if r['success'])
+        return jsonify({
+            'success': succeeded == len(results),
+            'asset_id': asset_id,
+            'groups': len(group_results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results
+        }), (202 if not wait else 200)
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/tx/<txid>', methods=['GET'])
+def get_transaction_status(txid):
+    """Get the confirmation status of a transaction submitted with ?wait=false"""
+    try:
+        # Falls back to algod and the indexer for txids submitted through another worker
+        status = confirmation_tracker.lookup(txid)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to look up transaction: {str(e)}'
+        }), 503
+    if status is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown transaction ID'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        **status
+    })
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'message': 'Farm Tokenization API is running'})
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe; ?warm=true loads the blockchain stack before answering"""
+    result = {'status': 'ready'}
+    if request.args.get('warm', 'false').lower() in ('true', '1', 'yes'):
+        try:
+            result['warm_seconds'] = round(chain.warm(), 4)
+        except Exception as e:
+            return jsonify({
+                'status': 'unavailable',
+                'error': f'Failed to load blockchain stack: {str(e)}'
+            }), 503
+
+        # Build the deployer signer too when a key is configured; none yet is fine
+        try:
+            signer_registry.get()
+            result['signer_ready'] = True
+        except Exception:
+            result['signer_ready'] = False
+
+    result['chain_loaded'] = chain.loaded()
+    return jsonify(result)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, file and algod timings in the Prometheus text format"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
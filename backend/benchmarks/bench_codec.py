@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Encode/decode throughput of agritoken.codec against the stdlib json module.
+
+Builds --sizes lists of farms and holdings from the records in data/
+(langs_farm.json and investor_holdings.json), varying IDs, emails and
+numbers so no two records are identical, then times each codec on the
+shapes the servers actually move: compact HTTP bodies, the indented data
+files and parsing both back.
+
+    python benchmarks/bench_codec.py --sizes 10000 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from agritoken import codec
+
+DATA_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data')
+
+
+def templates():
+    farms = codec.load_file(os.path.join(DATA_ROOT, 'farm_info', 'langs_farm.json'))["farms"]
+    holdings = codec.load_file(os.path.join(DATA_ROOT, 'investor_holdings.json'))
+    return farms, holdings
+
+
+def replicate(records, count, vary):
+    out = []
+    for i in range(count):
+        record = dict(records[i % len(records)])
+        vary(record, i)
+        out.append(record)
+    return out
+
+
+def vary_farm(farm, i):
+    farm["Farm ID"] = f"farm_{i:06d}"
+    farm["Asset ID"] = 700000000 + i
+    farm["Farmer Email"] = f"farmer{i % 5000}@example.com"
+    farm["Tokens Available"] = (i * 37) % 100000
+    farm["Price per Token (USD)"] = round(5 + (i % 400) * 0.125, 3)
+
+
+def vary_holding(holding, i):
+    holding["Investor Email"] = f"investor{i % 20000}@example.com"
+    holding["Farm ID"] = f"farm_{i % 2000:06d}"
+    holding["Tokens Owned"] = 1 + (i * 13) % 5000
+    holding["Cost Basis"] = holding["Tokens Owned"] * 12.5
+
+
+def stdlib_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def stdlib_dumps_file(obj):
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def timed(fn, arg, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(label, records, nbytes, stdlib_time, codec_time):
+    print(f"  {label:<16} stdlib {records / stdlib_time:>12,.0f} rec/s {nbytes / stdlib_time / 1e6:>8.1f} MB/s"
+          f"   codec {records / codec_time:>12,.0f} rec/s {nbytes / codec_time / 1e6:>8.1f} MB/s"
+          f"   x{stdlib_time / codec_time:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    farm_templates, holding_templates = templates()
+    print(f"codec backend: {'orjson' if codec.orjson is not None else 'stdlib json'}")
+    for size in args.sizes:
+        shapes = (
+            ("farms", {"farms": replicate(farm_templates, size, vary_farm)}),
+            ("holdings", replicate(holding_templates, size, vary_holding)),
+        )
+        for name, doc in shapes:
+            compact = codec.dumps(doc)
+            indented = codec.dumps_file(doc, compact=False)
+            print(f"{size} {name}: {len(compact) / 1e6:.1f} MB compact, {len(indented) / 1e6:.1f} MB indented")
+            report("dumps", size, len(compact),
+                   timed(stdlib_dumps, doc, args.repeat), timed(codec.dumps, doc, args.repeat))
+            report("dumps indent=2", size, len(indented),
+                   timed(stdlib_dumps_file, doc, args.repeat),
+                   timed(lambda d: codec.dumps_file(d, compact=False), doc, args.repeat))
+            report("loads", size, len(compact),
+                   timed(json.loads, compact, args.repeat), timed(codec.loads, compact, args.repeat))
+            report("loads indented", size, len(indented),
+                   timed(json.loads, indented, args.repeat), timed(codec.loads, indented, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
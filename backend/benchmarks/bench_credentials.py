@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Logins/sec for the scrypt credential service at several cost settings.
+
+Each run fires --concurrency concurrent verifications on one event loop, the
+way uvicorn handles simultaneous /api/login calls, and reports throughput
+plus how long the loop itself was blocked (it should stay near zero).
+
+    python benchmarks/bench_credentials.py --costs 12 14 16 --logins 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from agritoken.credentials import CredentialService
+
+
+async def measure_loop_lag(stop, samples, interval=0.005):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def run(service, logins, concurrency):
+    stored = service.hash_password("correct horse battery staple")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            ok, _ = await service.verify(stored, "correct horse battery staple")
+            assert ok
+
+    stop = asyncio.Event()
+    lag = []
+    monitor = asyncio.create_task(measure_loop_lag(stop, lag))
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    return logins / elapsed, max(lag, default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--costs', type=int, nargs='+', default=[12, 14, 15], help='log2 of scrypt n')
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+
+    print(f"{'scrypt n':>10} {'workers':>8} {'logins/sec':>12} {'max loop lag (ms)':>18}")
+    for cost in args.costs:
+        service = CredentialService(n=2 ** cost, max_workers=args.workers)
+        rate, lag = asyncio.run(run(service, args.logins, args.concurrency))
+        service.shutdown()
+        print(f"{'2^' + str(cost):>10} {args.workers:>8} {rate:>12.1f} {lag * 1000:>18.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Per-endpoint latency and throughput of both servers across data sizes.
+
+For every --sizes entry (investor holdings rows; farms and investors scale
+with it, see datagen.py) a synthetic data directory is generated and a
+fresh worker process imports the Flask app and the FastAPI app against it
+through AGRITOKEN_DATA_DIR. Each endpoint is then driven in process, Flask
+through ``app.test_client()`` and FastAPI through ``TestClient``, and
+p50/p95/p99 latency and sequential requests per second are reported per
+endpoint per size.
+
+Endpoints that sign or submit Algorand transactions (/tokenize_farm,
+/transfer_assets, /set_mnemonic) need a node and a funded account and are
+not measured. Signup and login pay for a scrypt hash on every request, so
+they run --kdf-requests times instead of --requests.
+
+Save a run and compare later runs against it; any endpoint whose p99 grew
+by more than --tolerance (a ratio) is listed and the exit status is 1:
+
+    python benchmarks/bench_endpoints.py --sizes 1000 10000 --save baseline.json
+    python benchmarks/bench_endpoints.py --sizes 1000 10000 --baseline baseline.json --tolerance 1.5
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from datagen import PASSWORD, generate
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def scenarios(data_root, rng):
+    """``(server, name, heavy, request)`` for every measured endpoint"""
+    with open(os.path.join(data_root, "investor_holdings.json"), 'r', encoding='utf-8') as f:
+        holdings = json.load(f)
+    with open(os.path.join(data_root, "farm_info", "langs_farm.json"), 'r', encoding='utf-8') as f:
+        listed = json.load(f)["farms"]
+    held_farms = sorted({holding["Farm ID"] for holding in holdings})
+    investors = sorted({holding["Investor Email"] for holding in holdings})
+    farms_by_id = {farm["Farm ID"]: farm for farm in listed}
+    buyable = [farm for farm in listed if farm["Tokens Available"] > 0]
+    # The FastAPI server only sees the farm list file, not single-farm files
+    payable = [farm_id for farm_id in held_farms if farm_id in farms_by_id]
+
+    def pick(items):
+        return items[rng.randrange(len(items))]
+
+    def invest(c):
+        farm = pick(buyable)
+        return c.post("/api/invest", json={
+            "farm_id": farm["Farm ID"], "investor_email": pick(investors),
+            "tokens_to_buy": 1, "total_cost": farm["Price per Token (USD)"]})
+
+    def payout(farm_id):
+        return {"farm_id": farm_id, "payout_amount": 1000.0, "payout_date": "2026-01-01", "description": "bench"}
+
+    return [
+        ("flask", "GET /health", False, lambda c: c.get("/health")),
+        ("flask", "GET /farms", False, lambda c: c.get("/farms")),
+        ("flask", "GET /farms?crop&sort&limit", False,
+         lambda c: c.get("/farms?crop=Coffee&available=true&sort=-price&limit=20")),
+        ("flask", "GET /investor-holdings", False, lambda c: c.get("/investor-holdings")),
+        ("flask", "POST /investor-holdings", False, lambda c: c.post("/investor-holdings", json={
+            "farm_id": pick(held_farms), "investor_email": pick(investors), "tokens_owned": 5, "cost_basis": 50})),
+        ("flask", "GET /tx/<id> (unknown)", False, lambda c: c.get(f"/tx/{uuid.uuid4().hex}")),
+        ("fastapi", "GET /", False, lambda c: c.get("/")),
+        ("fastapi", "GET /api/health", False, lambda c: c.get("/api/health")),
+        ("fastapi", "POST /api/signup", True, lambda c: c.post("/api/signup", json={
+            "firstName": "Bench", "lastName": "Signup", "email": f"signup-{uuid.uuid4().hex}@example.com",
+            "password": PASSWORD, "walletAddress": "BENCH", "role": "Investor"})),
+        ("fastapi", "POST /api/login", True, lambda c: c.post("/api/login", json={
+            "email": pick(investors), "password": PASSWORD})),
+        ("fastapi", "GET /api/farms", False, lambda c: c.get("/api/farms")),
+        ("fastapi", "GET /api/farms?crop&sort&limit", False,
+         lambda c: c.get("/api/farms?crop=Coffee&available=true&sort=-price&limit=20")),
+        ("fastapi", "GET /api/farms/{email}", False,
+         lambda c: c.get(f"/api/farms/{pick(listed)['Farmer Email']}")),
+        ("fastapi", "GET /api/investor-holdings/{email}", False,
+         lambda c: c.get(f"/api/investor-holdings/{pick(investors)}")),
+        ("fastapi", "GET /api/portfolio/{email}", False, lambda c: c.get(f"/api/portfolio/{pick(investors)}")),
+        ("fastapi", "POST /api/simulate-payout", False,
+         lambda c: c.post("/api/simulate-payout", json=payout(pick(payable)))),
+        ("fastapi", "POST /api/simulate-payout/batch", False, lambda c: c.post(
+            "/api/simulate-payout/batch", json={"scenarios": [payout(pick(payable)) for _ in range(20)]}
+        )),
+        ("fastapi", "POST /api/farms", False, lambda c: c.post("/api/farms", json={
+            "Farm ID": f"bench_{uuid.uuid4().hex[:12]}", "Farm Name": "Bench Farm",
+            "Farmer Email": "farmer0@example.com"})),
+        ("fastapi", "POST /api/invest", False, invest),
+    ]
+
+
+def worker(data_root, requests, kdf_requests, warmup, seed):
+    """Import both apps against ``data_root`` and time every scenario"""
+    sys.path.insert(0, os.path.join(BACKEND_DIR, 'projects', 'backend'))
+
+    from fastapi.testclient import TestClient
+
+    import app as flask_app
+    import simple_server
+
+    clients = {"flask": flask_app.app.test_client(), "fastapi": TestClient(simple_server.app)}
+    rng = random.Random(seed)
+    results = {}
+    for server, name, heavy, send in scenarios(data_root, rng):
+        client = clients[server]
+        count = kdf_requests if heavy else requests
+        statuses = {}
+        for _ in range(0 if heavy else warmup):
+            send(client)
+        samples = []
+        start = time.perf_counter()
+        for _ in range(count):
+            t0 = time.perf_counter()
+            resp = send(client)
+            samples.append(time.perf_counter() - t0)
+            statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+        elapsed = time.perf_counter() - start
+        results[f"{server} {name}"] = {
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+            "rps": count / elapsed if elapsed else 0.0,
+            "statuses": {str(status): n for status, n in sorted(statuses.items())},
+        }
+    return results
+
+
+def run_size(size, args):
+    """Generate a data directory for ``size`` and measure it in a fresh process"""
+    workdir = tempfile.mkdtemp(prefix='agritoken-endpoints-')
+    try:
+        start = time.perf_counter()
+        farms = max(10, size // 100)
+        counts = generate(workdir, farms=farms, holdings=size, investors=max(10, size // 10),
+                          farm_files=max(1, farms // 10), seed=args.seed)
+        print(f"\n== {size} holdings: {counts['farms']} farms, {counts['users']} users "
+              f"(generated in {time.perf_counter() - start:.1f}s)")
+        env = dict(os.environ, AGRITOKEN_DATA_DIR=workdir, AGRITOKEN_STORAGE=args.storage,
+                   AGRITOKEN_SQLITE_PATH=os.path.join(workdir, 'agritoken.db'))
+        if args.storage == 'sqlite':
+            subprocess.run([sys.executable, '-m', 'agritoken.migrate', workdir], cwd=BACKEND_DIR, env=env,
+                           check=True, stdout=subprocess.DEVNULL)
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', workdir, '--requests', str(args.requests),
+             '--kdf-requests', str(args.kdf_requests), '--warmup', str(args.warmup), '--seed', str(args.seed)],
+            cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.PIPE, text=True
+        ).stdout
+        # The apps print while importing; the results are the last line
+        return json.loads(out.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def report(results):
+    print(f"{'endpoint':<48}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>10}  statuses")
+    for name, r in results.items():
+        print(f"{name:<48}{r['p50_ms']:9.2f}{r['p95_ms']:9.2f}{r['p99_ms']:9.2f}{r['rps']:10.0f}  {r['statuses']}")
+
+
+def regressions(runs, baseline, tolerance, floor_ms):
+    """``(size, endpoint, before, after)`` for every p99 beyond the tolerance"""
+    found = []
+    for size, results in runs.items():
+        for name, r in results.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            # Sub-millisecond timings are mostly noise; compare them against the floor
+            if r["p99_ms"] > max(before["p99_ms"], floor_ms) * tolerance:
+                found.append((size, name, before["p99_ms"], r["p99_ms"]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='investor holdings rows per run (1000 to 1000000)')
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per endpoint')
+    parser.add_argument('--kdf-requests', type=int, default=10, help='timed requests for signup and login')
+    parser.add_argument('--warmup', type=int, default=5, help='untimed requests per endpoint first')
+    parser.add_argument('--storage', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed p99 growth over the baseline')
+    parser.add_argument('--floor-ms', type=float, default=1.0, help='p99 below this never counts as a regression')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        results = worker(args.worker, args.requests, args.kdf_requests, args.warmup, args.seed)
+        sys.stdout.write("\n" + json.dumps(results) + "\n")
+        return
+
+    runs = {}
+    for size in args.sizes:
+        runs[str(size)] = run_size(size, args)
+        report(runs[str(size)])
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(runs, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        found = regressions(runs, baseline, args.tolerance, args.floor_ms)
+        for size, name, before, after in found:
+            print(f"REGRESSION {size:>8} {name}: p99 {before:.2f}ms -> {after:.2f}ms")
+        if found:
+            sys.exit(1)
+        print(f"\nNo p99 regressions beyond {args.tolerance}x the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Cost of recording a metric on the request path.
+
+Times ``Histogram.observe`` and ``Counter.inc`` from agritoken.metrics, which
+write to a per-thread shard, against the same update done under one shared
+lock, from 1 and --threads threads, and the cost of rendering /metrics
+afterwards.
+
+    python benchmarks/bench_metrics.py --ops 200000 --threads 8
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from agritoken.metrics import LATENCY_BUCKETS, Registry
+
+
+class LockedHistogram:
+    """The straightforward alternative: one dict behind one lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+
+    def observe(self, value, *labels):
+        with self._lock:
+            row = self._rows.get(labels)
+            if row is None:
+                row = self._rows[labels] = [0] * (len(LATENCY_BUCKETS) + 3)
+            row[bisect_left(LATENCY_BUCKETS, value)] += 1
+            row[-2] += value
+            row[-1] += 1
+
+
+def run(label, record, ops, threads):
+    def work():
+        for i in range(ops):
+            record(i)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {threads:>2} threads  {elapsed / (ops * threads) * 1e9:8.0f} ns/op")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=200000, help='operations per thread')
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    registry = Registry()
+    histogram = registry.histogram("bench_seconds", "bench", ("app", "endpoint"))
+    counter = registry.counter("bench_total", "bench", ("op",))
+    locked = LockedHistogram()
+    labels = [("flask", f"/route/{i}") for i in range(8)]
+
+    for threads in sorted({1, args.threads}):
+        run("sharded histogram observe", lambda i: histogram.observe(0.003, *labels[i & 7]), args.ops, threads)
+        run("locked histogram observe", lambda i: locked.observe(0.003, *labels[i & 7]), args.ops, threads)
+        run("sharded counter inc", lambda i: counter.inc("read", amount=128), args.ops, threads)
+
+    start = time.perf_counter()
+    body = registry.render()
+    print(f"render: {len(body)} bytes in {(time.perf_counter() - start) * 1000:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+On-chain reconciliation against a stand-in indexer with synthetic drift.
+
+Builds a temporary data directory with --assets tokenized farms, each held
+by --holders investors, and a matching indexer fixture (see
+fake_indexer.py). A --drift fraction of farm counters and holdings is then
+nudged off the chain values, and a few untracked holders are added. The
+reconciler runs three times: a dry run that should find exactly the
+injected drift, an applying run, and a final dry run that should only
+report the untracked holders. --latency adds a per-request delay to mimic
+a remote indexer, which is where --concurrency pays off.
+
+    python benchmarks/bench_reconcile.py --assets 2000 --holders 50 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+
+import httpx
+
+from agritoken.backends import JsonBackend, SqliteBackend
+from agritoken.migrate import migrate
+from agritoken.reconcile import AsyncIndexer, Reconciler
+from fake_indexer import create_app
+
+CREATOR = "CREATOR" + "A" * 51
+
+
+def address(i):
+    return f"INV{i:055d}"
+
+
+def build(workdir, assets, holders, drift, rng):
+    """Write the local data files and return the indexer fixture and injected drift"""
+    farms, holdings, users, fixture = [], [], [], {}
+    investors = assets * holders // 4 + holders
+    for i in range(investors):
+        users.append({"User Email": f"investor{i}@example.com", "Wallet Address": address(i),
+                      "User First Name": "Bench", "User Last Name": str(i), "User Role": "Investor"})
+    injected = {"farm": 0, "holding": 0, "untracked": 0}
+    for a in range(assets):
+        asset_id = 800000000 + a
+        total = 100000
+        balances = []
+        sold = 0
+        for investor in rng.sample(range(investors), holders):
+            amount = rng.randint(1, 500)
+            sold += amount
+            balances.append({"address": address(investor), "amount": amount, "is-frozen": False, "deleted": False})
+            owned = amount
+            if rng.random() < drift:
+                owned += rng.choice((-1, 1)) * rng.randint(1, min(amount, 50))
+                injected["holding"] += 1
+            holdings.append({"Investor Email": f"investor{investor}@example.com", "Farm ID": f"farm_{a}",
+                             "Farm Name": f"Farm {a}", "Tokens Owned": owned, "Cost Basis": owned * 10,
+                             "Token Price": 10, "Est. Value": owned * 10, "Total Payouts Received": 0})
+        if rng.random() < drift:
+            balances.append({"address": "UNTRACKED" + f"{a:049d}", "amount": 7, "is-frozen": False, "deleted": False})
+            sold += 7
+            injected["untracked"] += 1
+        balances.append({"address": CREATOR, "amount": total - sold, "is-frozen": False, "deleted": False})
+        balances.sort(key=lambda b: b["address"])
+        local_sold = sold
+        if rng.random() < drift:
+            local_sold += rng.randint(1, 100)
+            injected["farm"] += 1
+        farms.append({"Farm ID": f"farm_{a}", "Farm Name": f"Farm {a}", "Asset ID": asset_id,
+                      "Number of Tokens": total, "Tokens Sold": local_sold, "Tokens Available": total - local_sold,
+                      "Price per Token (USD)": 10})
+        fixture[asset_id] = {"params": {"creator": CREATOR, "reserve": CREATOR, "total": total, "decimals": 0},
+                             "balances": balances}
+
+    os.makedirs(os.path.join(workdir, "farm_info"))
+    os.makedirs(os.path.join(workdir, "user_info"))
+    with open(os.path.join(workdir, "farm_info", "bench_farms.json"), 'w') as f:
+        json.dump({"farms": farms}, f)
+    with open(os.path.join(workdir, "investor_holdings.json"), 'w') as f:
+        json.dump(holdings, f)
+    with open(os.path.join(workdir, "user_info", "signup_info.json"), 'w') as f:
+        json.dump({"users": users}, f)
+    return fixture, injected
+
+
+async def reconcile(backend, app, concurrency, page_size, apply):
+    indexer = AsyncIndexer("http://indexer", max_connections=concurrency, page_size=page_size,
+                           transport=httpx.ASGITransport(app=app))
+    try:
+        start = time.perf_counter()
+        report = await Reconciler(backend, indexer, concurrency).run(apply=apply)
+        return report, time.perf_counter() - start
+    finally:
+        await indexer.close()
+
+
+def summarize(label, report, elapsed):
+    kinds = {}
+    for correction in report["corrections"]:
+        kinds[correction["kind"]] = kinds.get(correction["kind"], 0) + 1
+    print(f"{label:<10} {elapsed:7.2f}s  {report['fetched']}/{report['assets']} assets, "
+          f"{report['holders']} holders, corrections {kinds or '{}'}, applied {report['applied']}, "
+          f"errors {len(report['errors'])}")
+    return kinds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--assets', type=int, default=2000)
+    parser.add_argument('--holders', type=int, default=50)
+    parser.add_argument('--drift', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--page-size', type=int, default=25, help='small pages exercise pagination')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per indexer request')
+    parser.add_argument('--storage', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='agritoken-reconcile-')
+    try:
+        fixture, injected = build(workdir, args.assets, args.holders, args.drift, random.Random(args.seed))
+        print(f"Injected drift: {injected}")
+        if args.storage == 'sqlite':
+            db_path = os.path.join(workdir, 'agritoken.db')
+            migrate(workdir, db_path)
+            backend = SqliteBackend(db_path)
+        else:
+            backend = JsonBackend(workdir)
+        app = create_app(fixture, args.latency)
+
+        dry = summarize("dry run", *asyncio.run(reconcile(backend, app, args.concurrency, args.page_size, False)))
+        summarize("apply", *asyncio.run(reconcile(backend, app, args.concurrency, args.page_size, True)))
+        after = summarize("re-check", *asyncio.run(reconcile(backend, app, args.concurrency, args.page_size, False)))
+
+        if dry != {kind: count for kind, count in injected.items() if count}:
+            print("Dry run did not match the injected drift")
+        if set(after) - {"untracked"}:
+            print("Corrections remain after applying")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
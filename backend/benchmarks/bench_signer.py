@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Per-request signer setup: a fresh FarmTokenization versus the registry.
+
+Imports the Flask app against an empty temporary data directory, installs a
+generated mnemonic through /set_mnemonic and times:
+
+* setup alone: ``FarmTokenization()`` (algokit client, failed DEPLOYER lookup
+  in the environment, key derivation), as every request used to do, against
+  ``signer_registry.get()``
+* a whole ``POST /transfer_assets?wait=false`` through the test client against
+  an in-process fake algod (fake_algod.py), once with a registry that builds
+  a new FarmTokenization per call and once with the real one
+
+    python benchmarks/bench_signer.py --setups 500 --requests 300
+"""
+import argparse
+import itertools
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+
+from algosdk import account, mnemonic
+
+from fake_algod import create_app, serve_in_thread
+
+
+class PerRequestSigner:
+    """Stands in for the registry the way the endpoints used to behave"""
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def get(self, name=None):
+        return self._factory()
+
+
+def time_calls(fn, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def describe(label, samples):
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{label:<40} mean {statistics.mean(samples) * 1e6:9.1f}us  p99 {p99 * 1e6:9.1f}us")
+    return statistics.mean(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--setups', type=int, default=500, help='setup-only iterations')
+    parser.add_argument('--requests', type=int, default=300, help='transfer requests per variant')
+    args = parser.parse_args()
+
+    algod_url, algod_server = serve_in_thread(create_app(confirm_delay=0.5, round_time=0.5))
+    workdir = tempfile.mkdtemp(prefix='agritoken-signer-')
+    os.environ.update(AGRITOKEN_DATA_DIR=workdir, AGRITOKEN_ALGOD_ADDRESS=algod_url,
+                      # Measure the signer, not the submission rate limit
+                      AGRITOKEN_SUBMIT_RATE='100000')
+    try:
+        import app as flask_app
+
+        client = flask_app.app.test_client()
+        key, address = account.generate_account()
+        resp = client.post('/set_mnemonic', json={'mnemonic': mnemonic.from_private_key(key)})
+        assert resp.status_code == 200, resp.get_json()
+
+        before = describe("setup: FarmTokenization()", time_calls(flask_app.FarmTokenization, args.setups))
+        after = describe("setup: signer_registry.get()", time_calls(flask_app.signer_registry.get, args.setups))
+        print(f"saved per request: {(before - after) * 1e6:.1f}us ({before / after:.0f}x)")
+
+        _, receiver = account.generate_account()
+        amounts = itertools.count(1)
+
+        def transfer():
+            # A distinct amount per request keeps txids unique; algod refuses a repeat
+            body = {'asset_id': 900000000, 'sender_address': address, 'receiver_address': receiver,
+                    'amount': next(amounts)}
+            resp = client.post('/transfer_assets?wait=false', json=body)
+            assert resp.status_code == 202, resp.get_json()
+
+        registry = flask_app.signer_registry
+        # The endpoint prints debug lines per request; keep them out of the report
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            flask_app.signer_registry = PerRequestSigner(flask_app.FarmTokenization)
+            per_request = time_calls(transfer, args.requests)
+            flask_app.signer_registry = registry
+            shared = time_calls(transfer, args.requests)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        before = describe("transfer: signer built per request", per_request)
+        after = describe("transfer: shared signer", shared)
+        print(f"saved per request: {(before - after) * 1e6:.1f}us")
+    finally:
+        algod_server.should_exit = True
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
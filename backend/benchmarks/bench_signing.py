@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Signing throughput for large transfer batches, inline and across processes.
+
+Builds --txns asset transfers in atomic groups of 16 (as
+/transfer_assets/batch does) and measures signed transactions per second:
+
+* algosdk: ``txn.sign`` per transaction plus the ``get_txid`` and msgpack
+  encoding the batch endpoint used to do on submission
+* inline: ``agritoken.signing.SigningService`` in the calling thread
+* N workers: the same service with a process pool of N workers, for each
+  --workers entry (pool start-up is timed separately)
+
+Scaling stops at the number of cores, printed first.
+
+    python benchmarks/bench_signing.py --txns 4000 --workers 2 4 8
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from algosdk import account, encoding, transaction
+
+from agritoken.signing import SigningService
+
+GENESIS_ID = "testnet-v1.0"
+GENESIS_HASH = "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI="
+
+
+def build_groups(sender, count):
+    params = transaction.SuggestedParams(1000, 50000000, 50001000, GENESIS_HASH, GENESIS_ID, flat_fee=True)
+    receivers = [account.generate_account()[1] for _ in range(min(count, 64))]
+    txns = [transaction.AssetTransferTxn(sender, params, receivers[i % len(receivers)], i + 1, 900000000)
+            for i in range(count)]
+    groups = [txns[i:i + 16] for i in range(0, count, 16)]
+    for group in groups:
+        if len(group) > 1:
+            transaction.assign_group_id(group)
+    return groups
+
+
+def algosdk_sign(private_key, groups):
+    with warnings.catch_warnings():
+        # Transaction.sign is deprecated in favour of signers; it is the old path being measured
+        warnings.simplefilter('ignore', DeprecationWarning)
+        return [[(txn.get_txid(), base64.b64decode(encoding.msgpack_encode(txn.sign(private_key))))
+                 for txn in group] for group in groups]
+
+
+def best_of(fn, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--txns', type=int, default=4000, help='transactions per batch')
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8], help='pool sizes to try')
+    parser.add_argument('--rounds', type=int, default=3, help='timed batches per variant (best is kept)')
+    args = parser.parse_args()
+
+    private_key, sender = account.generate_account()
+    groups = build_groups(sender, args.txns)
+    print(f"{args.txns} transactions in {len(groups)} groups, {os.cpu_count()} cores")
+
+    baseline, expected = best_of(lambda: algosdk_sign(private_key, groups), args.rounds)
+    print(f"{'algosdk sign + txid + encode':<32}{args.txns / baseline:10.0f} txn/s")
+
+    inline = SigningService(private_key, workers=1)
+    elapsed, signed = best_of(lambda: inline.sign_groups(groups), args.rounds)
+    assert signed == expected, "inline signatures differ from algosdk's"
+    print(f"{'inline':<32}{args.txns / elapsed:10.0f} txn/s  {baseline / elapsed:5.2f}x algosdk")
+
+    for workers in args.workers:
+        service = SigningService(private_key, workers=workers, inline_below=1)
+        start = time.perf_counter()
+        # The first batch pays for starting the pool
+        service.sign_groups(groups[:1] * workers)
+        startup = time.perf_counter() - start
+        pooled, signed = best_of(lambda: service.sign_groups(groups), args.rounds)
+        service.close()
+        assert signed == expected, f"{workers}-worker signatures differ from algosdk's"
+        print(f"{f'{workers} workers':<32}{args.txns / pooled:10.0f} txn/s  {elapsed / pooled:5.2f}x inline"
+              f"  (pool start {startup * 1000:.0f}ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Indexed lookups on the SQLite backend as the holdings table grows.
+
+Fills a temporary database with --holdings synthetic holdings spread over
+--farms farms, then times the lookups the API makes per request: holdings
+by investor, holdings by farm, an investor's position in one farm (the
+purchase path), an investor's portfolio totals and farm by Farm ID / Asset
+ID.
+
+    python benchmarks/bench_sqlite_lookups.py --holdings 1000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from agritoken.sqlite_store import SqliteDatabase, SqliteFarmCatalog, SqliteHoldingsStore, insert_farm, insert_holding
+
+
+def populate(db, holdings, farms, investors):
+    with db.transaction() as conn:
+        for f in range(farms):
+            insert_farm(conn, "bench.json", {
+                "Farm ID": f"farm_{f}", "Asset ID": 1000 + f, "Farm Name": f"Farm {f}",
+                "Farmer Email": f"farmer{f % 100}@example.com", "Price per Token (USD)": 10,
+            })
+        for h in range(holdings):
+            insert_holding(conn, {
+                "Investor Email": f"investor{h % investors}@example.com",
+                "Farm ID": f"farm_{h % farms}",
+                "Tokens Owned": 10, "Cost Basis": 100, "Transaction ID": f"TX{h}",
+            })
+        for table in ("farms", "holdings"):
+            db.bump(conn, table)
+    db.connection().execute("ANALYZE")
+
+
+def timed(label, fn, args, repeat):
+    start = time.perf_counter()
+    for arg in args[:repeat]:
+        fn(arg)
+    per_call = (time.perf_counter() - start) / repeat
+    print(f"{label:<32} {per_call * 1e6:>10.1f} us/lookup")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--holdings', type=int, default=1_000_000)
+    parser.add_argument('--farms', type=int, default=2_000)
+    parser.add_argument('--investors', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=2_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='agritoken-sqlite-')
+    try:
+        db = SqliteDatabase(os.path.join(workdir, 'bench.db'))
+        start = time.perf_counter()
+        populate(db, args.holdings, args.farms, args.investors)
+        print(f"Loaded {args.holdings} holdings / {args.farms} farms in {time.perf_counter() - start:.1f}s")
+
+        holdings = SqliteHoldingsStore(db)
+        catalog = SqliteFarmCatalog(db)
+        rng = random.Random(1)
+        investors = [f"investor{rng.randrange(args.investors)}@example.com" for _ in range(args.repeat)]
+        farm_ids = [f"farm_{rng.randrange(args.farms)}" for _ in range(args.repeat)]
+        conn = db.connection()
+
+        timed("holdings by investor", holdings.for_investor, investors, args.repeat)
+        timed("portfolio by investor", holdings.portfolio, investors, args.repeat)
+        timed("holdings by farm (first 100)", lambda farm_id: conn.execute(
+            "SELECT doc FROM holdings WHERE farm_id = ? ORDER BY id LIMIT 100", (farm_id,)).fetchall(),
+            farm_ids, args.repeat)
+        timed("position (investor, farm)", lambda pair: conn.execute(
+            "SELECT id FROM holdings WHERE investor_email = ? AND farm_id = ? ORDER BY id LIMIT 1", pair).fetchone(),
+            list(zip(investors, farm_ids)), args.repeat)
+        timed("farm by Farm ID", catalog.get_by_farm_id, farm_ids, args.repeat)
+        timed("farm by Asset ID", catalog.get_by_asset_id,
+              [1000 + rng.randrange(args.farms) for _ in range(args.repeat)], args.repeat)
+        db.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Cold start of the Flask and FastAPI servers.
+
+For each server, on a small synthetic data directory (datagen.py):
+
+* import time: ``python -X importtime`` importing the server module, with
+  the heaviest of its direct imports listed and whether the Algorand SDK
+  was loaded at startup
+* time to first request: from launching the server process (``flask run``,
+  ``uvicorn``) to the first 200 from its health endpoint, then the latency
+  of the first data request (the farm listing) and, for Flask, of
+  ``/ready?warm=true``, which pays for the deferred blockchain imports
+
+Each figure is the median of --runs cold starts. --save and --baseline
+track them over time like bench_endpoints.py: a median that grew by more
+than --tolerance (a ratio) is listed and the exit status is 1.
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 5 --save startup.json
+    python benchmarks/bench_startup.py --runs 5 --baseline startup.json --tolerance 1.3
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import httpx
+
+from datagen import generate
+from load_e2e import free_port
+
+SERVERS = {
+    "flask": {
+        "module": "app",
+        "app_dir": BACKEND_DIR,
+        "health": "/health",
+        "data": "/farms",
+        "warm": "/ready?warm=true",
+    },
+    "fastapi": {
+        "module": "simple_server",
+        "app_dir": os.path.join(BACKEND_DIR, 'projects', 'backend'),
+        "health": "/api/health",
+        "data": "/api/farms",
+        "warm": None,
+    },
+}
+
+CHAIN_MODULES = ("algosdk", "algokit_utils")
+
+
+def parse_importtime(stderr, module):
+    """``(total_ms, {direct import: cumulative ms}, every imported name)`` for ``module``"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        # Names are indented two spaces per nesting level after one separator space
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((level, name.strip(), int(cumulative)))
+
+    total, children, names = None, {}, {name for _, name, _ in rows}
+    for i, (level, name, cumulative) in enumerate(rows):
+        if level == 0 and name == module:
+            total = cumulative / 1000
+            # Its direct imports are the level-1 rows since the previous top-level row
+            for child_level, child, child_cumulative in reversed(rows[:i]):
+                if child_level == 0:
+                    break
+                if child_level == 1:
+                    children[child] = child_cumulative / 1000
+    if total is None:
+        raise RuntimeError(f"{module} does not appear in the -X importtime output")
+    return total, children, names
+
+
+def measure_import(spec, env):
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {spec['module']}"],
+        cwd=spec['app_dir'], env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    return parse_importtime(out.stderr, spec['module'])
+
+
+def launch(name, spec, env, port):
+    if name == "flask":
+        command = [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port),
+                   '--no-reload', '--no-debugger', '--with-threads']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'simple_server:app', '--port', str(port),
+                   '--log-level', 'warning', '--no-access-log']
+    return subprocess.Popen(command, cwd=spec['app_dir'], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def timed_get(client, url):
+    start = time.perf_counter()
+    resp = client.get(url)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert resp.status_code == 200, f"{url}: {resp.status_code} {resp.text[:200]}"
+    return elapsed
+
+
+def measure_cold_start(name, spec, env, timeout=60):
+    """Milliseconds to the first health 200, then the first data and warm-up requests"""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    with httpx.Client(timeout=timeout) as client:
+        start = time.perf_counter()
+        process = launch(name, spec, env, port)
+        try:
+            while True:
+                try:
+                    if client.get(base + spec['health']).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if process.poll() is not None:
+                    raise RuntimeError(f"{name} exited with status {process.returncode} before serving")
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError(f"{name} did not come up within {timeout}s")
+                time.sleep(0.005)
+            result = {"first_request_ms": (time.perf_counter() - start) * 1000,
+                      "first_data_ms": timed_get(client, base + spec['data'])}
+            if spec['warm']:
+                result["warm_ms"] = timed_get(client, base + spec['warm'])
+            return result
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def run_server(name, spec, env, runs, top):
+    imports = [measure_import(spec, env) for _ in range(runs)]
+    starts = [measure_cold_start(name, spec, env) for _ in range(runs)]
+
+    result = {"import_ms": statistics.median(total for total, _, _ in imports)}
+    for key in starts[0]:
+        result[key] = statistics.median(start[key] for start in starts)
+
+    _, children, names = imports[-1]
+    chain = [module for module in CHAIN_MODULES if module in names]
+    print(f"\n== {name}")
+    for key, value in result.items():
+        print(f"{key:<20}{value:10.1f}")
+    print(f"{'chain at startup':<20}{', '.join(chain) if chain else 'no':>10}")
+    print("heaviest direct imports:")
+    for child, ms in sorted(children.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {child:<40}{ms:8.1f}ms")
+    return result
+
+
+def regressions(results, baseline, tolerance, floor_ms):
+    """``(server, figure, before, after)`` for every median beyond the tolerance"""
+    found = []
+    for name, figures in results.items():
+        for key, value in figures.items():
+            before = baseline.get(name, {}).get(key)
+            if before is None:
+                continue
+            # Single-digit milliseconds are mostly noise; compare them against the floor
+            if value > max(before, floor_ms) * tolerance:
+                found.append((name, key, before, value))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=list(SERVERS))
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per server')
+    parser.add_argument('--farms', type=int, default=100, help='farms in the generated data directory')
+    parser.add_argument('--holdings', type=int, default=1000, help='investor holdings in the data directory')
+    parser.add_argument('--top', type=int, default=8, help='direct imports to list per server')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.3, help='allowed growth over the baseline')
+    parser.add_argument('--floor-ms', type=float, default=10.0, help='figures below this never count as a regression')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='agritoken-startup-')
+    try:
+        generate(workdir, farms=args.farms, holdings=args.holdings, investors=max(10, args.holdings // 10),
+                 farm_files=max(1, args.farms // 10))
+        env = dict(os.environ, AGRITOKEN_DATA_DIR=workdir,
+                   AGRITOKEN_SQLITE_PATH=os.path.join(workdir, 'agritoken.db'),
+                   # Nothing here talks to algod; keep the warm-up off the network
+                   AGRITOKEN_ALGOD_ADDRESS=os.getenv('AGRITOKEN_ALGOD_ADDRESS', 'http://127.0.0.1:9'))
+        results = {name: run_server(name, SERVERS[name], env, args.runs, args.top) for name in args.servers}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.tolerance, args.floor_ms)
+        for name, key, before, after in found:
+            print(f"REGRESSION {name} {key}: {before:.1f}ms -> {after:.1f}ms")
+        if found:
+            sys.exit(1)
+        print(f"\nNo startup regressions beyond {args.tolerance}x the baseline")
+
+
+if __name__ == '__main__':
+    main()
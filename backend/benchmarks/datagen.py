@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Synthetic data directories in the layout both servers read.
+
+Writes ``farm_info/`` (one ``langs_farm.json`` list plus a number of
+single-farm files, as the tokenize endpoint saves them),
+``investor_holdings.json`` and ``user_info/signup_info.json`` with
+consistent cross references: every holding points at a generated farm and
+investor, and every farmer and investor can log in with ``PASSWORD``.
+
+    python benchmarks/datagen.py /tmp/agritoken-data --holdings 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from agritoken.credentials import CredentialService
+
+PASSWORD = "bench-password"
+
+CROPS = ("Maize", "Coffee", "Cassava", "Rice", "Sorghum", "Tea", "Cocoa", "Beans")
+LOCATIONS = ("Nakuru, Kenya", "Kumasi, Ghana", "Arusha, Tanzania", "Mbale, Uganda", "Kano, Nigeria")
+
+
+def farmer_email(i):
+    return f"farmer{i}@example.com"
+
+
+def investor_email(i):
+    return f"investor{i}@example.com"
+
+
+def wallet(prefix, i):
+    return f"{prefix}{i:0{58 - len(prefix)}d}"
+
+
+def make_farm(i, rng):
+    tokens = rng.choice((1000, 5000, 10000, 50000))
+    sold = rng.randrange(tokens // 2)
+    return {
+        "Farm ID": f"farm_{i:07d}",
+        "Farm Name": f"{rng.choice(CROPS)} Farm {i}",
+        "Farm Website": f"https://farm{i}.example.com/",
+        "Farm Email": farmer_email(i % 1000),
+        "Farm Phone": f"+254-700-{i % 1000000:06d}",
+        "Farmer Name": f"Farmer {i % 1000}",
+        "Farmer Email": farmer_email(i % 1000),
+        "Wallet Address": wallet("FARMER", i % 1000),
+        "Farm Size (Acres)": rng.randint(5, 2000),
+        "Crop Type": rng.choice(CROPS),
+        "Farm Location": rng.choice(LOCATIONS),
+        "Number of Tokens": tokens,
+        "Tokens Sold": sold,
+        "Tokens Available": tokens - sold,
+        "Price per Token (USD)": round(rng.uniform(1, 50), 2),
+        "Token Name": f"FARM{i}",
+        "Token Unit": f"F{i % 10000000:07d}",
+        "Asset ID": 700000000 + i,
+        "Est. APY": round(rng.uniform(4, 25), 1),
+        "Harvest Date": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "Farm Status": "Active",
+        "Transaction ID": f"TX{i:050d}",
+        "created_at": "2025-09-07T10:00:00",
+    }
+
+
+def make_holding(i, farm, investors, rng):
+    tokens = rng.randint(1, 500)
+    price = farm["Price per Token (USD)"]
+    return {
+        "Investor Email": investor_email(rng.randrange(investors)),
+        "Investor Name": "Bench Investor",
+        "Farm ID": farm["Farm ID"],
+        "Farm Name": farm["Farm Name"],
+        "Tokens Owned": tokens,
+        "Cost Basis": round(tokens * price, 2),
+        "Purchase Date": "2025-09-07",
+        "ASA ID": str(farm["Asset ID"]),
+        "Token Price": price,
+        "Est. Value": round(tokens * price, 2),
+        "P&L": 0,
+        "P&L Percentage": 0,
+        "Last Payout": None,
+        "Total Payouts Received": 0,
+        "Transaction ID": f"HTX{i:050d}",
+    }
+
+
+def make_user(email, role, address, password_hash):
+    return {
+        "User First Name": "Bench",
+        "User Last Name": role,
+        "Wallet Address": address,
+        "User Email": email,
+        "User Password": password_hash,
+        "User Role": role,
+        "User Status": "Active",
+        "User Created At": "2025-09-07",
+        "User Updated At": "2025-09-07",
+    }
+
+
+def generate(data_root, farms=1000, holdings=10000, investors=1000, farm_files=100, seed=1):
+    """Write a data directory under ``data_root``; returns the row counts"""
+    rng = random.Random(seed)
+    farm_dir = os.path.join(data_root, "farm_info")
+    user_dir = os.path.join(data_root, "user_info")
+    os.makedirs(farm_dir, exist_ok=True)
+    os.makedirs(user_dir, exist_ok=True)
+
+    farm_rows = [make_farm(i, rng) for i in range(farms)]
+    farm_files = min(farm_files, farms)
+    for farm in farm_rows[:farm_files]:
+        with open(os.path.join(farm_dir, f"{farm['Farm Name']}_{farm['Farm ID']}.json"), 'w') as f:
+            json.dump(farm, f, indent=2)
+    with open(os.path.join(farm_dir, "langs_farm.json"), 'w') as f:
+        json.dump({"farms": farm_rows[farm_files:]}, f, indent=2)
+
+    with open(os.path.join(data_root, "investor_holdings.json"), 'w') as f:
+        json.dump([make_holding(i, rng.choice(farm_rows), investors, rng) for i in range(holdings)], f, indent=2)
+
+    # One real hash shared by everyone: hashing per user would dominate generation
+    password_hash = CredentialService.from_environment().hash_password(PASSWORD)
+    farmers = min(farms, 1000)
+    users = [make_user(farmer_email(i), "Farmer", wallet("FARMER", i), password_hash) for i in range(farmers)]
+    users += [make_user(investor_email(i), "Investor", wallet("INVESTOR", i), password_hash) for i in range(investors)]
+    with open(os.path.join(user_dir, "signup_info.json"), 'w') as f:
+        json.dump({"users": users}, f, indent=2)
+    return {"farms": farms, "holdings": holdings, "users": len(users)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('data_root')
+    parser.add_argument('--farms', type=int, default=1000)
+    parser.add_argument('--holdings', type=int, default=10000)
+    parser.add_argument('--investors', type=int, default=1000)
+    parser.add_argument('--farm-files', type=int, default=100, help='farms saved one per file')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    counts = generate(args.data_root, args.farms, args.holdings, args.investors, args.farm_files, args.seed)
+    print(f"Wrote {counts['farms']} farms, {counts['holdings']} holdings and {counts['users']} users to {args.data_root}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Stand-in algod node for load tests of the tokenize and transfer flows.
+
+Implements what the Flask server and ``agritoken.algod_pool`` call:
+``/v2/transactions/params``, ``POST /v2/transactions`` (single transactions
+and atomic groups, msgpack encoded), ``/v2/transactions/pending/{txid}``,
+``/v2/status`` and ``/v2/status/wait-for-block-after/{round}``. Nothing is
+validated or executed: every submitted transaction is confirmed in the
+first round that starts ``confirm_delay`` seconds after it arrived (asset
+creations get a fresh asset index), unless it is picked by ``reject_rate``
+and reported with a pool error instead. ``latency`` is added to every
+response. Like a public endpoint, ``rate_limit`` answers submissions beyond
+that many per second with 429, and a transaction that was already
+submitted is refused as already in the ledger.
+
+Use ``create_app`` with ``serve_in_thread`` in-process, or run it alone and
+point the servers at it:
+
+    python benchmarks/fake_algod.py --port 4001 --confirm-delay 3.5
+    AGRITOKEN_ALGOD_ADDRESS=http://127.0.0.1:4001 python app.py
+"""
+import argparse
+import asyncio
+import base64
+import random
+import threading
+import time
+
+import msgpack
+from algosdk import encoding
+from fastapi import FastAPI, HTTPException, Request
+
+# TestNet's genesis, so transactions built against the fake look real
+GENESIS_ID = "testnet-v1.0"
+GENESIS_HASH = "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI="
+FIRST_ASSET_ID = 900000000
+
+
+class DuplicateTransaction(Exception):
+    pass
+
+
+class FakeLedger:
+    """Rounds derived from the clock plus every submitted transaction"""
+
+    def __init__(self, round_time=3.3, confirm_delay=3.3, reject_rate=0.0, start_round=50000000, seed=None):
+        self.round_time = round_time
+        self.confirm_delay = confirm_delay
+        self.reject_rate = reject_rate
+        self.start_round = start_round
+        self._started = time.monotonic()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_asset = FIRST_ASSET_ID
+        self._txns = {}  # txid -> {"txn", "pool-error", "confirm_round", "asset-index"}
+        self.submitted = 0
+
+    def current_round(self):
+        return self.start_round + int((time.monotonic() - self._started) / self.round_time)
+
+    def round_at(self, moment):
+        """First round that starts at or after ``moment`` (a monotonic time)"""
+        elapsed = max(0.0, moment - self._started)
+        rounds = int(elapsed / self.round_time)
+        if rounds * self.round_time < elapsed:
+            rounds += 1
+        return self.start_round + rounds
+
+    def submit(self, raw):
+        """Record a msgpack stream of signed transactions; returns the first txid"""
+        rejected = self.reject_rate and self._rng.random() < self.reject_rate
+        confirm_round = self.round_at(time.monotonic() + self.confirm_delay)
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(raw)
+        entries = []
+        for decoded in unpacker:
+            txn = decoded["txn"]
+            entry = {"txn": {"txn": _printable(txn)}, "pool-error": "", "confirm_round": confirm_round}
+            if rejected:
+                # A group is accepted or rejected as a whole
+                entry["pool-error"] = "transaction rejected by the stand-in node"
+            entries.append((encoding.msgpack_decode(decoded).get_txid(), txn, entry))
+        with self._lock:
+            duplicate = next((txid for txid, _, _ in entries if txid in self._txns), None)
+            if duplicate:
+                raise DuplicateTransaction(f"TransactionPool.Remember: transaction already in ledger: {duplicate}")
+            for txid, txn, entry in entries:
+                if not rejected and txn.get("type") == "acfg" and not txn.get("caid"):
+                    entry["asset-index"] = self._next_asset
+                    self._next_asset += 1
+                self._txns[txid] = entry
+            self.submitted += len(entries)
+        return entries[0][0]
+
+    def pending(self, txid):
+        with self._lock:
+            entry = self._txns.get(txid)
+        if entry is None:
+            return None
+        info = {"txn": entry["txn"], "pool-error": entry["pool-error"]}
+        if not entry["pool-error"] and self.current_round() >= entry["confirm_round"]:
+            info["confirmed-round"] = entry["confirm_round"]
+            if "asset-index" in entry:
+                info["asset-index"] = entry["asset-index"]
+        return info
+
+
+def _printable(txn):
+    """The decoded transaction with byte fields base64 encoded, as algod shows it"""
+    return {key: base64.b64encode(value).decode() if isinstance(value, bytes) else value
+            for key, value in txn.items() if not isinstance(value, dict)}
+
+
+def create_app(latency=0.0, confirm_delay=3.3, round_time=3.3, reject_rate=0.0, seed=None, rate_limit=0):
+    """algod app over a fresh ``FakeLedger`` (reachable as ``app.state.ledger``)"""
+    ledger = FakeLedger(round_time, confirm_delay, reject_rate, seed=seed)
+    app = FastAPI(title="Fake algod")
+    app.state.ledger = ledger
+    app.state.throttled = 0
+    window = {"second": 0, "count": 0}
+
+    async def delay():
+        if latency:
+            await asyncio.sleep(latency)
+
+    def status():
+        last_round = ledger.current_round()
+        return {"last-round": last_round, "time-since-last-round": 0, "catchup-time": 0,
+                "last-version": "future", "next-version": "future"}
+
+    @app.get("/v2/transactions/params")
+    async def transaction_params():
+        await delay()
+        return {"consensus-version": "future", "fee": 0, "genesis-hash": GENESIS_HASH,
+                "genesis-id": GENESIS_ID, "last-round": ledger.current_round(), "min-fee": 1000}
+
+    @app.post("/v2/transactions")
+    async def send_transactions(request: Request):
+        await delay()
+        if rate_limit:
+            second = int(time.monotonic())
+            if window["second"] != second:
+                window["second"], window["count"] = second, 0
+            window["count"] += 1
+            if window["count"] > rate_limit:
+                app.state.throttled += 1
+                raise HTTPException(status_code=429, detail="rate limit exceeded")
+        raw = await request.body()
+        try:
+            txid = ledger.submit(raw)
+        except DuplicateTransaction as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"could not decode transactions: {e}")
+        return {"txId": txid}
+
+    @app.get("/v2/transactions/pending/{txid}")
+    async def pending_transaction(txid: str):
+        await delay()
+        info = ledger.pending(txid)
+        if info is None:
+            raise HTTPException(status_code=404, detail="txn does not exist")
+        return info
+
+    @app.get("/v2/status")
+    async def node_status():
+        await delay()
+        return status()
+
+    @app.get("/v2/status/wait-for-block-after/{round_number}")
+    async def wait_for_block(round_number: int):
+        await delay()
+        # Like algod, give up after a while rather than hold the request forever
+        deadline = time.monotonic() + 60
+        while ledger.current_round() <= round_number and time.monotonic() < deadline:
+            await asyncio.sleep(min(0.05, ledger.round_time))
+        return status()
+
+    return app
+
+
+def serve_in_thread(app, host="127.0.0.1", port=0):
+    """Run ``app`` under uvicorn on a daemon thread; returns ``(url, server)``
+
+    Port 0 picks a free port. Call ``server.should_exit = True`` to stop it.
+    """
+    import socket
+
+    import uvicorn
+
+    # An explicit IPPROTO_TCP lets asyncio set TCP_NODELAY on accepted sockets;
+    # without it every response stalls on a delayed ACK
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, name="fake-algod", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://{host}:{sock.getsockname()[1]}", server
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4001)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to each response')
+    parser.add_argument('--confirm-delay', type=float, default=3.3, help='seconds from submission to confirmation')
+    parser.add_argument('--round-time', type=float, default=3.3, help='seconds per round')
+    parser.add_argument('--reject-rate', type=float, default=0.0, help='fraction of submissions rejected')
+    parser.add_argument('--rate-limit', type=int, default=0, help='submissions per second before 429 (0: none)')
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.confirm_delay, args.round_time, args.reject_rate, rate_limit=args.rate_limit)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == '__main__':
+    main()
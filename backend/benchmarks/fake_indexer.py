@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Stand-in Algorand indexer serving asset balances from fixture data.
+
+Implements the lookups ``agritoken.reconcile`` makes,
+``/v2/assets/{id}`` and ``/v2/assets/{id}/balances`` (with ``limit`` /
+``next`` paging), and ``/v2/transactions/{txid}`` for the confirmation
+tracker, over a fixture of the form:
+
+    {"assets": {"745496397": {"params": {"creator": ..., "reserve": ..., "total": 5000},
+                              "balances": [{"address": ..., "amount": 1200}, ...]}},
+     "transactions": {"TXID...": {"confirmed-round": 51000000, "created-asset-index": 745496397}}}
+
+Use ``create_app`` in-process (e.g. through ``httpx.ASGITransport``) or
+serve a fixture file:
+
+    python benchmarks/fake_indexer.py fixture.json --port 8980
+    python -m agritoken.reconcile ../data --indexer http://127.0.0.1:8980
+"""
+import argparse
+import asyncio
+import json
+
+from fastapi import FastAPI, HTTPException
+
+
+def create_app(assets, latency=0.0, transactions=None):
+    """Indexer app over ``{asset_id: {"params": ..., "balances": [...]}}``
+
+    ``transactions`` maps txids to their indexed fields. ``latency`` seconds
+    are added to every response to mimic a remote node.
+    """
+    assets = {str(asset_id): asset for asset_id, asset in assets.items()}
+    transactions = transactions if transactions is not None else {}
+    app = FastAPI(title="Fake indexer")
+
+    def lookup(asset_id):
+        asset = assets.get(str(asset_id))
+        if asset is None:
+            raise HTTPException(status_code=404, detail="no assets found for asset-id")
+        return asset
+
+    @app.get("/v2/assets/{asset_id}")
+    async def asset_info(asset_id: int):
+        if latency:
+            await asyncio.sleep(latency)
+        asset = lookup(asset_id)
+        return {"asset": {"index": asset_id, "params": asset["params"]}, "current-round": 1000}
+
+    @app.get("/v2/assets/{asset_id}/balances")
+    async def asset_balances(asset_id: int, limit: int = 1000, next: str = None):
+        if latency:
+            await asyncio.sleep(latency)
+        balances = lookup(asset_id)["balances"]
+        start = int(next) if next else 0
+        page = balances[start:start + limit]
+        body = {"balances": page, "current-round": 1000}
+        if start + limit < len(balances):
+            body["next-token"] = str(start + limit)
+        return body
+
+    @app.get("/v2/transactions/{txid}")
+    async def transaction(txid: str):
+        if latency:
+            await asyncio.sleep(latency)
+        txn = transactions.get(txid)
+        if txn is None:
+            raise HTTPException(status_code=404, detail="no transaction found for transaction id")
+        return {"transaction": {"id": txid, **txn}, "current-round": 1000}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixture', help='JSON file with an "assets" (and optional "transactions") mapping')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8980)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to each response')
+    args = parser.parse_args()
+
+    with open(args.fixture, 'r', encoding='utf-8') as f:
+        fixture = json.load(f)
+    app = create_app(fixture["assets"], args.latency, fixture.get("transactions"))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+End-to-end mixed load against both servers with a stand-in algod.
+
+Starts an in-process fake algod (fake_algod.py) and, unless --flask-url and
+--fastapi-url point at servers that are already running, launches the Flask
+and FastAPI servers as subprocesses on a synthetic data directory
+(datagen.py) with AGRITOKEN_ALGOD_ADDRESS aimed at the fake. Closed-loop
+asyncio workers then replay a weighted mix of user flows:
+
+* browse: farm listings and portfolio lookups (FastAPI and Flask GETs)
+* invest: POST /api/invest
+* tokenize: POST /tokenize_farm (asset creation on the fake chain)
+* transfer: POST /transfer_assets
+
+Each --stages entry is a concurrency level run for --duration seconds. Per
+stage the throughput and p50/p99 latency of every flow are reported, and
+the first stage where more workers no longer bought at least 10% more
+throughput is marked as the saturation point. --no-wait submits tokenize
+and transfer with ?wait=false, which takes the node's confirmation delay
+off the request path.
+
+    python benchmarks/load_e2e.py --stages 1 2 4 8 16 32 --duration 10
+    python benchmarks/load_e2e.py --mix tokenize=1 --confirm-delay 3.3 --round-time 3.3
+    python benchmarks/load_e2e.py --mix transfer=1 --no-wait --algod-rate-limit 20
+
+--algod-rate-limit makes the fake throttle like a public endpoint, to see
+the submission scheduler (agritoken.submission) absorb bursts; tune it on
+the servers with AGRITOKEN_SUBMIT_RATE and friends.
+
+Servers started separately must already use the fake algod; run it with
+fake_algod.py and pass the same address to them.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import httpx
+from algosdk import account, mnemonic
+
+from datagen import generate
+from fake_algod import create_app, serve_in_thread
+
+FLOWS = ("browse", "invest", "tokenize", "transfer")
+
+# A stage has saturated once its extra workers add less throughput than this
+SATURATION_GAIN = 1.1
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in FLOWS:
+            raise argparse.ArgumentTypeError(f"unknown flow {name!r}; choose from {', '.join(FLOWS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_servers(data_root, algod_url):
+    """Launch both servers on free ports; returns ``(flask_url, fastapi_url, processes)``"""
+    env = dict(os.environ, AGRITOKEN_DATA_DIR=data_root, AGRITOKEN_ALGOD_ADDRESS=algod_url,
+               AGRITOKEN_SQLITE_PATH=os.path.join(data_root, 'agritoken.db'))
+    flask_port, fastapi_port = free_port(), free_port()
+    processes = [
+        subprocess.Popen([sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(flask_port),
+                          '--no-reload', '--no-debugger', '--with-threads'],
+                         cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+        subprocess.Popen([sys.executable, '-m', 'uvicorn', 'simple_server:app', '--port', str(fastapi_port),
+                          '--app-dir', os.path.join('projects', 'backend'), '--log-level', 'warning',
+                          '--no-access-log'],
+                         cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+    ]
+    return f"http://127.0.0.1:{flask_port}", f"http://127.0.0.1:{fastapi_port}", processes
+
+
+async def wait_until_up(client, urls, timeout=60):
+    deadline = time.monotonic() + timeout
+    for url in urls:
+        while True:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"{url} did not come up within {timeout}s")
+            await asyncio.sleep(0.2)
+
+
+class Traffic:
+    """Builds one request per flow from the generated data"""
+
+    def __init__(self, data_root, flask_url, fastapi_url, wait, rng):
+        with open(os.path.join(data_root, "farm_info", "langs_farm.json"), 'r', encoding='utf-8') as f:
+            self.farms = [farm for farm in json.load(f)["farms"] if farm["Tokens Available"] > 0]
+        with open(os.path.join(data_root, "investor_holdings.json"), 'r', encoding='utf-8') as f:
+            self.investors = sorted({holding["Investor Email"] for holding in json.load(f)})
+        self.flask_url = flask_url
+        self.fastapi_url = fastapi_url
+        self.query = "" if wait else "?wait=false"
+        self.rng = rng
+        # Real addresses: the servers build actual transactions around them
+        self.wallets = [account.generate_account()[1] for _ in range(32)]
+        # A distinct amount per transfer keeps txids unique; algod refuses a repeat
+        self.amounts = itertools.count(1)
+
+    def pick(self, items):
+        return items[self.rng.randrange(len(items))]
+
+    def browse(self, client):
+        choice = self.rng.randrange(4)
+        if choice == 0:
+            return client.get(f"{self.fastapi_url}/api/farms", params={"limit": 20, "sort": "-apy"})
+        if choice == 1:
+            return client.get(f"{self.fastapi_url}/api/farms/{self.pick(self.farms)['Farmer Email']}")
+        if choice == 2:
+            return client.get(f"{self.fastapi_url}/api/portfolio/{self.pick(self.investors)}")
+        return client.get(f"{self.flask_url}/farms", params={"available": "true", "limit": 20})
+
+    def invest(self, client):
+        farm = self.pick(self.farms)
+        return client.post(f"{self.fastapi_url}/api/invest", json={
+            "farm_id": farm["Farm ID"], "investor_email": self.pick(self.investors),
+            "tokens_to_buy": 1, "total_cost": farm["Price per Token (USD)"]})
+
+    def tokenize(self, client):
+        suffix = uuid.uuid4().hex[:8]
+        return client.post(f"{self.flask_url}/tokenize_farm{self.query}", json={
+            "Farm Name": f"Load Farm {suffix}", "Number of Tokens": 10000, "Token Unit": suffix[:8].upper(),
+            "Wallet Address": self.pick(self.wallets), "Farmer Email": "farmer0@example.com",
+            "Price per Token (USD)": 10})
+
+    def transfer(self, client):
+        return client.post(f"{self.flask_url}/transfer_assets{self.query}", json={
+            "asset_id": self.pick(self.farms)["Asset ID"], "sender_address": self.pick(self.wallets),
+            "receiver_address": self.pick(self.wallets), "amount": next(self.amounts)})
+
+
+async def run_stage(client, traffic, mix, concurrency, duration):
+    """Closed-loop workers for ``duration`` seconds; returns samples per flow"""
+    flows = list(mix)
+    weights = [mix[flow] for flow in flows]
+    samples = {flow: [] for flow in flows}
+    errors = {flow: 0 for flow in flows}
+    deadline = time.monotonic() + duration
+
+    async def worker():
+        while time.monotonic() < deadline:
+            flow = traffic.rng.choices(flows, weights)[0]
+            start = time.perf_counter()
+            try:
+                resp = await getattr(traffic, flow)(client)
+                ok = resp.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                samples[flow].append(time.perf_counter() - start)
+            else:
+                errors[flow] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stage = {"concurrency": concurrency, "elapsed": elapsed, "flows": {}}
+    for flow in flows:
+        done = samples[flow]
+        stage["flows"][flow] = {
+            "ok": len(done),
+            "errors": errors[flow],
+            "rps": len(done) / elapsed,
+            "p50_ms": percentile(done, 50) * 1000 if done else None,
+            "p99_ms": percentile(done, 99) * 1000 if done else None,
+        }
+    stage["rps"] = sum(len(done) for done in samples.values()) / elapsed
+    return stage
+
+
+def print_stage(stage, saturated):
+    flows = "  ".join(
+        f"{flow} {r['rps']:7.1f}/s p50 {_ms(r['p50_ms'])} p99 {_ms(r['p99_ms'])}"
+        + (f" err {r['errors']}" if r['errors'] else "")
+        for flow, r in stage["flows"].items()
+    )
+    mark = "  <- saturated" if saturated else ""
+    print(f"c={stage['concurrency']:<4} {stage['rps']:8.1f} req/s  {flows}{mark}", flush=True)
+
+
+def _ms(value):
+    return f"{value:7.1f}ms" if value is not None else "      -  "
+
+
+async def run(args, data_root, algod_url):
+    processes = []
+    flask_url, fastapi_url = args.flask_url, args.fastapi_url
+    if not (flask_url and fastapi_url):
+        flask_url, fastapi_url, processes = start_servers(data_root, algod_url)
+    limits = httpx.Limits(max_connections=max(args.stages), max_keepalive_connections=max(args.stages))
+    try:
+        async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+            await wait_until_up(client, [f"{flask_url}/health", f"{fastapi_url}/api/health"])
+            # Tokenize and transfer sign with whatever account /set_mnemonic installed
+            key, _ = account.generate_account()
+            resp = await client.post(f"{flask_url}/set_mnemonic", json={"mnemonic": mnemonic.from_private_key(key)})
+            resp.raise_for_status()
+
+            traffic = Traffic(data_root, flask_url, fastapi_url, not args.no_wait, random.Random(args.seed))
+            stages = []
+            for concurrency in args.stages:
+                stage = await run_stage(client, traffic, args.mix, concurrency, args.duration)
+                previous = stages[-1] if stages else None
+                stage["saturated"] = bool(
+                    previous and not any(s["saturated"] for s in stages)
+                    and stage["rps"] < previous["rps"] * SATURATION_GAIN
+                )
+                stages.append(stage)
+                print_stage(stage, stage["saturated"])
+            return stages
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stages', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64],
+                        help='concurrent workers per stage')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per stage')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('browse=50,invest=20,tokenize=15,transfer=15'),
+                        help='flow weights, e.g. browse=50,invest=20,tokenize=15,transfer=15')
+    parser.add_argument('--no-wait', action='store_true', help='submit tokenize/transfer with ?wait=false')
+    parser.add_argument('--holdings', type=int, default=10000, help='size of the generated data (see datagen.py)')
+    parser.add_argument('--latency', type=float, default=0.02, help='fake algod seconds per response')
+    parser.add_argument('--confirm-delay', type=float, default=1.0, help='fake algod seconds to confirm')
+    parser.add_argument('--round-time', type=float, default=1.0, help='fake algod seconds per round')
+    parser.add_argument('--algod-rate-limit', type=int, default=0,
+                        help='fake algod submissions per second before it answers 429 (0: none)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='client timeout per request')
+    parser.add_argument('--flask-url', help='use a running Flask server instead of starting one')
+    parser.add_argument('--fastapi-url', help='use a running FastAPI server instead of starting one')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', help='write the stage results to this JSON file')
+    args = parser.parse_args()
+
+    algod_app = create_app(args.latency, args.confirm_delay, args.round_time, seed=args.seed,
+                           rate_limit=args.algod_rate_limit)
+    algod_url, algod_server = serve_in_thread(algod_app)
+    print(f"Fake algod at {algod_url} (latency {args.latency}s, confirmation after {args.confirm_delay}s)")
+
+    workdir = tempfile.mkdtemp(prefix='agritoken-load-')
+    try:
+        farms = max(10, args.holdings // 100)
+        generate(workdir, farms=farms, holdings=args.holdings, investors=max(10, args.holdings // 10),
+                 farm_files=max(1, farms // 10), seed=args.seed)
+        stages = asyncio.run(run(args, workdir, algod_url))
+    finally:
+        algod_server.should_exit = True
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Fake algod received {algod_app.state.ledger.submitted} transactions, "
+          f"throttled {algod_app.state.throttled} submissions")
+    knee = next((stage for stage in stages if stage["saturated"]), None)
+    if knee:
+        print(f"Throughput stopped scaling at {knee['concurrency']} workers: "
+              f"{max(stage['rps'] for stage in stages):.1f} req/s peak")
+    else:
+        print("No saturation within these stages; add higher --stages")
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({"mix": args.mix, "wait": not args.no_wait, "stages": stages}, f, indent=2)
+        print(f"Saved stages to {args.save}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Mixed read/write load against the FastAPI server, in process.
+
+Copies data/ to a temporary directory, points the server at it through
+AGRITOKEN_DATA_DIR and drives it with concurrent httpx requests over the ASGI
+transport: farm listings, per-farmer lookups, holdings and payout reads,
+interleaved with farm creation and investments. Reports p50/p99 latency per
+endpoint plus the worst event-loop stall seen during the run. Run it on the
+parent commit as well to get the numbers from before file I/O moved off the
+loop.
+
+    python benchmarks/load_fastapi_io.py --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DATA_DIR = os.path.join(BACKEND_DIR, '..', 'data')
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'projects', 'backend'))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def measure_loop_lag(stop, samples, interval=0.005):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def run(app, farms, investors, total, concurrency, write_ratio):
+    import httpx
+
+    farm = random.choice(farms)
+    scenarios = [
+        ("GET /api/farms", lambda c: c.get("/api/farms")),
+        ("GET /api/farms/{email}", lambda c: c.get(f"/api/farms/{random.choice(farms)['Farmer Email']}")),
+        ("GET /api/investor-holdings", lambda c: c.get(f"/api/investor-holdings/{random.choice(investors)}")),
+        ("POST /api/simulate-payout", lambda c: c.post("/api/simulate-payout", json={
+            "farm_id": random.choice(farms)["Farm ID"], "payout_amount": 1000.0})),
+    ]
+    writes = [
+        ("POST /api/farms", lambda c: c.post("/api/farms", json={
+            "Farm ID": f"BENCH-{uuid.uuid4().hex[:12]}", "Farm Name": "Bench Farm",
+            "Farmer Email": "bench@example.com"})),
+        ("POST /api/invest", lambda c: c.post("/api/invest", json={
+            "investor_email": random.choice(investors), "farm_id": farm["Farm ID"],
+            "tokens_to_buy": 1, "total_cost": farm.get("Price per Token (USD)", 0)})),
+    ]
+
+    latencies = defaultdict(list)
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            name, send = random.choice(writes if random.random() < write_ratio else scenarios)
+            async with semaphore:
+                start = time.perf_counter()
+                response = await send(client)
+                latencies[name].append(time.perf_counter() - start)
+                if response.status_code >= 500:
+                    raise RuntimeError(f"{name} returned {response.status_code}")
+
+        stop = asyncio.Event()
+        lag = []
+        monitor = asyncio.create_task(measure_loop_lag(stop, lag))
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await monitor
+
+    return latencies, elapsed, max(lag, default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--write-ratio', type=float, default=0.1, help='fraction of requests that write')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    workdir = tempfile.mkdtemp(prefix='agritoken-load-')
+    try:
+        shutil.copytree(DATA_DIR, os.path.join(workdir, 'data'))
+        os.environ["AGRITOKEN_DATA_DIR"] = os.path.join(workdir, 'data')
+        # Older trees resolve data paths relative to the working directory
+        run_dir = os.path.join(workdir, 'a', 'b', 'c')
+        os.makedirs(run_dir)
+        os.chdir(run_dir)
+
+        import simple_server
+
+        with open(os.path.join(workdir, 'data', 'farm_info', 'langs_farm.json'), encoding='utf-8') as f:
+            farms = json.load(f)["farms"]
+        with open(os.path.join(workdir, 'data', 'investor_holdings.json'), encoding='utf-8') as f:
+            holdings = json.load(f)
+        if isinstance(holdings, dict):
+            holdings = holdings.get("holdings", [])
+        investors = sorted({h["Investor Email"] for h in holdings}) or ["bench@example.com"]
+
+        latencies, elapsed, lag = asyncio.run(run(
+            simple_server.app, farms, investors, args.requests, args.concurrency, args.write_ratio))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}: "
+          f"{args.requests / elapsed:.1f} req/s, max loop lag {lag * 1000:.2f} ms")
+    print(f"{'endpoint':<30} {'count':>6} {'p50 (ms)':>10} {'p99 (ms)':>10} {'mean (ms)':>10}")
+    for name in sorted(latencies):
+        samples = latencies[name]
+        print(f"{name:<30} {len(samples):>6} {percentile(samples, 50) * 1000:>10.2f} "
+              f"{percentile(samples, 99) * 1000:>10.2f} {statistics.mean(samples) * 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,100 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import json
+from typing import List
 import os
+import sys
+import time
 from datetime import datetime
 
-app = FastAPI(title="AgriToken Backend API", version="1.0.0")
+# Shared helpers live next to the Flask app in backend/agritoken
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from agritoken import codec, metrics
+from agritoken.async_io import call, file_lock
+from agritoken.backends import open_backend
+from agritoken.credentials import CredentialService
+from agritoken.farm_query import FarmQuery, FarmQueryError, FarmSearch
+from agritoken.http_cache import ResponseCache
+
+# Data directory, relative to where the server is started unless overridden
+DATA_ROOT = os.getenv("AGRITOKEN_DATA_DIR", "../../../data")
+FARM_DATA_PATH = os.path.join(DATA_ROOT, "farm_info", "langs_farm.json")
+
+# JSON files or SQLite, picked with AGRITOKEN_STORAGE (see agritoken.backends)
+storage_backend = open_backend(DATA_ROOT)
+farm_store = storage_backend.farms
+holdings_store = storage_backend.holdings
+
+# Users keyed by lowercased email
+user_store = storage_backend.users
+
+# Sorted views of the farm list for filtered, paginated GET /api/farms
+farm_search = FarmSearch(farm_store.snapshot)
+
+# scrypt hashing runs on a bounded thread pool, never on the event loop
+credentials = CredentialService.from_environment()
+
+# Columnar payout engine, rebuilt only when the holdings change
+_payout_engine = None
+_payout_engine_version = None
+
+def get_payout_engine():
+    # numpy is imported with the engine, on the first payout request
+    from agritoken.payout_engine import PayoutEngine
+
+    global _payout_engine, _payout_engine_version
+    # The version is a cheap check; copying every holding is not
+    if _payout_engine is None or holdings_store.version() != _payout_engine_version:
+        version, holdings = holdings_store.snapshot()
+        _payout_engine = PayoutEngine(holdings)
+        _payout_engine_version = version
+    return _payout_engine
+
+# Serialized (and compressed) GET bodies, reused until the data version moves
+response_cache = ResponseCache()
+
+async def cached_json(request, key, version_of, render):
+    """Serve a JSON body cached per data version, with ETag/304 and gzip/brotli"""
+    status, body, headers = await call(
+        response_cache.serve,
+        key,
+        version_of,
+        render,
+        if_none_match=request.headers.get("if-none-match"),
+        accept_encoding=request.headers.get("accept-encoding")
+    )
+    return Response(content=body, status_code=status, media_type="application/json", headers=headers)
+
+class CodecJSONResponse(JSONResponse):
+    """Default response class: bodies are encoded by agritoken.codec"""
+
+    def render(self, content) -> bytes:
+        return codec.dumps(content)
+
+app = FastAPI(title="AgriToken Backend API", version="1.0.0", default_response_class=CodecJSONResponse)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count in-flight requests and observe latency under the route template"""
+    metrics.HTTP_IN_FLIGHT.inc("fastapi")
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.HTTP_IN_FLIGHT.dec("fastapi")
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            "fastapi",
+            request.method,
+            route.path if route is not None else "unmatched",
+            str(status)
+        )
 
 # Add CORS middleware
 app.add_middleware(
@@ -34,6 +123,10 @@ class PayoutRequest(BaseModel):
     payout_date: str
     description: str
 
+class PayoutBatchRequest(BaseModel):
+    scenarios: List[PayoutRequest]
+    include_details: bool = False
+
 class CreateFarmRequest(BaseModel):
     farm_id: str
     farm_name: str
@@ -81,23 +174,15 @@ async def root():
 async def health_check():
     return {"status": "healthy", "message": "API is running"}
 
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.post("/api/signup")
 async def signup(request: SignupRequest):
     try:
-        # Path to the signup_info.json file
-        signup_data_path = "../../../data/user_info/signup_info.json"
-        
-        # Load existing data
-        if os.path.exists(signup_data_path):
-            with open(signup_data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        else:
-            os.makedirs(os.path.dirname(signup_data_path), exist_ok=True)
-            data = {"users": []}
-        
-        # Check if email already exists
-        existing_emails = [user.get("User Email", "") for user in data["users"]]
-        if request.email in existing_emails:
+        # Check if email already exists before paying for the password hash
+        if await call(user_store.get, request.email):
             raise HTTPException(
                 status_code=400, 
                 detail="Email already exists. Please use a different email address."
@@ -110,19 +195,19 @@ async def signup(request: SignupRequest):
             "User Last Name": request.lastName,
             "Wallet Address": request.walletAddress,
             "User Email": request.email,
-            "User Password": request.password,
+            "User Password": await credentials.hash(request.password),
             "User Role": request.role,
             "User Status": "Active",
             "User Created At": current_time,
             "User Updated At": current_time
         }
         
-        # Add new user to the list
-        data["users"].append(new_user)
-        
-        # Save updated data
-        with open(signup_data_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Register the user; the email check is a dict lookup
+        if not await call(user_store.add_if_absent, new_user):
+            raise HTTPException(
+                status_code=400, 
+                detail="Email already exists. Please use a different email address."
+            )
         
         return {
             "message": "User created successfully",
@@ -145,39 +230,38 @@ async def signup(request: SignupRequest):
 @app.post("/api/login")
 async def login(request: LoginRequest):
     try:
-        # Path to the signup_info.json file
-        signup_data_path = "../../../data/user_info/signup_info.json"
-        
         # Load user data
-        if not os.path.exists(signup_data_path):
+        if not await call(user_store.exists):
             raise HTTPException(
                 status_code=404, 
                 detail="User database not found. Please contact support."
             )
         
-        with open(signup_data_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
         # Find user by email
-        user = None
-        for u in data["users"]:
-            if u.get("User Email", "").lower() == request.email.lower():
-                user = u
-                break
+        user = await call(user_store.get, request.email)
         
         if not user:
+            # Do the same KDF work as a real check so unknown emails are not faster
+            await credentials.burn(request.password)
             raise HTTPException(
                 status_code=401, 
                 detail="Invalid email or password."
             )
         
         # Check password
-        if user.get("User Password", "") != request.password:
+        password_ok, needs_upgrade = await credentials.verify(user.get("User Password", ""), request.password)
+        if not password_ok:
             raise HTTPException(
                 status_code=401, 
                 detail="Invalid email or password."
             )
         
+        # Replace legacy plaintext (or weaker) hashes now that we know the password
+        if needs_upgrade:
+            await call(user_store.update, user.get("User Email", ""), {
+                "User Password": await credentials.hash(request.password)
+            })
+        
         # Check if user is active
         if user.get("User Status", "") != "Active":
             raise HTTPException(
@@ -211,21 +295,39 @@ async def login(request: LoginRequest):
         )
 
 @app.get("/api/farms")
-async def get_farms():
+async def get_farms(request: Request):
     try:
-        # Path to the farm data file
-        farm_data_path = "../../../data/farm_info/langs_farm.json"
+        # Filters, sort and cursor from the query string; none means every farm
+        try:
+            query = FarmQuery.from_args(request.query_params)
+        except FarmQueryError as e:
+            raise HTTPException(
+                status_code=400, 
+                detail=str(e)
+            )
         
-        if not os.path.exists(farm_data_path):
+        def render():
+            farms, next_cursor, total = farm_search.search(query)
+            return {"farms": farms, "next_cursor": next_cursor, "total": total}, {}
+        
+        # Load farm data and page through its sorted index; unchanged data is served from cache
+        try:
+            return await cached_json(
+                request,
+                ("farms", str(request.query_params)),
+                lambda: farm_store.snapshot()[0],
+                render
+            )
+        except FileNotFoundError:
             raise HTTPException(
                 status_code=404, 
                 detail="Farm data not found."
             )
-        
-        with open(farm_data_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        return data
+        except FarmQueryError as e:
+            raise HTTPException(
+                status_code=400, 
+                detail=str(e)
+            )
             
     except HTTPException:
         raise
@@ -239,21 +341,15 @@ async def get_farms():
 @app.get("/api/farms/{farmer_email}")
 async def get_farmer_farms(farmer_email: str):
     try:
-        # Path to the farm data file
-        farm_data_path = "../../../data/farm_info/langs_farm.json"
-        
-        if not os.path.exists(farm_data_path):
+        # Load the farmer's farms
+        try:
+            farmer_farms = await call(farm_store.for_farmer, farmer_email)
+        except FileNotFoundError:
             raise HTTPException(
                 status_code=404, 
                 detail="Farm data not found."
             )
         
-        with open(farm_data_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Filter farms by farmer email
-        farmer_farms = [farm for farm in data["farms"] if farm.get("Farmer Email", "").lower() == farmer_email.lower()]
-        
         return {"farms": farmer_farms}
             
     except HTTPException:
@@ -266,24 +362,21 @@ async def get_farmer_farms(farmer_email: str):
         )
 
 @app.get("/api/investor-holdings/{investor_email}")
-async def get_investor_holdings(investor_email: str):
+async def get_investor_holdings(investor_email: str, request: Request):
     try:
-        # Path to the investor holdings file
-        holdings_path = "../../../data/investor_holdings.json"
-        
-        if not os.path.exists(holdings_path):
+        if not await call(holdings_store.exists):
             raise HTTPException(
                 status_code=404, 
                 detail="Investor holdings data not found."
             )
         
-        with open(holdings_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Filter holdings by investor email
-        investor_holdings = [holding for holding in data["holdings"] if holding.get("Investor Email", "").lower() == investor_email.lower()]
-        
-        return {"holdings": investor_holdings}
+        # Look up holdings by investor email; unchanged holdings are served from cache
+        return await cached_json(
+            request,
+            ("investor_holdings", investor_email.lower()),
+            holdings_store.version,
+            lambda: ({"holdings": holdings_store.for_investor(investor_email)}, {})
+        )
             
     except HTTPException:
         raise
@@ -294,30 +387,48 @@ async def get_investor_holdings(investor_email: str):
             detail="An unexpected error occurred. Please try again."
         )
 
+@app.get("/api/portfolio/{investor_email}")
+async def get_portfolio(investor_email: str, request: Request):
+    try:
+        # Totals come from the running per-position aggregates, not a holdings scan
+        return await cached_json(
+            request,
+            ("portfolio", investor_email.lower()),
+            holdings_store.version,
+            lambda: (holdings_store.portfolio(investor_email), {})
+        )
+            
+    except Exception as e:
+        print(f"Unexpected error getting portfolio: {e}")
+        raise HTTPException(
+            status_code=500, 
+            detail="An unexpected error occurred. Please try again."
+        )
+
+def payout_breakdown(holdings, payout_cents, payout_per_token):
+    return [
+        {
+            "investor_email": holding.get("Investor Email"),
+            "investor_name": holding.get("Investor Name"),
+            "tokens_owned": holding.get("Tokens Owned", 0),
+            "payout_amount": int(cents) / 100,
+            "payout_per_token": round(payout_per_token, 4)
+        }
+        for holding, cents in zip(holdings, payout_cents)
+    ]
+
 @app.post("/api/simulate-payout")
 async def simulate_payout(request: PayoutRequest):
     try:
-        # Paths to data files
-        farm_data_path = "../../../data/farm_info/langs_farm.json"
-        holdings_path = "../../../data/investor_holdings.json"
-        
-        # Load farm data
-        if not os.path.exists(farm_data_path):
+        # Find the farm
+        try:
+            farm = await call(farm_store.get, request.farm_id)
+        except FileNotFoundError:
             raise HTTPException(
                 status_code=404, 
                 detail="Farm data not found."
             )
         
-        with open(farm_data_path, 'r', encoding='utf-8') as f:
-            farm_data = json.load(f)
-        
-        # Find the farm
-        farm = None
-        for f in farm_data["farms"]:
-            if f.get("Farm ID") == request.farm_id:
-                farm = f
-                break
-        
         if not farm:
             raise HTTPException(
                 status_code=404, 
@@ -325,26 +436,31 @@ async def simulate_payout(request: PayoutRequest):
             )
         
         # Load investor holdings
-        if not os.path.exists(holdings_path):
+        if not await call(holdings_store.exists):
             raise HTTPException(
                 status_code=404, 
                 detail="Investor holdings data not found."
             )
         
-        with open(holdings_path, 'r', encoding='utf-8') as f:
-            holdings_data = json.load(f)
-        
         # Get all investors for this farm
-        farm_holdings = [holding for holding in holdings_data["holdings"] if holding.get("Farm ID") == request.farm_id]
+        engine = await call(get_payout_engine)
+        try:
+            engine.check(request.farm_id)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=422,
+                detail=str(e)
+            )
+        farm_rows = engine.farm_slice(request.farm_id)
         
-        if not farm_holdings:
+        if farm_rows is None:
             raise HTTPException(
                 status_code=404, 
                 detail="No investors found for this farm."
             )
         
         # Calculate total tokens for this farm
-        total_tokens = sum(holding.get("Tokens Owned", 0) for holding in farm_holdings)
+        total_tokens = engine.total_tokens(request.farm_id)
         
         if total_tokens == 0:
             raise HTTPException(
@@ -355,19 +471,9 @@ async def simulate_payout(request: PayoutRequest):
         # Calculate payout per token
         payout_per_token = request.payout_amount / total_tokens
         
-        # Calculate individual payouts
-        payout_details = []
-        for holding in farm_holdings:
-            tokens_owned = holding.get("Tokens Owned", 0)
-            individual_payout = tokens_owned * payout_per_token
-            
-            payout_details.append({
-                "investor_email": holding.get("Investor Email"),
-                "investor_name": holding.get("Investor Name"),
-                "tokens_owned": tokens_owned,
-                "payout_amount": round(individual_payout, 2),
-                "payout_per_token": round(payout_per_token, 4)
-            })
+        # Split the payout pro rata in exact cents
+        payout_cents = engine.simulate(request.farm_id, request.payout_amount)
+        payout_details = payout_breakdown(engine.rows[farm_rows], payout_cents, payout_per_token)
         
         return {
             "message": "Payout simulation completed",
@@ -389,35 +495,83 @@ async def simulate_payout(request: PayoutRequest):
             detail="An unexpected error occurred. Please try again."
         )
 
-@app.post("/api/farms")
-async def create_farm(farm_data: dict):
+@app.post("/api/simulate-payout/batch")
+async def simulate_payout_batch(request: PayoutBatchRequest):
     try:
-        # Path to the farm data file
-        farm_data_path = "../../../data/farm_info/langs_farm.json"
+        # Load farm data
+        try:
+            farms = await call(farm_store.all)
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=404, 
+                detail="Farm data not found."
+            )
         
-        # Load existing farm data
-        if os.path.exists(farm_data_path):
-            with open(farm_data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        else:
-            os.makedirs(os.path.dirname(farm_data_path), exist_ok=True)
-            data = {"farms": []}
+        farms_by_id = {farm.get("Farm ID"): farm for farm in farms}
+        
+        # Every scenario for the same farm is computed in one vectorized pass
+        engine = await call(get_payout_engine)
+        scenario_cents = await call(engine.simulate_batch, [(s.farm_id, s.payout_amount) for s in request.scenarios])
+        
+        results = []
+        for scenario, payout_cents in zip(request.scenarios, scenario_cents):
+            farm = farms_by_id.get(scenario.farm_id)
+            total_tokens = engine.total_tokens(scenario.farm_id)
+            if not farm:
+                results.append({"farm_id": scenario.farm_id, "error": "Farm not found."})
+                continue
+            if isinstance(payout_cents, ValueError):
+                results.append({"farm_id": scenario.farm_id, "error": str(payout_cents)})
+                continue
+            if payout_cents is None:
+                results.append({"farm_id": scenario.farm_id, "error": "No investors found for this farm."})
+                continue
+            if total_tokens == 0:
+                results.append({"farm_id": scenario.farm_id, "error": "No tokens to distribute."})
+                continue
+            
+            payout_per_token = scenario.payout_amount / total_tokens
+            result = {
+                "farm_id": scenario.farm_id,
+                "farm_name": farm.get("Farm Name"),
+                "total_payout": scenario.payout_amount,
+                "total_tokens": total_tokens,
+                "payout_per_token": round(payout_per_token, 4),
+                "payout_date": scenario.payout_date,
+                "description": scenario.description
+            }
+            if request.include_details:
+                rows = engine.rows[engine.farm_slice(scenario.farm_id)]
+                result["payout_details"] = payout_breakdown(rows, payout_cents, payout_per_token)
+            results.append(result)
         
-        # Check if farm ID already exists
-        existing_farm_ids = [farm.get("Farm ID", "") for farm in data["farms"]]
-        if farm_data.get("Farm ID") in existing_farm_ids:
+        return {
+            "message": "Payout simulations completed",
+            "count": len(results),
+            "scenarios": results
+        }
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Unexpected error simulating payouts: {e}")
+        raise HTTPException(
+            status_code=500, 
+            detail="An unexpected error occurred. Please try again."
+        )
+
+@app.post("/api/farms")
+async def create_farm(farm_data: dict):
+    try:
+        # Check the Farm ID and save in one locked step so no worker's farm is lost
+        async with file_lock(FARM_DATA_PATH):
+            added = await call(farm_store.add_if_absent, farm_data)
+        if not added:
             raise HTTPException(
                 status_code=400, 
                 detail="Farm ID already exists. Please try again."
             )
         
-        # Add new farm to the list
-        data["farms"].append(farm_data)
-        
-        # Save updated data
-        with open(farm_data_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
         return {
             "message": "Farm created successfully",
             "farm": {
@@ -441,76 +595,32 @@ async def create_farm(farm_data: dict):
 @app.post("/api/invest")
 async def create_investment(request: InvestmentRequest):
     try:
-        # Paths to data files
-        farm_data_path = "../../../data/farm_info/langs_farm.json"
-        holdings_path = "../../../data/investor_holdings.json"
-        
-        # Load farm data
-        if not os.path.exists(farm_data_path):
-            raise HTTPException(
-                status_code=404, 
-                detail="Farm data not found."
-            )
-        
-        with open(farm_data_path, 'r', encoding='utf-8') as f:
-            farm_data = json.load(f)
-        
-        # Find the farm
-        farm = None
-        for f in farm_data["farms"]:
-            if f.get("Farm ID") == request.farm_id:
-                farm = f
-                break
-        
-        if not farm:
-            raise HTTPException(
-                status_code=404, 
-                detail="Farm not found."
-            )
-        
-        # Check if enough tokens are available
-        if farm.get("Tokens Available", 0) < request.tokens_to_buy:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Not enough tokens available. Only {farm.get('Tokens Available', 0)} tokens are available."
-            )
-        
-        # Verify the total cost matches
-        expected_cost = request.tokens_to_buy * farm.get("Price per Token (USD)", 0)
-        if abs(expected_cost - request.total_cost) > 0.01:  # Allow for small floating point differences
-            raise HTTPException(
-                status_code=400, 
-                detail="Total cost does not match the expected amount."
-            )
-        
-        # Load investor holdings
-        if not os.path.exists(holdings_path):
-            os.makedirs(os.path.dirname(holdings_path), exist_ok=True)
-            holdings_data = {"holdings": []}
-        else:
-            with open(holdings_path, 'r', encoding='utf-8') as f:
-                holdings_data = json.load(f)
-        
-        # Check if investor already has holdings in this farm
-        existing_holding = None
-        for holding in holdings_data["holdings"]:
-            if (holding.get("Investor Email", "").lower() == request.investor_email.lower() and 
-                holding.get("Farm ID") == request.farm_id):
-                existing_holding = holding
-                break
-        
         current_date = datetime.now().strftime("%Y-%m-%d")
         
-        if existing_holding:
-            # Update existing holding
-            existing_holding["Tokens Owned"] += request.tokens_to_buy
-            existing_holding["Cost Basis"] += request.total_cost
-            existing_holding["Est. Value"] = existing_holding["Tokens Owned"] * farm.get("Price per Token (USD)", 0)
-            existing_holding["P&L"] = existing_holding["Est. Value"] - existing_holding["Cost Basis"]
-            existing_holding["P&L Percentage"] = (existing_holding["P&L"] / existing_holding["Cost Basis"]) * 100 if existing_holding["Cost Basis"] > 0 else 0
-        else:
-            # Create new holding
-            new_holding = {
+        def validate(farm):
+            if not farm:
+                raise HTTPException(
+                    status_code=404, 
+                    detail="Farm not found."
+                )
+            
+            # Check if enough tokens are available
+            if farm.get("Tokens Available", 0) < request.tokens_to_buy:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Not enough tokens available. Only {farm.get('Tokens Available', 0)} tokens are available."
+                )
+            
+            # Verify the total cost matches
+            expected_cost = request.tokens_to_buy * farm.get("Price per Token (USD)", 0)
+            if abs(expected_cost - request.total_cost) > 0.01:  # Allow for small floating point differences
+                raise HTTPException(
+                    status_code=400, 
+                    detail="Total cost does not match the expected amount."
+                )
+            
+            # New holding, used only if the investor has no position in this farm yet
+            return {
                 "Investor Email": request.investor_email,
                 "Investor Name": "Investor",  # This would come from user data in a real app
                 "Farm ID": request.farm_id,
@@ -526,19 +636,24 @@ async def create_investment(request: InvestmentRequest):
                 "Last Payout": None,
                 "Total Payouts Received": 0
             }
-            holdings_data["holdings"].append(new_holding)
-        
-        # Update farm data
-        farm["Tokens Sold"] += request.tokens_to_buy
-        farm["Tokens Available"] -= request.tokens_to_buy
-        farm["Last Updated"] = current_date
-        
-        # Save updated data
-        with open(farm_data_path, 'w', encoding='utf-8') as f:
-            json.dump(farm_data, f, indent=2, ensure_ascii=False)
         
-        with open(holdings_path, 'w', encoding='utf-8') as f:
-            json.dump(holdings_data, f, indent=2, ensure_ascii=False)
+        # Debit the farm and credit the investor together; concurrent purchases cannot oversell
+        try:
+            async with file_lock(FARM_DATA_PATH):
+                farm = await call(
+                    storage_backend.purchase,
+                    request.farm_id,
+                    request.investor_email,
+                    request.tokens_to_buy,
+                    request.total_cost,
+                    current_date,
+                    validate
+                )
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=404, 
+                detail="Farm data not found."
+            )
         
         return {
             "message": "Investment successful",
@@ -0,0 +1,101 @@
+"""Shared fixtures: the backend on sys.path and in-process stand-ins for algod.
+
+    cd backend && python -m pytest tests
+"""
+import itertools
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BACKEND_DIR, os.path.join(BACKEND_DIR, "benchmarks")]
+
+import fake_indexer  # noqa: E402
+from fake_algod import create_app, serve_in_thread  # noqa: E402
+
+# Distinct amounts keep otherwise identical transfers from sharing a txid
+_amounts = itertools.count(1)
+
+
+def next_amount():
+    return next(_amounts)
+
+
+@pytest.fixture(scope="session")
+def fake_algod():
+    """``(url, app)`` of a stand-in algod that confirms within a few tenths of a second"""
+    app = create_app(confirm_delay=0.2, round_time=0.1)
+    url, server = serve_in_thread(app)
+    yield url, app
+    server.should_exit = True
+
+
+@pytest.fixture(scope="session")
+def throttled_algod():
+    """``(url, app)`` of a stand-in algod that answers 429 past one submission a second"""
+    app = create_app(confirm_delay=0.2, round_time=0.1, rate_limit=1)
+    url, server = serve_in_thread(app)
+    yield url, app
+    server.should_exit = True
+
+
+@pytest.fixture(scope="session")
+def indexed_transactions():
+    """What the stand-in indexer reports by txid; tests add their own"""
+    return {}
+
+
+@pytest.fixture(scope="session")
+def fake_indexer_url(indexed_transactions):
+    """URL of a stand-in indexer serving ``indexed_transactions``"""
+    url, server = serve_in_thread(fake_indexer.create_app({}, transactions=indexed_transactions))
+    yield url
+    server.should_exit = True
+
+
+@pytest.fixture
+def algod_service(fake_algod):
+    """Install an ``AlgodService`` built by the returned factory as the process-wide one"""
+    from agritoken.algod_pool import AlgodService, set_algod_service
+
+    def install(url=None, **kwargs):
+        service = AlgodService(url or fake_algod[0], **kwargs)
+        set_algod_service(service)
+        return service
+
+    yield install
+    set_algod_service(None)
+
+
+@pytest.fixture(scope="session")
+def flask_app(tmp_path_factory, fake_algod, fake_indexer_url):
+    """The Flask app module over an empty data directory"""
+    os.environ["AGRITOKEN_DATA_DIR"] = str(tmp_path_factory.mktemp("data"))
+    os.environ["AGRITOKEN_ALGOD_ADDRESS"] = fake_algod[0]
+    os.environ["AGRITOKEN_INDEXER_ADDRESS"] = fake_indexer_url
+    os.environ.pop("AGRITOKEN_STORAGE", None)
+    import app
+    app.app.testing = True
+    return app
+
+
+@pytest.fixture(scope="session")
+def fastapi_app(tmp_path_factory):
+    """The FastAPI ``simple_server`` module over an empty data directory"""
+    os.environ["AGRITOKEN_DATA_DIR"] = str(tmp_path_factory.mktemp("api-data"))
+    os.environ.pop("AGRITOKEN_STORAGE", None)
+    sys.path.insert(0, os.path.join(BACKEND_DIR, "projects", "backend"))
+    import simple_server
+    return simple_server
+
+
+@pytest.fixture(scope="session")
+def deployer(flask_app):
+    """Address of a fresh deployer account installed through /set_mnemonic"""
+    from algosdk import account, mnemonic
+
+    private_key, address = account.generate_account()
+    response = flask_app.app.test_client().post("/set_mnemonic", json={"mnemonic": mnemonic.from_private_key(private_key)})
+    assert response.status_code == 200
+    return address
@@ -0,0 +1,43 @@
+import threading
+
+from algosdk import account, transaction
+
+from agritoken.algod_pool import AlgodService
+from conftest import next_amount
+from fake_algod import GENESIS_ID
+
+
+def test_suggested_params_are_cached_and_copied(fake_algod):
+    service = AlgodService(fake_algod[0])
+    try:
+        first = service.suggested_params()
+        first.fee = 12345
+        second = service.suggested_params()
+        assert second.fee != 12345
+        assert second.gen == GENESIS_ID
+        assert second.first == first.first
+
+        service.invalidate_params()
+        assert service.suggested_params().first >= first.first
+    finally:
+        service.close()
+
+
+def test_concurrent_submissions_share_the_pool(fake_algod):
+    service = AlgodService(fake_algod[0], max_connections=4)
+    private_key, sender = account.generate_account()
+    params = service.suggested_params()
+    txns = [transaction.AssetTransferTxn(sender, params, account.generate_account()[1], next_amount(), 1001)
+            for _ in range(20)]
+    txids = []
+    try:
+        threads = [threading.Thread(target=lambda txn=txn: txids.append(service.send_transaction(txn.sign(private_key))))
+                   for txn in txns]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(txids) == sorted(txn.get_txid() for txn in txns)
+        assert service.wait_for_confirmation(txids[0]).get("confirmed-round")
+    finally:
+        service.close()
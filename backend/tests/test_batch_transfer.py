@@ -0,0 +1,51 @@
+import pytest
+from algosdk import account
+
+from agritoken.batch_transfer import InvalidTransfer, validate_transfers
+from conftest import next_amount
+
+RECEIVER = account.generate_account()[1]
+
+
+def transfers(*overrides):
+    return [{"receiver_address": RECEIVER, "amount": 1, **override} for override in overrides]
+
+
+def test_valid_batches_return_the_asset_id():
+    assert validate_transfers("1001", transfers({}, {"asset_id": 1001})) == 1001
+
+
+@pytest.mark.parametrize("asset_id, items, index", [
+    ("abc", transfers({}), None),
+    (True, transfers({}), None),
+    (1001, [], None),
+    (1001, transfers({}, {"asset_id": "abc"}), 1),
+    (1001, transfers({}, {}, {"asset_id": 1002}), 2),
+    (1001, transfers({"amount": 1.5}), 0),
+    (1001, transfers({}, {"amount": "3"}), 1),
+    (1001, transfers({}, {"receiver_address": 12}), 1),
+    (1001, transfers({"receiver_address": "NOT-AN-ADDRESS"}), 0),
+    (1001, [transfers({})[0], "x"], 1),
+])
+def test_the_first_bad_item_is_named(asset_id, items, index):
+    with pytest.raises(InvalidTransfer) as excinfo:
+        validate_transfers(asset_id, items)
+    assert excinfo.value.index == index
+
+
+def test_endpoint_answers_400_with_the_index(flask_app, deployer):
+    client = flask_app.app.test_client()
+    items = [{"receiver_address": account.generate_account()[1], "amount": next_amount()} for _ in range(3)]
+    items[2]["asset_id"] = "not-a-number"
+
+    response = client.post("/transfer_assets/batch", json={"asset_id": 1001, "transfers": items})
+    assert response.status_code == 400
+    assert response.get_json()["index"] == 2
+
+    response = client.post("/transfer_assets/batch", json={"asset_id": "x1001", "transfers": items[:2]})
+    assert response.status_code == 400
+    assert "index" not in response.get_json()
+
+    response = client.post("/transfer_assets/batch?wait=false", json={"asset_id": 1001, "transfers": items[:2]})
+    assert response.status_code == 202
+    assert response.get_json()["succeeded"] == 2
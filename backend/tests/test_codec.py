@@ -0,0 +1,61 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from agritoken import codec
+
+DOCUMENT = {"farms": [{"Farm Name": "Café Ñandú", "Tokens Owned": 5, "Price": 1.25, "Active": True,
+                       "Images": [], "Notes": None}]}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def backend(request, monkeypatch):
+    """Run the test with orjson when it is installed, and without it"""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(codec, "orjson", None)
+    return request.param
+
+
+def test_round_trip_and_compact_shape(backend):
+    body = codec.dumps(DOCUMENT)
+    assert body == json.dumps(DOCUMENT, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    assert codec.loads(body) == DOCUMENT
+    assert codec.loads(body.decode("utf-8")) == DOCUMENT
+
+
+def test_values_the_stdlib_cannot_encode(backend):
+    numpy = pytest.importorskip("numpy")
+    encoded = codec.loads(codec.dumps({
+        1: Decimal("2.50"),
+        "day": date(2026, 1, 2),
+        "at": datetime(2026, 1, 2, 3, 4, 5),
+        "balances": numpy.array([1, 2]),
+        "supply": 2 ** 70,
+    }))
+    assert encoded == {"1": "2.50", "day": "2026-01-02", "at": "2026-01-02T03:04:05",
+                       "balances": [1, 2], "supply": 2 ** 70}
+
+    with pytest.raises(TypeError):
+        codec.dumps({"key": object()})
+
+
+def test_data_files_are_indented_unless_compact(backend, tmp_path):
+    indented = codec.dumps_file(DOCUMENT, compact=False)
+    assert indented == json.dumps(DOCUMENT, indent=2, ensure_ascii=False).encode("utf-8")
+    assert codec.dumps_file(DOCUMENT, compact=True) == codec.dumps(DOCUMENT)
+
+    path = tmp_path / "farms.json"
+    path.write_bytes(indented)
+    assert codec.load_file(path) == DOCUMENT
+    with pytest.raises(FileNotFoundError):
+        codec.load_file(tmp_path / "missing.json")
+
+
+def test_bad_input_raises_a_json_decode_error(backend):
+    for bad in (b"{not json", b"", "[1,"):
+        with pytest.raises(json.JSONDecodeError):
+            codec.loads(bad)
@@ -0,0 +1,177 @@
+import threading
+import time
+import uuid
+
+from algosdk import account, transaction
+
+from agritoken.algod_pool import AlgodService
+from agritoken.confirmation_tracker import CONFIRMED, FAILED, PENDING, ConfirmationTracker, PendingTransactionStore
+from agritoken.reconcile import TransactionIndexer
+from conftest import next_amount
+
+
+def submit_transfer(service):
+    private_key, sender = account.generate_account()
+    txn = transaction.AssetTransferTxn(sender, service.suggested_params(), account.generate_account()[1],
+                                       next_amount(), 1001)
+    return service.send_transaction(txn.sign(private_key))
+
+
+def drained(store, timeout=5):
+    """True once ``store`` has no pending entries; they are removed just after the callback returns"""
+    deadline = time.monotonic() + timeout
+    while store.pending():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def watching(tracker, kind):
+    """Record final statuses of ``kind``; returns ``(statuses, event set on the first)``"""
+    finished = []
+    done = threading.Event()
+
+    def on_finished(status):
+        finished.append(status)
+        done.set()
+    tracker.on(kind, on_finished, on_finished)
+    return finished, done
+
+
+def unknown_txid():
+    return "UNKNOWN" + uuid.uuid4().hex.upper()
+
+
+def test_tracked_transfers_confirm_and_leave_the_store(tmp_path, algod_service):
+    service = algod_service()
+    store = PendingTransactionStore(str(tmp_path / "pending_transactions.json"))
+    tracker = ConfirmationTracker(lambda: service, store=store, poll_interval=0.05)
+    confirmed, done = watching(tracker, "asset_transfer")
+
+    txid = submit_transfer(service)
+    assert tracker.track(txid, "asset_transfer", amount=1)["status"] == "pending"
+    assert [entry["txid"] for entry in store.pending()] == [txid]
+
+    assert done.wait(5)
+    assert confirmed[0]["transaction_id"] == txid and confirmed[0]["amount"] == 1
+    assert tracker.status(txid)["status"] == CONFIRMED
+    assert drained(store)
+
+
+def test_a_restarted_process_resumes_pending_txids(tmp_path, algod_service):
+    service = algod_service()
+    path = str(tmp_path / "pending_transactions.json")
+    txid = submit_transfer(service)
+
+    # Submitted and recorded, then the process died before it confirmed
+    PendingTransactionStore(path).add(txid, "tokenize_farm", {"data_file": "farm.json"}, 0)
+
+    tracker = ConfirmationTracker(lambda: service, store=PendingTransactionStore(path), poll_interval=0.05)
+    confirmed, done = watching(tracker, "tokenize_farm")
+    assert tracker.status(txid)["status"] == "pending"
+    assert tracker.resume() == 1
+
+    assert done.wait(5)
+    assert confirmed[0]["data_file"] == "farm.json"
+    assert drained(PendingTransactionStore(path))
+
+
+def test_failed_callbacks_stay_pending_for_the_next_start(tmp_path, algod_service):
+    service = algod_service()
+    path = str(tmp_path / "pending_transactions.json")
+    tracker = ConfirmationTracker(lambda: service, store=PendingTransactionStore(path), poll_interval=0.05)
+    called = threading.Event()
+
+    def broken(status):
+        called.set()
+        raise IOError("disk full")
+    tracker.on("asset_transfer", broken)
+
+    txid = submit_transfer(service)
+    tracker.track(txid, "asset_transfer")
+    assert called.wait(5)
+    assert [entry["txid"] for entry in PendingTransactionStore(path).pending()] == [txid]
+
+
+def test_lookup_asks_algod_about_txids_it_does_not_track(algod_service):
+    service = algod_service()
+    txid = submit_transfer(service)
+    service.wait_for_confirmation(txid)
+
+    status = ConfirmationTracker(lambda: service).lookup(txid)
+    assert status["status"] == CONFIRMED and status["confirmed_round"]
+    assert ConfirmationTracker(lambda: service).lookup("UNKNOWN") is None
+
+
+def test_txids_algod_forgot_are_found_in_the_indexer(tmp_path, algod_service, fake_indexer_url,
+                                                    indexed_transactions):
+    service = algod_service()
+    path = str(tmp_path / "pending_transactions.json")
+    # Confirmed while the server was down, and since dropped by algod
+    txid = unknown_txid()
+    indexed_transactions[txid] = {"confirmed-round": 50000001, "created-asset-index": 777}
+    PendingTransactionStore(path).add(txid, "tokenize_farm", {"data_file": "farm.json"}, 0)
+
+    indexer = TransactionIndexer(fake_indexer_url)
+    tracker = ConfirmationTracker(lambda: service, store=PendingTransactionStore(path),
+                                  get_indexer=lambda: indexer, poll_interval=0.05)
+    finished, done = watching(tracker, "tokenize_farm")
+    assert tracker.resume() == 1
+
+    assert done.wait(5)
+    assert (finished[0]["status"], finished[0]["asset_id"]) == (CONFIRMED, 777)
+    assert drained(PendingTransactionStore(path))
+    assert ConfirmationTracker(lambda: service, get_indexer=lambda: indexer).lookup(txid)["asset_id"] == 777
+
+
+def test_txids_fail_only_past_their_last_valid_round(tmp_path, algod_service, fake_indexer_url):
+    service = algod_service()
+    path = str(tmp_path / "pending_transactions.json")
+    store = PendingTransactionStore(path)
+    unseen, expired = unknown_txid(), unknown_txid()
+    store.add(unseen, "asset_transfer", {}, 0)
+    store.add(expired, "asset_transfer", {}, 0)
+    store.set_last_valid(expired, 1)
+
+    indexer = TransactionIndexer(fake_indexer_url)
+    tracker = ConfirmationTracker(lambda: service, store=store, get_indexer=lambda: indexer, poll_interval=0.05)
+    finished, done = watching(tracker, "asset_transfer")
+    tracker.resume()
+
+    assert done.wait(5)
+    time.sleep(0.2)
+    assert [(status["transaction_id"], status["status"]) for status in finished] == [(expired, FAILED)]
+    # Not found anywhere yet, but it may still confirm for a full validity window
+    assert tracker.status(unseen)["status"] == PENDING
+    assert store.get(unseen)["last_valid"] > service.client.status()["last-round"]
+
+
+def test_lookup_errors_leave_txids_pending(tmp_path):
+    unreachable = AlgodService("http://127.0.0.1:1")
+    store = PendingTransactionStore(str(tmp_path / "pending_transactions.json"))
+    store.add("TXID", "asset_transfer", {}, 0)
+    store.set_last_valid("TXID", 1)
+
+    tracker = ConfirmationTracker(lambda: unreachable, store=store, poll_interval=0.05)
+    finished, _ = watching(tracker, "asset_transfer")
+    tracker.resume()
+    time.sleep(0.3)
+    unreachable.close()
+
+    assert finished == []
+    assert tracker.status("TXID")["status"] == PENDING
+    assert store.get("TXID") is not None
+
+
+def test_each_txid_is_resumed_by_one_worker(tmp_path):
+    path = str(tmp_path / "pending_transactions.json")
+    PendingTransactionStore(path).add("TXID", "asset_transfer", {}, 0)
+    # Another worker holds it for a short lease, then dies
+    PendingTransactionStore(path).claim("other-worker", 0.2)
+
+    unused = ConfirmationTracker(lambda: None, store=PendingTransactionStore(path))
+    assert unused.resume() == 0
+    time.sleep(0.25)
+    assert unused.resume() == 1
+    assert ConfirmationTracker(lambda: None, store=PendingTransactionStore(path)).resume() == 0
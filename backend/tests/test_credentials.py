@@ -0,0 +1,75 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from agritoken.credentials import CredentialService
+
+
+def test_hashes_verify_and_are_salted():
+    service = CredentialService(n=16)
+    stored = service.hash_password("hunter2")
+    assert stored.startswith("scrypt$16$8$1$")
+    assert service.hash_password("hunter2") != stored
+    assert service.verify_password(stored, "hunter2") == (True, False)
+    assert service.verify_password(stored, "hunter3") == (False, False)
+    assert service.verify_password("scrypt$16$8$garbled", "hunter2") == (False, False)
+
+
+def test_legacy_and_weaker_hashes_need_upgrading():
+    service = CredentialService(n=16)
+    assert service.verify_password("hunter2", "hunter2") == (True, True)
+    assert service.verify_password("hunter2", "hunter3")[0] is False
+    assert service.verify_password(None, "")[0] is True
+
+    weaker = CredentialService(n=8).hash_password("hunter2")
+    assert service.verify_password(weaker, "hunter2") == (True, True)
+    assert service.verify_password(weaker, "nope") == (False, False)
+
+
+def test_async_calls_run_on_the_pool():
+    service = CredentialService(n=16, max_workers=2)
+
+    async def roundtrip():
+        stored = await service.hash("pw")
+        results = await asyncio.gather(*(service.verify(stored, guess) for guess in ("pw", "px")))
+        await service.burn("pw")
+        return results
+    try:
+        assert asyncio.run(roundtrip()) == [(True, False), (False, False)]
+    finally:
+        service.shutdown()
+
+
+def test_login_upgrades_a_plaintext_password(fastapi_app):
+    client = TestClient(fastapi_app.app)
+    fastapi_app.user_store.add_if_absent({
+        "User Email": "legacy@example.com", "User Password": "s3cret",
+        "User First Name": "Old", "User Last Name": "Timer", "User Role": "Investor", "User Status": "Active",
+    })
+
+    assert client.post("/api/login", json={"email": "legacy@example.com", "password": "wrong"}).status_code == 401
+    assert fastapi_app.user_store.get("legacy@example.com")["User Password"] == "s3cret"
+
+    response = client.post("/api/login", json={"email": "legacy@example.com", "password": "s3cret"})
+    assert response.status_code == 200
+    assert "s3cret" not in response.text
+    stored = fastapi_app.user_store.get("legacy@example.com")["User Password"]
+    assert stored.startswith("scrypt$")
+    assert fastapi_app.credentials.verify_password(stored, "s3cret") == (True, False)
+
+    again = client.post("/api/login", json={"email": "legacy@example.com", "password": "s3cret"})
+    assert again.status_code == 200
+    assert fastapi_app.user_store.get("legacy@example.com")["User Password"] == stored
+
+
+def test_signup_stores_only_the_hash(fastapi_app):
+    client = TestClient(fastapi_app.app)
+    signup = {"firstName": "New", "lastName": "User", "email": "new@example.com", "password": "pw12345",
+              "walletAddress": "", "role": "Farmer"}
+    assert client.post("/api/signup", json=signup).status_code == 200
+    assert client.post("/api/signup", json=signup).status_code == 400
+
+    stored = fastapi_app.user_store.get("new@example.com")["User Password"]
+    assert stored.startswith("scrypt$") and "pw12345" not in stored
+    assert client.post("/api/login", json={"email": "new@example.com", "password": "pw12345"}).status_code == 200
+    assert client.post("/api/login", json={"email": "nobody@example.com", "password": "pw12345"}).status_code == 401
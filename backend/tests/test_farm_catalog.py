@@ -0,0 +1,76 @@
+import json
+import os
+import time
+
+from agritoken.farm_catalog import FarmCatalog
+
+
+def write(directory, filename, data):
+    with open(os.path.join(directory, filename), "w") as f:
+        json.dump(data, f)
+
+
+def farm(farm_id, **fields):
+    return {"Farm ID": farm_id, "Farm Name": f"Farm {farm_id}", "Farmer Email": f"{farm_id}@Example.com",
+            "Asset ID": 100 + int(farm_id[1:]), **fields}
+
+
+def test_files_in_every_layout_are_indexed(tmp_path):
+    write(tmp_path, "single.json", farm("F1"))
+    write(tmp_path, "list.json", [farm("F2"), farm("F3", **{"Transaction Status": "pending"})])
+    write(tmp_path, "wrapped.json", {"farms": [farm("F4")]})
+    (tmp_path / "broken.json").write_text("{not json")
+    (tmp_path / "notes.txt").write_text("ignored")
+    catalog = FarmCatalog(str(tmp_path))
+
+    # Pending farms stay out until their asset exists
+    assert sorted(f["Farm ID"] for f in catalog.all()) == ["F1", "F2", "F4"]
+    assert catalog.get_by_asset_id(104)["Farm ID"] == "F4"
+    assert [f["Farm ID"] for f in catalog.get_by_farmer_email("f1@example.com")] == ["F1"]
+    assert catalog.get_by_farm_id("F3") is None
+
+
+def test_only_changed_files_are_parsed_again(tmp_path, monkeypatch):
+    write(tmp_path, "a.json", farm("F1"))
+    write(tmp_path, "b.json", farm("F2"))
+    catalog = FarmCatalog(str(tmp_path), rescan_interval=0)
+    version, _ = catalog.snapshot()
+
+    parsed = []
+    load = catalog._load_file
+    monkeypatch.setattr(catalog, "_load_file", lambda path: parsed.append(os.path.basename(path)) or load(path))
+    assert catalog.snapshot()[0] == version
+    assert parsed == []
+
+    write(tmp_path, "c.json", farm("F3"))
+    os.remove(tmp_path / "a.json")
+    version, farms = catalog.snapshot()
+    assert parsed == ["c.json"]
+    assert sorted(f["Farm ID"] for f in farms) == ["F2", "F3"]
+
+
+def test_in_place_edits_show_up_after_the_rescan_interval(tmp_path):
+    write(tmp_path, "a.json", farm("F1", **{"Tokens Sold": 0}))
+    catalog = FarmCatalog(str(tmp_path), rescan_interval=0.05)
+    assert catalog.get_by_farm_id("F1")["Tokens Sold"] == 0
+
+    # Rewriting a file in place leaves the directory mtime alone
+    dir_mtime = os.stat(tmp_path).st_mtime_ns
+    with open(tmp_path / "a.json", "r+") as f:
+        f.write(json.dumps(farm("F1", **{"Tokens Sold": 25})))
+    assert os.stat(tmp_path).st_mtime_ns == dir_mtime
+
+    time.sleep(0.06)
+    assert catalog.get_by_farm_id("F1")["Tokens Sold"] == 25
+
+
+def test_writes_through_the_catalog_are_indexed_at_once(tmp_path):
+    catalog = FarmCatalog(str(tmp_path), rescan_interval=3600)
+    catalog.all()
+    path = catalog.save("new.json", {"Farm Name": "New", "Transaction Status": "pending", "Farm ID": "N1"})
+    assert catalog.get_by_farm_id("N1") is None
+
+    catalog.update(path, {"Asset ID": 555, "Transaction Status": "confirmed"})
+    assert catalog.get_by_asset_id(555)["Farm ID"] == "N1"
+    assert catalog.update_by_farm_id("N1", {"Tokens Sold": 3}) == 1
+    assert catalog.get_by_farm_id("N1")["Tokens Sold"] == 3
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from agritoken.farm_query import FarmQuery, FarmQueryError, FarmSearch
+
+
+def make_farm(i, rng):
+    return {
+        "Farm ID": f"F{i:04d}",
+        "Farm Name": f"Farm {rng.randint(0, 9)}",
+        "Crop Type": rng.choice(["Wheat", "Corn"]),
+        "Est. APY": rng.choice([5, 7, 9]),
+        "Price per Token (USD)": rng.choice([1, 2]),
+        "Tokens Available": rng.randint(0, 3),
+        "created_at": f"2026-01-{i % 28 + 1:02d}T00:00:00",
+    }
+
+
+class Catalog:
+    """A farm list whose version moves on every write, like FarmCatalog"""
+
+    def __init__(self, farms):
+        self.version = 0
+        self.farms = list(farms)
+
+    def snapshot(self):
+        return self.version, self.farms
+
+    def write(self, farms):
+        self.farms = farms
+        self.version += 1
+
+
+def page_through(search, catalog, args, between_pages=None):
+    seen = []
+    cursor = None
+    while True:
+        page, cursor, _ = search.search(FarmQuery.from_args({**args, **({"cursor": cursor} if cursor else {})}))
+        seen.extend(farm["Farm ID"] for farm in page)
+        if between_pages:
+            between_pages(catalog, seen)
+        if not cursor:
+            return seen
+
+
+@pytest.mark.parametrize("sort", ["default", "name", "-apy", "price", "-created", "available"])
+def test_pages_match_the_full_listing(sort):
+    rng = random.Random(1)
+    catalog = Catalog(make_farm(i, rng) for i in range(60))
+    search = FarmSearch(catalog.snapshot)
+
+    full, _, total = search.search(FarmQuery.from_args({"sort": sort, "limit": "500"}))
+    assert total == 60
+    assert page_through(search, catalog, {"sort": sort, "limit": "7"}) == [farm["Farm ID"] for farm in full]
+
+
+@pytest.mark.parametrize("sort", ["default", "name", "-apy", "created"])
+def test_cursors_survive_inserts_and_deletes(sort):
+    rng = random.Random(2)
+    originals = [make_farm(i, rng) for i in range(50)]
+    catalog = Catalog(originals)
+    search = FarmSearch(catalog.snapshot)
+    added = iter(range(1000, 2000))
+
+    def churn(catalog, seen):
+        # A new farm at the front of the list and one already-seen farm gone
+        farm = make_farm(next(added), rng)
+        catalog.write([farm] + [f for f in catalog.farms if f["Farm ID"] != seen[0]])
+
+    seen = page_through(search, catalog, {"sort": sort, "limit": "6"}, churn)
+    assert len(seen) == len(set(seen)), "a row was repeated"
+    assert {farm["Farm ID"] for farm in originals} <= set(seen), "a row was skipped"
+
+
+def test_filters_apply_before_paging():
+    rng = random.Random(3)
+    catalog = Catalog(make_farm(i, rng) for i in range(40))
+    search = FarmSearch(catalog.snapshot)
+    args = {"crop": "wheat", "min_apy": "7", "available": "true", "sort": "price"}
+
+    expected = [farm["Farm ID"] for farm in search.search(FarmQuery.from_args(args))[0]]
+    assert expected and all(
+        farm["Crop Type"] == "Wheat" and farm["Est. APY"] >= 7 and farm["Tokens Available"] > 0
+        for farm in catalog.farms if farm["Farm ID"] in expected
+    )
+    assert page_through(search, catalog, {**args, "limit": "4"}) == expected
+
+
+def test_unpaged_default_keeps_list_order():
+    rng = random.Random(4)
+    catalog = Catalog(make_farm(i, rng) for i in reversed(range(10)))
+    farms, cursor, total = FarmSearch(catalog.snapshot).search(FarmQuery.from_args({}))
+    assert [farm["Farm ID"] for farm in farms] == [farm["Farm ID"] for farm in catalog.farms]
+    assert cursor is None and total == 10
+
+
+def test_bad_cursors_are_rejected():
+    rng = random.Random(5)
+    catalog = Catalog(make_farm(i, rng) for i in range(10))
+    search = FarmSearch(catalog.snapshot)
+    _, cursor, _ = search.search(FarmQuery.from_args({"sort": "name", "limit": "3"}))
+
+    with pytest.raises(FarmQueryError, match="different sort"):
+        search.search(FarmQuery.from_args({"sort": "price", "cursor": cursor}))
+    with pytest.raises(FarmQueryError, match="not valid"):
+        search.search(FarmQuery.from_args({"cursor": "garbage!"}))
+    with pytest.raises(FarmQueryError):
+        FarmQuery.from_args({"limit": "0"})
@@ -0,0 +1,45 @@
+import json
+
+from agritoken.backends import JsonBackend
+from agritoken.farm_schema import FARM_FIELDS, SCHEMA_KEY, canonical_farm, merge_farm, public_farm
+
+LEGACY = {"Farm Name": "Old Farm", "ASA ID": 42, "Farm Email": "old@example.com", "Number of Tokens": 10,
+          "Notes": "kept in storage"}
+
+
+def test_legacy_records_are_canonicalized():
+    farm = canonical_farm(LEGACY)
+    assert (farm["Farm ID"], farm["ASA ID"], farm["Asset ID"]) == ("farm_42", "42", "42")
+    assert farm["Farmer Email"] == farm["Farm Email"] == "old@example.com"
+    assert farm["Tokens Available"] == 10
+    assert farm["Notes"] == "kept in storage" and farm[SCHEMA_KEY] == 1
+
+    confirmed = merge_farm(canonical_farm({"Farm Name": "New"}), {"Asset ID": 7})
+    assert (confirmed["Farm ID"], confirmed["ASA ID"]) == ("farm_7", "7")
+
+
+def test_read_endpoints_serve_only_the_farm_fields():
+    farm = public_farm(LEGACY)
+    assert tuple(farm) == FARM_FIELDS
+    assert "Notes" not in farm and SCHEMA_KEY not in farm
+
+
+def test_reading_leaves_legacy_files_alone_until_migrated(tmp_path):
+    path = tmp_path / "farm_info" / "old.json"
+    path.parent.mkdir()
+    path.write_text(json.dumps(LEGACY))
+    backend = JsonBackend(str(tmp_path))
+
+    assert backend.farm_catalog.get_by_farm_id("farm_42")["Asset ID"] == "42"
+    assert json.loads(path.read_text()) == LEGACY
+
+    assert backend.upgrade_farms() == 1
+    assert json.loads(path.read_text())[SCHEMA_KEY] == 1
+    assert backend.upgrade_farms() == 0
+
+
+def test_farm_listing_has_the_fixed_key_set(flask_app):
+    flask_app.farm_catalog.save("extra.json", {**LEGACY, "Farm ID": "EXTRA"})
+    farms = flask_app.app.test_client().get("/farms").get_json()
+    extra = next(farm for farm in farms if farm["Farm ID"] == "EXTRA")
+    assert tuple(extra) == FARM_FIELDS
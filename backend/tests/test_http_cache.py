@@ -0,0 +1,95 @@
+import gzip
+
+import pytest
+
+from agritoken import codec
+from agritoken.http_cache import MIN_COMPRESS_BYTES, ResponseCache, negotiate_encoding
+
+PAYLOAD = {"farms": [{"Farm ID": f"F{i}", "Farm Name": f"Farm {i}"} for i in range(100)]}
+
+
+def rendering(payload=PAYLOAD):
+    """``render`` returning ``payload``; the list counts the calls"""
+    calls = []
+
+    def render():
+        calls.append(1)
+        return payload, {"X-Total-Count": "100"}
+    return render, calls
+
+
+def test_bodies_are_rendered_once_per_version():
+    cache = ResponseCache()
+    version = [1]
+    render, calls = rendering()
+
+    for _ in range(3):
+        status, body, headers = cache.serve("farms", lambda: version[0], render)
+    assert (status, codec.loads(body), headers["X-Total-Count"]) == (200, PAYLOAD, "100")
+    assert len(calls) == 1
+
+    version[0] = 2
+    cache.serve("farms", lambda: version[0], render)
+    assert len(calls) == 2
+
+
+def test_each_content_coding_gets_its_own_etag():
+    cache = ResponseCache()
+    render, _ = rendering()
+
+    _, plain, plain_headers = cache.serve("farms", lambda: 1, render)
+    _, zipped, zipped_headers = cache.serve("farms", lambda: 1, render, accept_encoding="gzip, deflate")
+
+    assert "Content-Encoding" not in plain_headers
+    assert zipped_headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(zipped) == plain
+    assert zipped_headers["ETag"] != plain_headers["ETag"]
+    assert zipped_headers["ETag"] == plain_headers["ETag"][:-1] + '-gzip"'
+    assert plain_headers["Vary"] == zipped_headers["Vary"] == "Accept-Encoding"
+
+
+@pytest.mark.parametrize("encoding", [None, "gzip"])
+def test_any_of_the_payloads_etags_revalidates(encoding):
+    cache = ResponseCache()
+    render, _ = rendering()
+    tags = [cache.serve("farms", lambda: 1, render, accept_encoding=accept)[2]["ETag"]
+            for accept in (None, "gzip")]
+
+    for if_none_match in tags + ["W/" + tags[0], '"other", ' + tags[1], "*"]:
+        status, body, headers = cache.serve("farms", lambda: 1, render, if_none_match=if_none_match,
+                                            accept_encoding=encoding)
+        assert (status, body) == (304, b"")
+        assert headers["ETag"] == tags[1 if encoding else 0]
+
+    changed, _ = rendering({"farms": []})
+    assert cache.serve("farms", lambda: 2, changed, if_none_match=tags[0])[0] == 200
+
+
+def test_negotiation():
+    size = MIN_COMPRESS_BYTES
+    assert negotiate_encoding("gzip", size - 1) is None
+    assert negotiate_encoding(None, size) is None
+    assert negotiate_encoding("gzip;q=0, identity", size) is None
+    assert negotiate_encoding("*", size) == "gzip"
+    assert negotiate_encoding("GZIP;q=0.5", size) == "gzip"
+
+
+def test_brotli_is_preferred_when_installed():
+    brotli = pytest.importorskip("brotli")
+    cache = ResponseCache()
+    render, _ = rendering()
+    _, plain, _ = cache.serve("farms", lambda: 1, render)
+    _, body, headers = cache.serve("farms", lambda: 1, render, accept_encoding="gzip, br")
+    assert headers["Content-Encoding"] == "br"
+    assert headers["ETag"].endswith('-br"')
+    assert brotli.decompress(body) == plain
+
+
+def test_farm_listing_answers_304_until_a_farm_changes(flask_app):
+    client = flask_app.app.test_client()
+    first = client.get("/farms", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200 and first.headers["ETag"]
+
+    again = client.get("/farms", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.data == b""
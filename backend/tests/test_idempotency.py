@@ -0,0 +1,138 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+from agritoken.idempotency import (
+    EXECUTED, JOINED, REPLAYED, IdempotencyCache, IdempotencyConflict, IdempotencyInFlight, IdempotencyStore,
+    fingerprint,
+)
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "idempotency_keys.json")
+
+
+def counting(status=201, body=None):
+    calls = []
+
+    def execute():
+        calls.append(1)
+        return status, body if body is not None else {"n": len(calls)}
+    return execute, calls
+
+
+def test_completed_keys_replay(store_path):
+    cache = IdempotencyCache(IdempotencyStore(store_path))
+    execute, calls = counting()
+
+    assert cache.run("k", "fp", execute) == (201, {"n": 1}, EXECUTED)
+    assert cache.run("k", "fp", execute) == (201, {"n": 1}, REPLAYED)
+    # Another worker process reads the same store
+    assert IdempotencyCache(IdempotencyStore(store_path)).run("k", "fp", execute)[2] == REPLAYED
+    assert len(calls) == 1
+
+
+def test_reusing_a_key_for_another_request_conflicts(store_path):
+    cache = IdempotencyCache(IdempotencyStore(store_path))
+    cache.run("k", fingerprint("POST", "/a", b"{}"), counting()[0])
+    with pytest.raises(IdempotencyConflict):
+        cache.run("k", fingerprint("POST", "/a", b'{"x": 1}'), counting()[0])
+
+
+def test_server_errors_and_throttling_are_not_stored(store_path):
+    cache = IdempotencyCache(IdempotencyStore(store_path))
+    for status in (500, 503, 429):
+        execute, calls = counting(status)
+        cache.run(f"k{status}", "fp", execute)
+        cache.run(f"k{status}", "fp", execute)
+        assert len(calls) == 2
+
+    def boom():
+        raise RuntimeError("boom")
+    with pytest.raises(RuntimeError):
+        cache.run("raised", "fp", boom)
+    assert cache.run("raised", "fp", counting()[0])[2] == EXECUTED
+
+
+def test_duplicates_join_the_running_request(store_path):
+    cache = IdempotencyCache(IdempotencyStore(store_path))
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return 200, {"ok": True}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.run("k", "fp", slow))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(outcome for _, _, outcome in results) == [EXECUTED] + [JOINED] * 3
+
+
+def test_waiting_is_bounded(store_path):
+    here = IdempotencyCache(IdempotencyStore(store_path), join_timeout=0.1)
+    elsewhere = IdempotencyCache(IdempotencyStore(store_path))
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return 200, {}
+
+    thread = threading.Thread(target=here.run, args=("k", "fp", slow))
+    thread.start()
+    time.sleep(0.05)
+    try:
+        # Another process answers straight away; this one after join_timeout
+        started = time.monotonic()
+        with pytest.raises(IdempotencyInFlight) as excinfo:
+            elsewhere.run("k", "fp", slow)
+        assert time.monotonic() - started < 0.5
+        assert excinfo.value.retry_after_header() == "1"
+        with pytest.raises(IdempotencyInFlight):
+            here.run("k", "fp", slow)
+    finally:
+        release.set()
+        thread.join()
+    assert elsewhere.run("k", "fp", slow)[2] == REPLAYED
+
+
+def test_expired_keys_run_again(store_path):
+    cache = IdempotencyCache(IdempotencyStore(store_path), ttl=0.05)
+    execute, calls = counting()
+    cache.run("k", "fp", execute)
+    time.sleep(0.1)
+    assert cache.run("k", "fp", execute)[2] == EXECUTED
+    assert len(calls) == 2
+
+
+def test_endpoint_replays_and_rejects_a_changed_body(flask_app):
+    client = flask_app.app.test_client()
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    # Missing fields: a 400 is stored like any other answer, without touching the chain
+    body = {"asset_id": 1}
+
+    first = client.post("/transfer_assets", json=body, headers=headers)
+    assert first.status_code == 400
+    assert "Idempotent-Replayed" not in first.headers
+
+    again = client.post("/transfer_assets", json=body, headers=headers)
+    assert again.status_code == 400
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.get_json() == first.get_json()
+
+    changed = client.post("/transfer_assets", json={"asset_id": 2}, headers=headers)
+    assert changed.status_code == 422
+
+    blank = client.post("/transfer_assets", json=body, headers={"Idempotency-Key": " "})
+    assert blank.status_code == 400
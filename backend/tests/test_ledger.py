@@ -0,0 +1,87 @@
+import os
+
+from agritoken.holdings_store import HoldingsStore
+from agritoken.user_store import UserStore
+
+
+def holding(email, farm_id, tokens, transaction_id=None):
+    row = {"Investor Email": email, "Farm ID": farm_id, "Tokens Owned": tokens, "Cost Basis": tokens * 10,
+           "Token Price": 10, "Est. Value": tokens * 10, "P&L": 0, "Total Payouts Received": 0}
+    if transaction_id:
+        row["Transaction ID"] = transaction_id
+    return row
+
+
+def test_writes_replay_in_another_instance(tmp_path):
+    path = str(tmp_path / "investor_holdings.json")
+    writer = HoldingsStore(path)
+    reader = HoldingsStore(path)
+
+    writer.add(holding("a@example.com", "F1", 5, "TX1"))
+    writer.add(holding("b@example.com", "F1", 3))
+    writer.update_by_transaction("TX1", {"Transaction Status": "confirmed"})
+    writer.record_payout("F1", 0.5, "2026-01-01")
+
+    rows = reader.all()
+    assert [row["Investor Email"] for row in rows] == ["a@example.com", "b@example.com"]
+    assert rows[0]["Transaction Status"] == "confirmed"
+    assert [row["Total Payouts Received"] for row in rows] == [2.5, 1.5]
+    assert reader.version() == reader.version()
+
+
+def test_compaction_folds_the_log_into_the_snapshot(tmp_path):
+    path = str(tmp_path / "investor_holdings.json")
+    store = HoldingsStore(path, compact_every=3)
+    for i in range(4):
+        store.add(holding(f"investor{i}@example.com", "F1", i + 1))
+
+    # The third record triggered compaction; only the fourth is left in the log
+    assert os.path.getsize(store.log_path) > 0
+    with open(store.log_path, "rb") as f:
+        assert len(f.read().splitlines()) == 1
+
+    store.compact()
+    assert os.path.getsize(store.log_path) == 0
+    assert [row["Tokens Owned"] for row in HoldingsStore(path).all()] == [1, 2, 3, 4]
+
+
+def test_reader_reloads_after_another_process_compacts(tmp_path):
+    path = str(tmp_path / "investor_holdings.json")
+    writer = HoldingsStore(path)
+    reader = HoldingsStore(path)
+    writer.add(holding("a@example.com", "F1", 1))
+    assert len(reader.all()) == 1
+
+    writer.compact()
+    writer.add(holding("b@example.com", "F1", 2))
+    assert [row["Tokens Owned"] for row in reader.all()] == [1, 2]
+
+
+def test_bad_and_partial_log_lines_are_skipped(tmp_path):
+    path = str(tmp_path / "signup_info.json")
+    store = UserStore(path)
+    store.add_if_absent({"User Email": "A@example.com", "User First Name": "Ann"})
+    with open(store.log_path, "ab") as f:
+        f.write(b"not json\n")
+        f.write(b'{"op": "add", "user": {"User Email": "half')
+
+    reader = UserStore(path)
+    assert [user["User Email"] for user in reader.all()] == ["A@example.com"]
+
+    # The partial line is finished later and picked up then
+    with open(store.log_path, "ab") as f:
+        f.write(b'@example.com"}}\n')
+    assert reader.get("HALF@example.com") is not None
+
+
+
+def test_returned_rows_are_copies(tmp_path):
+    store = HoldingsStore(str(tmp_path / "investor_holdings.json"))
+    store.add(holding("a@example.com", "F1", 5, "TX1"))
+
+    row = store.for_investor("a@example.com")[0]
+    row["Tokens Owned"] = 999
+    store.update_by_transaction("TX1", {"Transaction Status": "confirmed"})
+
+    assert "Transaction Status" not in row
+    assert store.all()[0]["Tokens Owned"] == 5
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from agritoken.payout_engine import InvalidHoldings, PayoutEngine, allocate_cents, token_count
+
+
+def holdings(*rows):
+    return [{"Holding ID": f"h{i}", "Farm ID": farm_id, "Investor Email": f"{farm_id}-{i}@example.com",
+             "Tokens Owned": tokens} for i, (farm_id, tokens) in enumerate(rows)]
+
+
+def test_largest_remainder_adds_up_exactly():
+    # 100 cents over 1:1:1 is 33.33 each; the spare cent goes to the first holder
+    assert allocate_cents([1, 1, 1], 100).tolist() == [34, 33, 33]
+    # Remainders 0.5, 0.25, 0.25 of a cent after the floors of 2, 1 and 1
+    assert allocate_cents([10, 5, 5], 5).tolist() == [3, 1, 1]
+    assert allocate_cents([0, 0], 100).tolist() == [0, 0]
+
+
+def test_largest_remainder_goes_to_the_largest_fraction():
+    # Exact shares 33.3, 66.6: floors 33 and 66, the leftover cent goes to 66.6
+    assert allocate_cents([1, 2], 100).tolist() == [33, 67]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_allocations_always_sum_to_the_payout(seed):
+    rng = np.random.default_rng(seed)
+    tokens = rng.integers(1, 10_000, size=200)
+    cents = int(rng.integers(1, 10_000_000))
+    allocation = allocate_cents(tokens, cents)
+    assert allocation.sum() == cents
+    exact = tokens * cents / tokens.sum()
+    assert np.all(np.abs(allocation - exact) < 1)
+
+
+def test_simulations_agree_with_each_other():
+    engine = PayoutEngine(holdings(("F1", 3), ("F2", 7), ("F1", 5), ("F2", 1), ("F1", 2)))
+
+    single = engine.simulate("F1", 100.01)
+    assert single.sum() == 10001
+    assert engine.total_tokens("F1") == 10
+
+    everything = engine.simulate_all({"F1": 100.01, "F2": 9.99})
+    assert everything[engine.farm_slice("F1")].tolist() == single.tolist()
+    assert everything[engine.farm_slice("F2")].sum() == 999
+
+    scenarios = engine.simulate_scenarios("F1", [100.01, 5])
+    assert scenarios[0].tolist() == single.tolist()
+    assert scenarios[1].sum() == 500
+
+    batch = engine.simulate_batch([("F2", 9.99), ("F1", 100.01), ("missing", 1)])
+    assert batch[1].tolist() == single.tolist()
+    assert batch[2] is None
+
+
+def test_python_ints_take_over_past_int64():
+    big = 2 ** 40
+    allocation = allocate_cents([big, big, 1], 10 ** 12)
+    assert int(allocation.sum()) == 10 ** 12
+
+
+def test_token_count():
+    assert token_count(5) == 5
+    assert token_count(5.0) == 5
+    assert token_count("7") == 7
+    assert token_count("7.0") == 7
+    assert token_count(None) == 0
+    assert token_count("") == 0
+    for value in (2.5, "2.5", True, "lots"):
+        with pytest.raises(ValueError):
+            token_count(value)
+
+
+def test_fractional_holdings_are_rejected_not_rounded():
+    engine = PayoutEngine(holdings(("F1", 3), ("F1", 2.5), ("F2", 4)))
+
+    with pytest.raises(InvalidHoldings) as excinfo:
+        engine.simulate("F1", 10)
+    assert excinfo.value.holding_ids == ["h1"]
+    with pytest.raises(InvalidHoldings):
+        engine.simulate_all({"F1": 10})
+
+    # Other farms are unaffected
+    assert engine.simulate("F2", 10).tolist() == [1000]
+    batch = engine.simulate_batch([("F1", 10), ("F2", 10)])
+    assert isinstance(batch[0], InvalidHoldings)
+    assert batch[1].tolist() == [1000]
+
+
+def test_the_server_reuses_its_engine_until_the_holdings_change(fastapi_app, monkeypatch):
+    store = fastapi_app.holdings_store
+    store.add({"Investor Email": "a@example.com", "Farm ID": "F1", "Tokens Owned": 5})
+    engine = fastapi_app.get_payout_engine()
+
+    snapshots = []
+    snapshot = store.snapshot
+    monkeypatch.setattr(store, "snapshot", lambda: snapshots.append(1) or snapshot())
+    assert fastapi_app.get_payout_engine() is engine
+    assert snapshots == []
+
+    store.add({"Investor Email": "b@example.com", "Farm ID": "F1", "Tokens Owned": 3})
+    assert fastapi_app.get_payout_engine() is not engine
+    assert snapshots == [1]
@@ -0,0 +1,86 @@
+from fastapi.testclient import TestClient
+
+from agritoken.holdings_store import HoldingsStore
+from agritoken.portfolio import PortfolioBook
+
+
+def holding(email, farm_id, tokens, price=10, transaction_id=None):
+    row = {"Investor Email": email, "Farm ID": farm_id, "Farm Name": f"Farm {farm_id}", "Tokens Owned": tokens,
+           "Cost Basis": tokens * price, "Token Price": price, "Est. Value": tokens * price, "P&L": 0,
+           "Total Payouts Received": 0}
+    if transaction_id:
+        row["Transaction ID"] = transaction_id
+    return row
+
+
+def from_scratch(rows, email):
+    book = PortfolioBook()
+    for row in rows:
+        book.add(row)
+    return book.payload(email)
+
+
+def by_farm(portfolio):
+    return {**portfolio, "positions": sorted(portfolio["positions"], key=lambda row: row["Farm ID"])}
+
+
+def test_totals_follow_every_kind_of_write(tmp_path):
+    store = HoldingsStore(str(tmp_path / "investor_holdings.json"))
+    store.add(holding("a@example.com", "F1", 10, transaction_id="TX1"))
+    store.add(holding("a@example.com", "F2", 4, price=5))
+    store.add(holding("b@example.com", "F1", 3))
+    store.record_purchase("A@example.com", "F1", 5, 50, 10, holding("a@example.com", "F1", 5))
+    store.reprice_farm("F1", 12)
+    store.record_payout("F1", 0.5, "2026-01-01")
+    store.adjust_position("a@example.com", "F2", -1)
+    store.update_by_transaction("TX1", {"Est. Value": 200})
+
+    portfolio = store.portfolio("A@Example.com")
+    assert portfolio["summary"] == {
+        "Tokens Owned": 18, "Cost Basis": 170.0, "Est. Value": 215.0, "P&L": 45.0,
+        "P&L Percentage": 26.47, "Total Payouts Received": 7.5, "Farms": 2,
+    }
+    assert [(row["Farm ID"], row["Tokens Owned"], row["Holdings"]) for row in by_farm(portfolio)["positions"]] == [
+        ("F1", 15, 1), ("F2", 3, 1),
+    ]
+    for email in ("a@example.com", "b@example.com"):
+        assert by_farm(store.portfolio(email)) == by_farm(from_scratch(store.all(), email))
+
+    # Another worker replaying the log arrives at the same totals
+    assert HoldingsStore(store.snapshot_path).portfolio("A@Example.com") == portfolio
+
+
+def test_unknown_investors_get_an_empty_portfolio(tmp_path):
+    store = HoldingsStore(str(tmp_path / "investor_holdings.json"))
+    assert store.portfolio("nobody@example.com") == {
+        "investor_email": "nobody@example.com",
+        "summary": {"Tokens Owned": 0, "Cost Basis": 0.0, "Est. Value": 0.0, "P&L": 0.0, "P&L Percentage": 0,
+                    "Total Payouts Received": 0.0, "Farms": 0},
+        "positions": [],
+    }
+
+
+def test_removed_holdings_leave_no_position_behind():
+    book = PortfolioBook()
+    rows = [holding("a@example.com", "F1", 0.1), holding("a@example.com", "F1", 0.2)]
+    for row in rows:
+        book.add(row)
+    for row in rows:
+        book.remove(row)
+    assert list(book.positions()) == []
+    assert book.payload("a@example.com")["positions"] == []
+
+
+def test_portfolio_endpoint_reflects_new_writes(fastapi_app):
+    client = TestClient(fastapi_app.app)
+    store = fastapi_app.holdings_store
+    store.add(holding("portfolio@example.com", "P1", 8))
+
+    first = client.get("/api/portfolio/portfolio@example.com")
+    assert first.status_code == 200
+    assert first.json()["summary"]["Tokens Owned"] == 8
+
+    store.record_payout("P1", 1.25, "2026-03-01")
+    second = client.get("/api/portfolio/Portfolio@example.com", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.json()["summary"]["Total Payouts Received"] == 10.0
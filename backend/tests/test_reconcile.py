@@ -0,0 +1,75 @@
+import asyncio
+
+import httpx
+
+from agritoken.backends import JsonBackend
+from agritoken.reconcile import AsyncIndexer, Reconciler
+from fake_indexer import create_app
+
+CREATOR = "CREATOR"
+ALICE = "ALICE"
+BOB = "BOB"
+STRANGER = "STRANGER"
+
+
+def seeded_backend(data_root):
+    backend = JsonBackend(str(data_root))
+    backend.farm_catalog.save("farm.json", {
+        "Farm ID": "F1", "Farm Name": "Test Farm", "Asset ID": 700, "Number of Tokens": 1000,
+        "Tokens Sold": 100, "Tokens Available": 900, "created_at": "2026-01-01T00:00:00",
+    })
+    for email, address in (("alice@example.com", ALICE), ("bob@example.com", BOB)):
+        backend.users.add_if_absent({"User Email": email, "Wallet Address": address})
+    for email, tokens in (("alice@example.com", 60), ("bob@example.com", 40)):
+        backend.holdings.add({"Investor Email": email, "Farm ID": "F1", "Tokens Owned": tokens,
+                              "Cost Basis": tokens, "Token Price": 1, "Est. Value": tokens})
+    # Not on chain yet, so not counted
+    backend.holdings.add({"Investor Email": "bob@example.com", "Farm ID": "F1", "Tokens Owned": 5,
+                          "Transaction Status": "pending"})
+    return backend
+
+
+def chain_fixture():
+    return {700: {
+        "params": {"creator": CREATOR, "reserve": CREATOR, "total": 1000},
+        "balances": [{"address": CREATOR, "amount": 850}, {"address": ALICE, "amount": 60},
+                     {"address": BOB, "amount": 75}, {"address": STRANGER, "amount": 15}],
+    }}
+
+
+def run(backend, apply):
+    async def go():
+        # A page size of 2 makes the balances take two round trips
+        indexer = AsyncIndexer("http://indexer", page_size=2,
+                               transport=httpx.ASGITransport(app=create_app(chain_fixture())))
+        try:
+            return await Reconciler(backend, indexer).run(apply=apply)
+        finally:
+            await indexer.close()
+    return asyncio.run(go())
+
+
+def test_differences_are_reported_against_the_indexer(tmp_path):
+    report = run(seeded_backend(tmp_path), apply=False)
+
+    assert report["errors"] == {}
+    assert report["holders"] == 4
+    by_kind = {correction["kind"]: correction for correction in report["corrections"]}
+    assert by_kind["farm"]["chain"] == {"Tokens Sold": 150, "Tokens Available": 850}
+    assert (by_kind["holding"]["investor_email"], by_kind["holding"]["local"], by_kind["holding"]["chain"]) == \
+        ("bob@example.com", 40, 75)
+    assert by_kind["untracked"]["address"] == STRANGER and not by_kind["untracked"]["applicable"]
+    assert report["applied"] == 0
+
+
+def test_apply_writes_the_chain_figures_back(tmp_path):
+    backend = seeded_backend(tmp_path)
+    assert run(backend, apply=True)["applied"] == 2
+
+    farm = backend.farm_catalog.get_by_farm_id("F1")
+    assert (farm["Tokens Sold"], farm["Tokens Available"]) == (150, 850)
+    bob = [h for h in backend.holdings.for_investor("bob@example.com") if h.get("Transaction Status") != "pending"]
+    assert bob[0]["Tokens Owned"] == 75
+
+    # A second pass only finds the wallet nobody owns
+    assert [c["kind"] for c in run(backend, apply=False)["corrections"]] == ["untracked"]
@@ -0,0 +1,45 @@
+import base64
+
+from algosdk import account, encoding, transaction
+
+from agritoken.signing import SigningService, sign_with, signing_key
+from fake_algod import GENESIS_HASH, GENESIS_ID
+
+PRIVATE_KEY, SENDER = account.generate_account()
+
+
+def params():
+    return transaction.SuggestedParams(1000, 50000000, 50001000, GENESIS_HASH, GENESIS_ID, flat_fee=True)
+
+
+def transfers(count):
+    return [transaction.AssetTransferTxn(SENDER, params(), account.generate_account()[1], i + 1, 1001)
+            for i in range(count)]
+
+
+def signed_by_algosdk(txns):
+    return [(txn.get_txid(), base64.b64decode(encoding.msgpack_encode(txn.sign(PRIVATE_KEY)))) for txn in txns]
+
+
+def test_signatures_and_txids_match_algosdk():
+    txns = transfers(3) + [transaction.PaymentTxn(SENDER, params(), account.generate_account()[1], 5,
+                                                  note=b"payout")]
+    group = transfers(4)
+    transaction.assign_group_id(group)
+
+    assert sign_with(signing_key(PRIVATE_KEY), txns + group) == signed_by_algosdk(txns + group)
+
+
+def test_the_process_pool_signs_like_the_inline_path():
+    txns = transfers(40)
+    service = SigningService(PRIVATE_KEY, workers=2, inline_below=10, shard_size=3)
+    try:
+        assert service.sign(txns) == signed_by_algosdk(txns)
+        assert service._pool is not None
+
+        groups = [txns[:16], txns[16:32], txns[32:]]
+        assert [len(group) for group in service.sign_groups(groups)] == [16, 16, 8]
+    finally:
+        service.close()
+    # A closed service keeps signing, inline
+    assert service.sign(txns) == signed_by_algosdk(txns)
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from agritoken.backends import JsonBackend, SqliteBackend
+from agritoken.farm_schema import ensure_canonical
+from agritoken.holdings_store import HoldingsStore
+from agritoken.migrate import migrate
+from agritoken.user_store import UserStore
+
+
+def holding(email, farm_id, tokens, transaction_id=None):
+    row = {"Investor Email": email, "Farm ID": farm_id, "Farm Name": f"Farm {farm_id}", "Tokens Owned": tokens,
+           "Cost Basis": tokens * 10, "Token Price": 10, "Est. Value": tokens * 10, "P&L": 0,
+           "Total Payouts Received": 0}
+    if transaction_id:
+        row["Transaction ID"] = transaction_id
+    return row
+
+
+@pytest.fixture
+def data_root(tmp_path):
+    """JSON data files with a legacy farm, a pending one and unsnapshotted log records"""
+    farm_dir = tmp_path / "farm_info"
+    farm_dir.mkdir()
+    (farm_dir / "legacy.json").write_text(json.dumps(
+        {"Farm Name": "Legacy", "ASA ID": 11, "Farm Email": "Old@Example.com", "Number of Tokens": 100}
+    ))
+    (farm_dir / "langs_farm.json").write_text(json.dumps({"farms": [
+        {"Farm ID": "F1", "Farm Name": "One", "Farmer Email": "one@example.com", "Asset ID": 21,
+         "Tokens Sold": 0, "Tokens Available": 500, "Price per Token (USD)": 10},
+        {"Farm ID": "F2", "Farm Name": "Two", "Farmer Email": "one@example.com", "Transaction Status": "pending"},
+    ]}))
+
+    holdings = HoldingsStore(str(tmp_path / "investor_holdings.json"))
+    holdings.add(holding("a@example.com", "F1", 5, "TX1"))
+    holdings.record_purchase("a@example.com", "F1", 2, 20, 10, holding("a@example.com", "F1", 2))
+    holdings.add(holding("B@example.com", "F1", 3))
+
+    users = UserStore(str(tmp_path / "user_info" / "signup_info.json"))
+    users.add_if_absent({"User Email": "a@example.com", "User Password": "x"})
+    users.add_if_absent({"User Email": "B@example.com", "User Password": "y"})
+    return tmp_path
+
+
+def backends(data_root):
+    db_path = str(data_root / "agritoken.db")
+    migrate(str(data_root), db_path)
+    return JsonBackend(str(data_root)), SqliteBackend(db_path)
+
+
+def test_migration_copies_every_record_including_the_log(data_root):
+    counts = migrate(str(data_root), str(data_root / "agritoken.db"))
+    assert counts == {"farms": 3, "holdings": 2, "users": 2}
+
+    with pytest.raises(RuntimeError, match="already has data"):
+        migrate(str(data_root), str(data_root / "agritoken.db"))
+    assert migrate(str(data_root), str(data_root / "agritoken.db"), force=True) == counts
+
+
+def test_reads_match_the_json_backend(data_root):
+    json_backend, sqlite_backend = backends(data_root)
+    for backend in (json_backend, sqlite_backend):
+        backend.upgrade_farms()
+
+    def reads(backend):
+        catalog, holdings, users = backend.farm_catalog, backend.holdings, backend.users
+        return {
+            "farms": sorted(catalog.all(), key=lambda farm: farm["Farm ID"]),
+            "by_id": catalog.get_by_farm_id("F1"),
+            "pending": catalog.get_by_farm_id("F2"),
+            "by_asset": catalog.get_by_asset_id(11)["Farm Name"],
+            "by_email": [farm["Farm ID"] for farm in catalog.get_by_farmer_email("ONE@example.com")],
+            "farm_list": [farm["Farm ID"] for farm in backend.farms.all()],
+            "holdings": holdings.all(),
+            "for_investor": holdings.for_investor("b@example.com"),
+            "portfolio": holdings.portfolio("A@example.com"),
+            "user": users.get("b@EXAMPLE.com"),
+        }
+
+    expected = reads(json_backend)
+    assert expected["pending"] is None and expected["by_asset"] == "Legacy"
+    assert reads(sqlite_backend) == expected
+
+
+def test_writes_match_the_json_backend(data_root):
+    json_backend, sqlite_backend = backends(data_root)
+
+    def enough_left(tokens):
+        def validate(farm):
+            if farm["Tokens Available"] < tokens:
+                raise ValueError("not enough tokens")
+            return holding("c@example.com", "F1", tokens)
+        return validate
+
+    for backend in (json_backend, sqlite_backend):
+        backend.purchase("F1", "c@example.com", 4, 40, "2026-01-01", enough_left(4))
+        backend.holdings.update_by_transaction("TX1", {"Transaction Status": "confirmed"})
+        backend.holdings.reprice_farm("F1", 12)
+        backend.holdings.record_payout("F1", 0.5, "2026-02-01")
+        backend.holdings.adjust_position("b@example.com", "F1", -1)
+        backend.users.update("a@example.com", {"User Status": "Inactive"})
+        assert backend.users.add_if_absent({"User Email": "A@Example.com"}) is False
+        with pytest.raises(ValueError):
+            backend.purchase("F1", "d@example.com", 10_000, 1, "2026-01-01", enough_left(10_000))
+
+    # Rows are stored in the canonical schema; the JSON file keeps the record as written
+    assert sqlite_backend.farms.get("F1") == ensure_canonical(json_backend.farms.get("F1"))
+    assert sqlite_backend.farms.get("F1")["Tokens Sold"] == 4
+    assert sqlite_backend.holdings.all() == json_backend.holdings.all()
+    for email in ("a@example.com", "b@example.com", "c@example.com"):
+        assert sqlite_backend.holdings.portfolio(email) == json_backend.holdings.portfolio(email)
+    assert sqlite_backend.users.all() == json_backend.users.all()
+
+
+def test_versions_move_only_on_writes(data_root):
+    _, backend = backends(data_root)
+    version, _ = backend.farm_catalog.snapshot()
+    assert backend.farm_catalog.snapshot()[0] == version
+    holdings_version = backend.holdings.version()
+
+    backend.farm_catalog.update_by_farm_id("F1", {"Tokens Sold": 1})
+    assert backend.farm_catalog.snapshot()[0] != version
+    assert backend.holdings.version() == holdings_version
+
+    backend.holdings.reprice_farm("F1", 11)
+    assert backend.holdings.version() != holdings_version
@@ -0,0 +1,112 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from agritoken.storage import atomic_write_json, locked, read_json, update_json
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def spawn(script, *args):
+    """Run ``script`` in a fresh interpreter with the backend importable"""
+    return subprocess.Popen([sys.executable, "-c", textwrap.dedent(script), *map(str, args)], cwd=BACKEND_DIR,
+                            stdout=subprocess.PIPE, text=True)
+
+
+INCREMENT = """
+    import sys
+    from agritoken.storage import update_json
+
+    def bump(data):
+        data["count"] += 1
+
+    for _ in range(int(sys.argv[2])):
+        update_json(sys.argv[1], bump)
+"""
+
+
+def test_increments_from_several_processes_are_not_lost(tmp_path):
+    path = tmp_path / "counter.json"
+    atomic_write_json(path, {"count": 0})
+
+    workers = [spawn(INCREMENT, path, 50) for _ in range(4)]
+    assert [worker.wait(timeout=60) for worker in workers] == [0] * 4
+    assert read_json(path) == {"count": 200}
+    assert sorted(os.listdir(tmp_path)) == ["counter.json", "counter.json.lock"]
+
+
+def test_another_process_waits_for_the_lock(tmp_path):
+    path = tmp_path / "doc.json"
+    atomic_write_json(path, {"count": 0})
+    with locked(path):
+        worker = spawn(INCREMENT, path, 1)
+        time.sleep(0.5)
+        assert worker.poll() is None
+        assert read_json(path) == {"count": 0}
+    assert worker.wait(timeout=30) == 0
+    assert read_json(path) == {"count": 1}
+
+
+def test_shared_locks_admit_each_other_but_not_a_writer(tmp_path):
+    path = tmp_path / "doc.json"
+    probe = """
+        import fcntl, os, sys
+        fd = os.open(sys.argv[1] + ".lock", os.O_RDWR | os.O_CREAT)
+        for mode in (fcntl.LOCK_SH, fcntl.LOCK_EX):
+            try:
+                fcntl.flock(fd, mode | fcntl.LOCK_NB)
+                print("free")
+            except BlockingIOError:
+                print("busy")
+    """
+    with locked(path, shared=True):
+        out, _ = spawn(probe, path).communicate(timeout=30)
+    assert out.split() == ["free", "busy"]
+
+
+def test_locks_are_reentrant_within_a_thread(tmp_path):
+    path = tmp_path / "doc.json"
+
+    def add(data):
+        data.append(len(data))
+        # Nested helpers take the same lock again
+        return update_json(tmp_path / "other.json", lambda other: other.append(1), default=list)
+
+    with locked(path):
+        update_json(path, add, default=list)
+        update_json(path, add)
+    assert read_json(path) == [0, 1]
+    assert read_json(tmp_path / "other.json") == [1, 1]
+
+
+def test_failed_updates_leave_the_file_untouched(tmp_path):
+    path = tmp_path / "doc.json"
+    atomic_write_json(path, {"a": 1})
+    before = path.read_bytes()
+
+    def broken(data):
+        data["a"] = 2
+        raise RuntimeError("boom")
+    with pytest.raises(RuntimeError):
+        update_json(path, broken)
+    assert path.read_bytes() == before
+
+    with pytest.raises(FileNotFoundError):
+        update_json(tmp_path / "missing.json", broken)
+    assert not (tmp_path / "missing.json").exists()
+
+
+def test_writes_replace_the_file_whole(tmp_path):
+    path = tmp_path / "doc.json"
+    path.write_text("old")
+    inode = os.stat(path).st_ino
+    atomic_write_json(path, {"farms": ["x" * 1000]})
+
+    assert json.loads(path.read_text()) == {"farms": ["x" * 1000]}
+    assert os.stat(path).st_ino != inode
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
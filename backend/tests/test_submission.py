@@ -0,0 +1,135 @@
+import threading
+
+import pytest
+from algosdk import account
+
+from agritoken.submission import SubmissionRejected, SubmissionScheduler, TokenBucket
+from conftest import next_amount
+
+
+class HTTPError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def failing(*errors, result="TXID"):
+    """``send`` that raises ``errors`` in turn, then returns ``result``"""
+    calls = []
+
+    def send():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return send, calls
+
+
+def test_token_bucket_queues_callers_in_order():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve(1) == pytest.approx(0.2, abs=0.01)
+    assert bucket.reserve(0.1) is None
+
+
+def test_rate_limit_rejects_with_429_and_retry_after():
+    scheduler = SubmissionScheduler(rate=1, burst=1, max_wait=0)
+    assert scheduler.submit(lambda: "A", "A") == "A"
+    with pytest.raises(SubmissionRejected) as excinfo:
+        scheduler.submit(lambda: "B", "B")
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.retry_after_header() == "1"
+
+
+def test_full_queue_rejects_with_429():
+    scheduler = SubmissionScheduler(rate=1000, max_queue=1)
+    entered, release = threading.Event(), threading.Event()
+
+    def blocking():
+        entered.set()
+        release.wait(5)
+        return "A"
+
+    thread = threading.Thread(target=scheduler.submit, args=(blocking, "A"))
+    thread.start()
+    entered.wait(5)
+    try:
+        with pytest.raises(SubmissionRejected) as excinfo:
+            scheduler.submit(lambda: "B", "B")
+        assert excinfo.value.status_code == 429
+        assert int(excinfo.value.retry_after_header()) >= 1
+    finally:
+        release.set()
+        thread.join()
+    assert scheduler.depth() == 0
+
+
+def test_transient_errors_are_retried_then_give_up_with_503():
+    scheduler = SubmissionScheduler(rate=1000, retries=2, backoff=0.001, max_backoff=3)
+    send, calls = failing(HTTPError("busy", 503), HTTPError("slow down", 429))
+    assert scheduler.submit(send, "TXID") == "TXID"
+    assert len(calls) == 3
+
+    send, calls = failing(*[HTTPError("down", 502)] * 5)
+    with pytest.raises(SubmissionRejected) as excinfo:
+        scheduler.submit(send, "TXID")
+    assert len(calls) == 3
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.retry_after_header() == "3"
+
+
+def test_a_retry_that_finds_the_transaction_landed_succeeds():
+    scheduler = SubmissionScheduler(rate=1000, backoff=0.001)
+    send, _ = failing(ConnectionError("reset"), HTTPError("transaction already in ledger: TXID", 400))
+    assert scheduler.submit(send, "TXID") == "TXID"
+
+
+def test_client_errors_are_not_retried():
+    scheduler = SubmissionScheduler(rate=1000, backoff=0.001)
+    send, calls = failing(HTTPError("overspend", 400))
+    with pytest.raises(HTTPError):
+        scheduler.submit(send, "TXID")
+    assert len(calls) == 1
+
+
+def transfer(client, deployer):
+    return client.post("/transfer_assets?wait=false", json={
+        "asset_id": 1001,
+        "sender_address": deployer,
+        "receiver_address": account.generate_account()[1],
+        "amount": next_amount(),
+    })
+
+
+def test_transfer_is_throttled_locally_with_429(flask_app, deployer, algod_service):
+    algod_service(scheduler=SubmissionScheduler(rate=1, burst=1, max_wait=0))
+    client = flask_app.app.test_client()
+
+    assert transfer(client, deployer).status_code == 202
+    response = transfer(client, deployer)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.get_json()["success"] is False
+
+
+def test_transfer_gives_up_on_a_throttling_node_with_503(flask_app, deployer, algod_service, throttled_algod):
+    from agritoken.algod_pool import _is_transient
+
+    url, node = throttled_algod
+    algod_service(url, scheduler=SubmissionScheduler(rate=1000, retries=1, backoff=0.001, max_backoff=2,
+                                                     is_transient=_is_transient))
+    client = flask_app.app.test_client()
+
+    # The node takes one submission a second; a quick burst gets 429s back
+    statuses = []
+    for _ in range(4):
+        response = transfer(client, deployer)
+        statuses.append(response.status_code)
+        if response.status_code == 503:
+            assert response.headers["Retry-After"] == "2"
+            break
+    assert statuses[0] == 202
+    assert statuses[-1] == 503
+    assert node.state.throttled >= 2
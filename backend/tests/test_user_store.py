@@ -0,0 +1,36 @@
+import threading
+import time
+
+from agritoken.storage import locked
+from agritoken.user_store import UserStore
+
+
+def test_returned_users_are_copies(tmp_path):
+    users = UserStore(str(tmp_path / "signup_info.json"))
+    users.add_if_absent({"User Email": "a@example.com", "Role": "investor"})
+
+    users.get("a@example.com")["Role"] = "admin"
+    users.all()[0]["Role"] = "admin"
+    assert users.get("a@example.com")["Role"] == "investor"
+
+
+def test_one_signup_per_email_across_workers(tmp_path):
+    path = str(tmp_path / "signup_info.json")
+    # One store per worker; the file lock is all they share
+    workers = [UserStore(path) for _ in range(4)]
+    added = []
+
+    def sign_up(store, name):
+        added.append(store.add_if_absent({"User Email": "Same@example.com", "User First Name": name}))
+
+    threads = [threading.Thread(target=sign_up, args=(store, f"worker{i}")) for i, store in enumerate(workers)]
+    # Line every signup up behind another process's write
+    with locked(path):
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+    for thread in threads:
+        thread.join()
+
+    assert added.count(True) == 1
+    assert len(UserStore(path).all()) == 1